@@ -0,0 +1,112 @@
+"""
+Compares the positional def-use extraction of DataFlowExtractor with the former scan over the remaining name list,
+and times the reaching definitions over the control flow. The notebook is repeated several times to show how the
+approaches scale with the number of names.
+
+Run from the project folder: python -m benchmarks.bench_data_flow [--notebook PATH] [--repeat 1 4 16 32]
+"""
+import argparse
+import ast
+import itertools
+import os
+import time
+
+from nbformat import read, NO_CONVERT
+
+from data_tracing.extract_dfg import DataFlowExtractor
+from data_tracing.process_kernels import NotebookAnalyzer, NOTEBOOK_DIR
+
+NOTEBOOK = os.path.join(NOTEBOOK_DIR, 'comprehensive-data-exploration-with-python.ipynb')
+
+
+class ScanDataFlowExtractor(DataFlowExtractor):
+    """
+    Former implementation of fill_edge_list, which filters the remaining name list for every store.
+    """
+
+    def fill_positional_edges(self, identifiers=None):
+        sorted_name_list = []
+        for _, group in itertools.groupby(self.ast_name_list, key=lambda elem: elem[1]):
+            group = sorted(group, key=lambda elem: elem[0].lineno)
+            for _, g in itertools.groupby(group, key=lambda elem: elem[0].lineno):
+                g = list(g)
+                sorted_name_list.extend(elem for elem in g if isinstance(elem[0].ctx, ast.Load))
+                sorted_name_list.extend(elem for elem in g if not isinstance(elem[0].ctx, ast.Load))
+        self.ast_name_list = sorted_name_list
+        for pos, n_v_tuple in enumerate(self.ast_name_list):
+            if isinstance(n_v_tuple[0].ctx, ast.Store):
+                identifier = n_v_tuple[0].id
+                rest = list(filter(lambda elem: elem[0].id == identifier, self.ast_name_list[(pos + 1):]))
+                if len(rest) >= 1 and isinstance(rest[0][0].ctx, ast.Load):
+                    self.ast_edge_list.append((n_v_tuple, rest[0]))
+                    for n_v_tpl_tail, n_v_tpl_head in itertools.pairwise(rest):
+                        if not isinstance(n_v_tpl_head[0].ctx, ast.Load):
+                            break
+                        self.ast_edge_list.append((n_v_tpl_tail, n_v_tpl_head))
+
+
+def load_sources(file):
+    """
+    :param file: Notebook file
+    :return: Sources of the code cells
+    """
+    with open(file) as fp:
+        notebook = read(fp, NO_CONVERT)
+    return [c['source'] for c in notebook['cells'] if c['cell_type'] == 'code']
+
+
+def parse_cells(sources, repeat):
+    """
+    Parses the sources repeat times in a row, every copy gets its own ast nodes.
+
+    :param sources: Sources of the code cells
+    :param repeat: Number of copies of the notebook
+    :return: Dictionary with the result of NotebookAnalyzer.analyze_cell of every cell
+    """
+    entries = dict()
+    for i, source in enumerate(sources * repeat):
+        entry = NotebookAnalyzer.analyze_cell(source)
+        if entry['cfg'] is not None:
+            entries[str(i)] = entry
+    return entries
+
+
+def time_extractor(extractor_class, entries, mode='positional'):
+    """
+    :param extractor_class: DataFlowExtractor or a subclass
+    :param entries: Dictionary with the analysis result of every cell
+    :param mode: Mode of the extractor, see DATA_FLOW_MODES
+    :return: Seconds needed for walk_and_get_edges and the edges as comparable tuples
+    """
+    dfg_ex = extractor_class({key: entry['ast'] for key, entry in entries.items()},
+                             visitors={key: entry['visitor'] for key, entry in entries.items()},
+                             cfgs={key: entry['cfg'] for key, entry in entries.items()}, mode=mode)
+    start = time.perf_counter()
+    edges = dfg_ex.walk_and_get_edges()
+    seconds = time.perf_counter() - start
+    return seconds, [tuple((n.id, cell, n.lineno, n.col_offset) for n, cell in edge) for edge in edges]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the def-use extraction.")
+    parser.add_argument("--notebook", default=NOTEBOOK)
+    parser.add_argument("--repeat", type=int, nargs="+", default=[1, 4, 16, 32])
+    args = parser.parse_args(argv)
+
+    sources = load_sources(args.notebook)
+    print("{:>7} {:>7} {:>7} {:>10} {:>10} {:>8} {:>8} {:>12}".format(
+        "repeat", "names", "edges", "scan [s]", "index [s]", "speedup", "reaching", "reaching [s]"))
+    for repeat in args.repeat:
+        entries = parse_cells(sources, repeat)
+        names = sum(len(entry['visitor'].name_list) for entry in entries.values())
+        scan_seconds, scan_edges = time_extractor(ScanDataFlowExtractor, entries)
+        index_seconds, index_edges = time_extractor(DataFlowExtractor, entries)
+        assert scan_edges == index_edges, "Edges of the index differ from the scan"
+        reaching_seconds, reaching_edges = time_extractor(DataFlowExtractor, entries, mode='reaching')
+        print("{:>7} {:>7} {:>7} {:>10.4f} {:>10.4f} {:>7.1f}x {:>8} {:>12.4f}".format(
+            repeat, names, len(index_edges), scan_seconds, index_seconds, scan_seconds / index_seconds,
+            len(reaching_edges), reaching_seconds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares the streaming reader of notebook_reader.py with nbformat.read, which decodes the whole notebook including
+the outputs. Both the time and the peak memory of the Python allocations are measured.
+
+Run from the project folder: python -m benchmarks.bench_notebook_reader [--notebook PATH ...] [--runs 5]
+"""
+import argparse
+import glob
+import os
+import time
+import tracemalloc
+
+from nbformat import read, NO_CONVERT
+
+from data_tracing.notebook_reader import read_code_cells
+from data_tracing.process_kernels import NOTEBOOK_DIR
+
+
+def read_nbformat(file):
+    """
+    :param file: Notebook file
+    :return: Code cells read by nbformat
+    """
+    with open(file, encoding='utf-8') as fp:
+        notebook = read(fp, NO_CONVERT)
+    return [c for c in notebook['cells'] if c['cell_type'] == 'code']
+
+
+def measure(function, file, runs):
+    """
+    :param function: Function reading the code cells of a notebook
+    :param file: Notebook file
+    :param runs: Number of runs, the fastest one is reported
+    :return: Seconds, peak of the Python allocations in bytes and the code cells
+    """
+    seconds = min(timed(function, file) for _ in range(runs))
+    tracemalloc.start()
+    cells = function(file)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return seconds, peak, cells
+
+
+def timed(function, file):
+    """
+    :return: Seconds of one call of the function
+    """
+    start = time.perf_counter()
+    function(file)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the notebook reader.")
+    parser.add_argument("--notebook", nargs="+", default=sorted(glob.glob(os.path.join(NOTEBOOK_DIR, '*.ipynb'))))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print("{:>48} {:>8} {:>12} {:>12} {:>12} {:>12}".format("notebook", "size kB", "nbformat ms", "stream ms",
+                                                             "nbformat MB", "stream MB"))
+    for file in args.notebook:
+        nbformat_seconds, nbformat_peak, nbformat_cells = measure(read_nbformat, file, args.runs)
+        stream_seconds, stream_peak, stream_cells = measure(read_code_cells, file, args.runs)
+        assert [c['source'] for c in nbformat_cells] == [c['source'] for c in stream_cells], \
+            "Sources of the streaming reader differ from nbformat"
+        print("{:>48} {:>8.0f} {:>12.2f} {:>12.2f} {:>12.2f} {:>12.2f}".format(
+            os.path.basename(file)[-48:], os.path.getsize(file) / 1000, nbformat_seconds * 1000, stream_seconds * 1000,
+            nbformat_peak / 1e6, stream_peak / 1e6))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Times every stage of the visualization on its own: reading the notebook, parsing the cells, the control flow, the
+traversal of the ast (AstVisitor, formerly node_traversal), the data flow, the labels of the statements, building
+the graph, the layout and drawing one SVG file. The stages run over the notebooks of the notebooks folder and over
+synthetic notebooks, where one parameter (cells, statements, variables or depth) is varied at a time to get scaling
+curves.
+
+The results can be written as JSON and compared against a stored baseline. Notebooks whose size, e.g. the number of
+nodes or edges of the graph, changed and stages which got slower than the threshold are reported and the exit code
+is 1, so the script can guard against regressions. Baselines written with --sizes-only hold no timings, so they can
+be compared on every machine, see benchmarks/baseline.json.
+
+Run from the project folder:
+    python -m benchmarks.bench_pipeline --output results.json
+    python -m benchmarks.bench_pipeline --baseline results.json [--threshold 1.25]
+    python -m benchmarks.bench_pipeline --no-render --runs 1 --baseline benchmarks/baseline.json
+"""
+import argparse
+import ast
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from benchmarks.synthetic_notebook import write_notebook
+from data_tracing.ast_visitor import AstVisitor
+from data_tracing.extract_cfg import ControlFlowExtractor
+from data_tracing.function_summary import SUMMARIES, module_functions
+from data_tracing.notebook_reader import read_code_cells
+from data_tracing.process_kernels import NotebookAnalyzer, NOTEBOOK_DIR, parse_list
+from data_tracing.render_graph import GraphRenderer, default_backend, draw_executable, draw_pygraphviz
+
+STAGES = ('load', 'parse', 'cfg', 'traversal', 'dfg', 'labels', 'graph', 'layout', 'draw')
+# Parameters of the synthetic notebooks, every curve varies one of them
+BASE_PARAMETERS = {'cells': 10, 'statements': 8, 'variables': 20, 'depth': 1}
+CURVES = {'cells': (5, 10, 20, 40),
+          'statements': (4, 8, 16, 32),
+          'variables': (5, 20, 80, 320),
+          'depth': (0, 1, 2, 4)}
+# Version of the format of the results
+RESULT_VERSION = 1
+
+
+class PrecomputedCells:
+    """
+    Stand-in for the CellCache of NotebookAnalyzer, which hands out the results of the timed stages, so
+    NotebookAnalyzer.parse_cells takes them over without analyzing the cells again.
+    """
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get(self, source):
+        return self.entries.get(source)
+
+    def put(self, source, entry):
+        pass
+
+
+class StageTimer:
+    """
+    Class to sum up the seconds spent in every stage.
+    """
+
+    def __init__(self):
+        self.seconds = dict()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = self.seconds.get(name, 0.0) + time.perf_counter() - start
+
+
+def parse_source(source):
+    """
+    Parses a cell like NotebookAnalyzer.analyze_cell, magic commands are commented out if the source is invalid.
+
+    :param source: Source of the cell
+    :return: ast of the cell
+    """
+    try:
+        return ast.parse(source)
+    except SyntaxError:
+        return ast.parse('\n'.join(parse_list(source.split('\n'))))
+
+
+def run_stages(file, output_dir, render=True):
+    """
+    Runs the stages once over a notebook.
+
+    :param file: Path of the notebook
+    :param output_dir: Folder for the files written by the stages
+    :param render: Also time the layout and the drawing
+    :return: Dictionary with the seconds of every stage and dictionary with the size of the notebook and the graph
+    """
+    timer = StageTimer()
+    with timer.stage('load'):
+        code_cells = read_code_cells(file)
+    sources = [cell['source'] for cell in code_cells]
+    with timer.stage('parse'):
+        asts = [parse_source(source) for source in sources]
+
+    entries = dict()
+    extractors = dict()
+    with timer.stage('cfg'):
+        for source, ast_cell in zip(sources, asts):
+            if len(ast_cell.body) > 0:
+                cfg_ex = ControlFlowExtractor()
+                cfg_ex.extract_CFG(ast_cell)
+                extractors[source] = cfg_ex
+    with timer.stage('traversal'):
+        for source, ast_cell in zip(sources, asts):
+            entry = {'ast': ast_cell, 'traversal': None, 'cfg': None, 'visitor': None, 'labelled': False}
+            cfg_ex = extractors.get(source)
+            if cfg_ex is not None:
+                visitor = AstVisitor(cfg_ex.get_nodes(skip_module=True)).visit(ast_cell)
+                entry.update(traversal=(visitor.node_list, visitor.edge_list), visitor=visitor,
+                             cfg=cfg_ex)
+                for function_def in module_functions(cfg_ex):
+                    SUMMARIES.get(function_def)
+            entries.setdefault(source, entry)
+
+    analyzer = NotebookAnalyzer(file, output_dir=output_dir, progress=False, cache=PrecomputedCells(entries),
+                                overview=False)
+    analyzer.parse_cells(code_cells)
+    analyzer.G = analyzer.create_graph()
+    with timer.stage('dfg'):
+        edges = analyzer.create_data_flow_extractor().walk_and_get_edges()
+    # The graph stage adds the extracted edges instead of extracting them again
+    analyzer.extract_data_flow = lambda: edges
+    with timer.stage('labels'):
+        fragments = [(cell_key, analyzer.build_cell(cell_key)) for cell_key in analyzer.ast_dict_parsed]
+    with timer.stage('graph'):
+        for cell_key, fragment in fragments:
+            analyzer.add_cell(cell_key, fragment)
+        analyzer.align_clusters()
+        analyzer.add_data_flow()
+    with timer.stage('labels'):
+        analyzer.add_labels()
+
+    if render:
+        backend = default_backend()
+        renderer = GraphRenderer(jobs=1, backend=backend)
+        with timer.stage('layout'):
+            positioned = renderer.layout_graph(analyzer.G, backend)
+        draw = draw_executable if backend == 'dot' else draw_pygraphviz
+        with timer.stage('draw'):
+            draw(positioned, os.path.join(output_dir, 'vis.svg'), 'svg', {})
+
+    size = {'cells': len(code_cells),
+            'statements': sum(len(visitor.cfg_nodes) for visitor in analyzer.visitors.values()),
+            'names': sum(len(visitor.name_list) for visitor in analyzer.visitors.values()),
+            'data_flow_edges': len(edges),
+            'nodes': len(analyzer.G.nodes),
+            'edges': len(analyzer.G.edges)}
+    return timer.seconds, size
+
+
+def measure(file, output_dir, runs, render=True):
+    """
+    :param file: Path of the notebook
+    :param output_dir: Folder for the files written by the stages
+    :param runs: Number of runs, the fastest run of every stage is kept
+    :param render: Also time the layout and the drawing
+    :return: Dictionary with the size and the seconds of every stage
+    """
+    best = dict()
+    size = None
+    for _ in range(runs):
+        seconds, size = run_stages(file, output_dir, render)
+        for stage, value in seconds.items():
+            best[stage] = min(best.get(stage, value), value)
+    return {'size': size, 'stages': {stage: round(best[stage], 6) for stage in STAGES if stage in best}}
+
+
+def parse_curves(specs):
+    """
+    :param specs: Curves as "parameter" or "parameter=value,value,..."
+    :return: Dictionary with the values of every curve
+    """
+    curves = dict()
+    for spec in specs:
+        parameter, _, values = spec.partition('=')
+        if parameter not in BASE_PARAMETERS:
+            raise ValueError("Unknown parameter '" + parameter + "', expected one of " + ", ".join(BASE_PARAMETERS))
+        curves[parameter] = tuple(int(value) for value in values.split(',')) if values else CURVES[parameter]
+    return curves
+
+
+def run_benchmark(notebooks, curves, runs=3, render=True, seed=0):
+    """
+    :param notebooks: Paths of real notebooks
+    :param curves: Dictionary with the values of every varied parameter
+    :param runs: Number of runs per notebook
+    :param render: Also time the layout and the drawing
+    :param seed: Seed of the synthetic notebooks
+    :return: Results as dictionary, see RESULT_VERSION
+    """
+    results = {'version': RESULT_VERSION,
+               'python': platform.python_version(),
+               'platform': platform.platform(),
+               'runs': runs,
+               'render': render,
+               'notebooks': dict(),
+               'curves': dict()}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for file in notebooks:
+            name = os.path.basename(file)
+            results['notebooks'][name] = measure(file, output_dir, runs, render)
+            print_row(name, results['notebooks'][name])
+        for parameter, values in curves.items():
+            points = []
+            for value in values:
+                parameters = dict(BASE_PARAMETERS, **{parameter: value})
+                file = write_notebook(os.path.join(output_dir, 'synthetic.ipynb'), seed=seed, **parameters)
+                point = measure(file, output_dir, runs, render)
+                point['value'] = value
+                points.append(point)
+                print_row(parameter + '=' + str(value), point)
+            results['curves'][parameter] = {'base': BASE_PARAMETERS, 'seed': seed, 'points': points}
+    return results
+
+
+def print_header():
+    print("{:<40} {:>6} {:>6}".format("notebook", "nodes", "edges")
+          + "".join("{:>10}".format(stage) for stage in STAGES) + "{:>10}".format("total"))
+
+
+def print_row(name, result):
+    """
+    :param name: Name of the notebook or point of a curve
+    :param result: Result of measure, the seconds are printed in milliseconds
+    """
+    stages = result['stages']
+    print("{:<40} {:>6} {:>6}".format(name[:40], result['size']['nodes'], result['size']['edges'])
+          + "".join("{:>10.1f}".format(stages[stage] * 1000) if stage in stages else "{:>10}".format("-")
+                    for stage in STAGES)
+          + "{:>10.1f}".format(sum(stages.values()) * 1000), flush=True)
+
+
+def iter_series(results):
+    """
+    :param results: Results of run_benchmark
+    :return: Generator of the name and the result of every notebook and every point of a curve
+    """
+    for name, result in results['notebooks'].items():
+        yield name, result
+    for parameter, curve in results['curves'].items():
+        for point in curve['points']:
+            yield parameter + '=' + str(point['value']), point
+
+
+def strip_timings(results):
+    """
+    :param results: Results of run_benchmark
+    :return: Copy of the results with the sizes only, without the timings and the machine they were measured on
+    """
+    return {'version': results['version'],
+            'notebooks': {name: {'size': result['size']} for name, result in results['notebooks'].items()},
+            'curves': {parameter: dict(curve, points=[{'value': point['value'], 'size': point['size']}
+                                                      for point in curve['points']])
+                       for parameter, curve in results['curves'].items()}}
+
+
+def get_baseline_series(baseline):
+    """
+    :param baseline: Stored results of an earlier run
+    :return: Dictionary with the result of every notebook and every point of a curve of the baseline
+    """
+    if baseline.get('version') != RESULT_VERSION:
+        raise ValueError("Baseline has version " + str(baseline.get('version')) + ", expected "
+                         + str(RESULT_VERSION))
+    return dict(iter_series(baseline))
+
+
+def compare_sizes(results, baseline):
+    """
+    Compares the size of every notebook and every point of a curve with the baseline. The analysis is deterministic,
+    so every difference is reported. Notebooks and points which are missing in one of both are skipped.
+
+    :param results: Results of run_benchmark
+    :param baseline: Stored results of an earlier run
+    :return: List of tuples of the series, the counted item, the count of the baseline and the current count
+    """
+    baseline_series = get_baseline_series(baseline)
+    changes = []
+    for name, result in iter_series(results):
+        if name not in baseline_series:
+            continue
+        for key, count in result['size'].items():
+            before = baseline_series[name]['size'].get(key)
+            if before is not None and count != before:
+                changes.append((name, key, before, count))
+    return changes
+
+
+def compare(results, baseline, threshold=1.25, min_seconds=0.005):
+    """
+    Compares every stage of the results with the same stage of the baseline. Notebooks and points which are missing
+    in one of both, or which have no timings in the baseline, are skipped.
+
+    :param results: Results of run_benchmark
+    :param baseline: Stored results of an earlier run
+    :param threshold: Ratio of the seconds above which a stage counts as regression
+    :param min_seconds: Stages faster than this in both runs are not compared, their timings are mostly noise
+    :return: List of tuples of the series, the stage, the seconds of the baseline and the current seconds
+    """
+    baseline_series = get_baseline_series(baseline)
+    regressions = []
+    for name, result in iter_series(results):
+        if name not in baseline_series:
+            continue
+        for stage, seconds in result['stages'].items():
+            before = baseline_series[name].get('stages', dict()).get(stage)
+            if before is None or max(before, seconds) < min_seconds:
+                continue
+            if seconds > before * threshold:
+                regressions.append((name, stage, before, seconds))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the stages of the visualization.")
+    parser.add_argument("--notebooks", nargs="*", default=None,
+                        help="Notebooks to measure, defaults to every notebook of the notebooks folder.")
+    parser.add_argument("--curves", nargs="*", default=list(CURVES),
+                        help="Parameters of the synthetic notebooks to vary, e.g. cells or cells=10,100,1000.")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Runs per notebook, the fastest run of every stage is kept.")
+    parser.add_argument("--no-render", action="store_true",
+                        help="Skip the layout and the drawing.")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the synthetic notebooks.")
+    parser.add_argument("--output", default=None,
+                        help="Write the results as JSON, e.g. to store them as baseline.")
+    parser.add_argument("--sizes-only", action="store_true",
+                        help="Write only the sizes and no timings with --output, e.g. to update "
+                             "benchmarks/baseline.json.")
+    parser.add_argument("--baseline", default=None,
+                        help="Results of an earlier run to compare with.")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="Ratio of the seconds above which a stage counts as regression.")
+    parser.add_argument("--min-ms", type=float, default=5.0,
+                        help="Stages faster than this in milliseconds are not compared.")
+    args = parser.parse_args(argv)
+
+    notebooks = args.notebooks
+    if notebooks is None:
+        notebooks = sorted(os.path.join(NOTEBOOK_DIR, file) for file in os.listdir(NOTEBOOK_DIR)
+                           if file.endswith('.ipynb'))
+    print_header()
+    results = run_benchmark(notebooks, parse_curves(args.curves), runs=args.runs, render=not args.no_render,
+                            seed=args.seed)
+    if args.output is not None:
+        with open(args.output, 'w') as fp:
+            json.dump(strip_timings(results) if args.sizes_only else results, fp, indent=1)
+    if args.baseline is not None:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        changes = compare_sizes(results, baseline)
+        for name, key, before, count in changes:
+            print("Changed size: " + name + " " + key + " " + str(before) + " -> " + str(count))
+        regressions = compare(results, baseline, args.threshold, args.min_ms / 1000)
+        for name, stage, before, seconds in regressions:
+            print("Regression: " + name + " " + stage + " " + str(round(before * 1000, 1)) + "ms -> "
+                  + str(round(seconds * 1000, 1)) + "ms (" + str(round(seconds / before, 2)) + "x)")
+        if changes or regressions:
+            sys.exit(1)
+        print("No regressions against " + args.baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Measures the queries of slice_index.py. The indexes of the notebooks are built into a temporary folder, loaded again by
+a new store and queried for the definitions, uses and both slices of every variable. A synthetic notebook with many
+cells shows the queries on a large notebook.
+
+Run from the project folder: python -m benchmarks.bench_slice_index [--notebook PATH ...] [--cells 500]
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from benchmarks.synthetic_notebook import write_notebook
+from data_tracing.process_kernels import NOTEBOOK_DIR
+from data_tracing.slice_index import SliceStore
+
+
+def time_queries(index):
+    """
+    :param index: SliceIndex
+    :return: Number of queries and the mean and maximal seconds of one query
+    """
+    timings = []
+    for variable in list(index.statements_by_variable):
+        for query in (index.definitions, index.uses, index.backward_slice, index.forward_slice):
+            start = time.perf_counter()
+            query(variable)
+            timings.append(time.perf_counter() - start)
+    if not timings:
+        return 0, 0.0, 0.0
+    return len(timings), sum(timings) / len(timings), max(timings)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark of the slice index.")
+    parser.add_argument("--notebook", nargs="+", default=sorted(glob.glob(os.path.join(NOTEBOOK_DIR, '*.ipynb'))))
+    parser.add_argument("--cells", type=int, default=500,
+                        help="Cells of the synthetic notebook, 0 leaves it out.")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as folder:
+        files = list(args.notebook)
+        if args.cells > 0:
+            files.append(write_notebook(os.path.join(folder, 'synthetic_' + str(args.cells) + '.ipynb'),
+                                        cells=args.cells, statements=10, variables=50, depth=2, seed=0))
+        index_dir = os.path.join(folder, 'slices')
+        print("{:>48} {:>10} {:>8} {:>10} {:>10} {:>8} {:>10} {:>10}".format(
+            "notebook", "statements", "flows", "build ms", "load ms", "queries", "mean us", "max us"))
+        for file in files:
+            start = time.perf_counter()
+            SliceStore(index_dir).get(file)
+            build_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            index = SliceStore(index_dir).get(file)
+            load_seconds = time.perf_counter() - start
+            count, mean, maximum = time_queries(index)
+            print("{:>48} {:>10} {:>8} {:>10.1f} {:>10.2f} {:>8} {:>10.1f} {:>10.1f}".format(
+                os.path.basename(file)[-48:], len(index.statements), sum(map(len, index.successors)),
+                build_seconds * 1000, load_seconds * 1000, count, mean * 1e6, maximum * 1e6))
+
+
+if __name__ == "__main__":
+    main()
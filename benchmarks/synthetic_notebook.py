@@ -0,0 +1,158 @@
+"""
+Generates notebooks with a controlled size for the benchmarks: the number of code cells, the number of top level
+statements per cell, the number of distinct variables and the nesting depth of if and for blocks. The same
+parameters and seed always give the same notebook.
+
+Run from the project folder: python -m benchmarks.synthetic_notebook OUTPUT [--cells 20] [--statements 10] ...
+"""
+import argparse
+import json
+import random
+
+# Share of the statements which open an if or for block, as long as the depth allows it
+BLOCK_RATIO = 0.25
+# Statements in the body of a block
+BLOCK_STATEMENTS = (1, 3)
+OPERATORS = ('+', '-', '*', '/')
+FUNCTIONS = ('len', 'sum', 'max')
+
+
+class SourceGenerator:
+    """
+    Class to generate the source of the cells. Variables are only read after they were assigned in an earlier
+    statement, so the data flow extraction finds a def-use chain for every read.
+    """
+
+    def __init__(self, statements=10, variables=20, depth=1, seed=0):
+        """
+        :param statements: Top level statements per cell
+        :param variables: Number of distinct variable names
+        :param depth: Maximal nesting depth of if and for blocks, 0 generates straight line code
+        :param seed: Seed of the random generator
+        """
+        self.statements = statements
+        self.variables = max(1, variables)
+        self.depth = depth
+        self.random = random.Random(seed)
+        self.defined = []
+
+    def target(self):
+        """
+        :return: Name of the variable assigned by a statement
+        """
+        return 'v' + str(self.random.randrange(self.variables))
+
+    def operand(self):
+        """
+        :return: Defined variable or a constant if nothing is defined yet
+        """
+        if self.defined and self.random.random() < 0.8:
+            return self.random.choice(self.defined)
+        return str(self.random.randint(1, 9))
+
+    def define(self, name):
+        """
+        :param name: Variable which is assigned, later statements may read it
+        """
+        if name not in self.defined:
+            self.defined.append(name)
+
+    def expression(self):
+        """
+        :return: Binary expression or call over defined variables
+        """
+        if self.random.random() < 0.3:
+            return self.random.choice(FUNCTIONS) + '([' + self.operand() + ', ' + self.operand() + '])'
+        return self.operand() + ' ' + self.random.choice(OPERATORS) + ' ' + self.operand()
+
+    def statement(self, indent, depth):
+        """
+        :param indent: Indentation of the statement
+        :param depth: Remaining nesting depth
+        :return: Lines of one statement, a block with its body counts as one statement
+        """
+        roll = self.random.random()
+        if depth > 0 and roll < BLOCK_RATIO:
+            if self.random.random() < 0.5:
+                header = indent + 'if ' + self.operand() + ' > ' + self.operand() + ':'
+            else:
+                name = self.target()
+                header = indent + 'for ' + name + ' in range(' + self.operand() + '):'
+                self.define(name)
+            lines = [header]
+            for _ in range(self.random.randint(*BLOCK_STATEMENTS)):
+                lines.extend(self.statement(indent + '    ', depth - 1))
+            return lines
+        if roll < 0.85:
+            expression = self.expression()
+            name = self.target()
+            self.define(name)
+            return [indent + name + ' = ' + expression]
+        return [indent + 'print(' + self.operand() + ', ' + self.operand() + ')']
+
+    def cell(self, first=False):
+        """
+        :param first: The first cell starts with imports
+        :return: Source of one cell
+        """
+        lines = ['import math', 'import numpy as np'] if first else []
+        for _ in range(self.statements):
+            lines.extend(self.statement('', self.depth))
+        return '\n'.join(lines)
+
+
+def generate_sources(cells=20, statements=10, variables=20, depth=1, seed=0):
+    """
+    :param cells: Number of code cells
+    :param statements: Top level statements per cell
+    :param variables: Number of distinct variable names
+    :param depth: Maximal nesting depth of if and for blocks
+    :param seed: Seed of the random generator
+    :return: List with the source of every cell
+    """
+    generator = SourceGenerator(statements, variables, depth, seed)
+    return [generator.cell(first=i == 0) for i in range(cells)]
+
+
+def notebook_json(sources):
+    """
+    :param sources: Source of every code cell
+    :return: Notebook in the format of nbformat 4
+    """
+    return {
+        'cells': [{'cell_type': 'code', 'execution_count': i + 1, 'id': 'cell-' + str(i), 'metadata': {},
+                   'outputs': [], 'source': source.splitlines(keepends=True)} for i, source in enumerate(sources)],
+        'metadata': {'language_info': {'name': 'python'}},
+        'nbformat': 4,
+        'nbformat_minor': 5,
+    }
+
+
+def write_notebook(file, **parameters):
+    """
+    Generates a notebook and writes it into a file.
+
+    :param file: Path of the notebook
+    :param parameters: Parameters of generate_sources
+    :return: Path of the notebook
+    """
+    with open(file, 'w', encoding='utf-8') as fp:
+        json.dump(notebook_json(generate_sources(**parameters)), fp, indent=1)
+    return file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a notebook of a given size for the benchmarks.")
+    parser.add_argument("output", help="Path of the notebook.")
+    parser.add_argument("--cells", type=int, default=20)
+    parser.add_argument("--statements", type=int, default=10)
+    parser.add_argument("--variables", type=int, default=20)
+    parser.add_argument("--depth", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    write_notebook(args.output, cells=args.cells, statements=args.statements, variables=args.variables,
+                   depth=args.depth, seed=args.seed)
+
+
+if __name__ == "__main__":
+    main()
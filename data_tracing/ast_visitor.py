@@ -0,0 +1,196 @@
+import ast
+from collections import deque
+
+from data_tracing.extract_cfg import BODY_FIELDS
+from data_tracing.symbol_table import BINDING_NODES, SCOPE_NODES, SymbolTable
+
+# Return false if node is from type ast.Load, ast.Store, ast.operator or ast.unaryop
+type_check_ld_st = lambda arg: not (isinstance(arg, ast.Load)
+                                    or isinstance(arg, ast.Store)
+                                    or isinstance(arg, ast.operator)
+                                    or isinstance(arg, ast.unaryop))
+
+
+class AstVisitor:
+    """
+    Class to collect everything the extraction stages need from the ast of one cell in a single traversal: the nodes
+    and edges of the ast, the names in walk order, the names shown in the table of every statement, the aliases, the
+    statement of the control flow every name belongs to and the scope of every name.
+
+    The traversal is iterative and uses a FIFO work list, so deeply nested expressions do not hit the recursion limit
+    and the names are visited in the same order as with ast.walk.
+    """
+
+    def __init__(self, cfg_nodes=()):
+        """
+        :param cfg_nodes: Statements of the control flow of the cell, see ControlFlowExtractor.get_nodes
+        """
+        self.cfg_nodes = set(cfg_nodes)
+        # Statements in the order they are looked up, the first statement claiming a name wins
+        self.cfg_position = {node: pos for pos, node in
+                             enumerate(sorted(cfg_nodes, key=lambda elem: (elem.lineno, elem.col_offset)))}
+
+        # LIST( node: ast.AST ), nodes of the ast without ctx and operators
+        self.node_list = []
+        # LIST( TUPLE( node: ast.AST, node: ast.AST ) ), edges of the ast without the body of function definitions
+        self.edge_list = []
+        # LIST( node: ast.Name ) in the order of ast.walk
+        self.name_list = []
+        # DICT( identifier: count )
+        self.name_count = dict()
+        # LIST( str ), names or asnames of all imported aliases
+        self.alias_list = []
+        # DICT( statement: LIST( node: ast.Name ) ), names in the table of ast.Assign, ast.Expr, ast.Return, ast.If and
+        # ast.For
+        self.statement_names = dict()
+        # DICT( statement: LIST( node: ast.Name ) ), names in the targets of ast.Assign
+        self.target_names = dict()
+        # DICT( node: ast.Name, statement ), statement of the control flow every name belongs to
+        self.parent_by_node = dict()
+        # DICT( identifier: statement ), statement of the first name with the identifier
+        self.parent_by_id = dict()
+        self._parent_by_id_rank = dict()
+        # DICT( statement: LIST( node: ast.Name ) ), global names of every statement of the control flow without the
+        # names of the statements nested in its body, in the order of ast.walk
+        self.flow_names = dict()
+        # SET( node: ast.Name ), names of the functions called by their name
+        self.call_names = set()
+        self.symbols = SymbolTable()
+        # LIST( node: ast.Name ), names of global variables in the order of ast.walk, see SymbolTable
+        self.global_names = []
+
+    def visit(self, ast_cell):
+        """
+        Traverses the ast of the cell once.
+
+        :param ast_cell: ast of one cell
+        :return: The visitor itself
+        """
+        target_groups = dict()
+        symbols = self.symbols
+        # Work item: node, table owner, index of the assign target, claim of the control flow statement, innermost
+        # statement of the control flow, scope of the node
+        work = deque([(ast_cell, None, None, None, None, symbols.get_module_scope(ast_cell))])
+        while work:
+            nd, owner, target, claim, statement, scope = work.popleft()
+
+            self.node_list.append(nd)
+
+            if isinstance(nd, ast.Name):
+                self.add_name(nd, owner, target, claim, target_groups)
+                symbols.add_name(nd, scope)
+                if statement is not None:
+                    self.flow_names.setdefault(statement, []).append(nd)
+            elif isinstance(nd, ast.Call):
+                if isinstance(nd.func, ast.Name):
+                    self.call_names.add(nd.func)
+            elif isinstance(nd, BINDING_NODES):
+                symbols.add_binding(nd, scope)
+                if isinstance(nd, ast.alias):
+                    self.alias_list.append(nd.asname if nd.asname is not None else nd.name)
+            opens_scope = isinstance(nd, SCOPE_NODES)
+
+            is_cfg_node = nd in self.cfg_nodes
+            if is_cfg_node:
+                statement = nd
+            if is_cfg_node and isinstance(nd, (ast.Assign, ast.Expr, ast.Return, ast.If, ast.For)):
+                self.statement_names[nd] = []
+                if isinstance(nd, ast.Assign):
+                    self.target_names[nd] = []
+                    target_groups[nd] = []
+
+            for field, value in ast.iter_fields(nd):
+                children = value if isinstance(value, list) else [value]
+                for i, child in enumerate(children):
+                    if not isinstance(child, ast.AST) or not type_check_ld_st(child):
+                        continue
+                    # Skip the edges of the body of function definitions
+                    if not (isinstance(nd, ast.FunctionDef) and field == 'body'):
+                        self.edge_list.append((nd, child))
+                    child_owner, child_target = self.get_owner(nd, is_cfg_node, field, i, owner, target)
+                    child_claim = claim
+                    if claim is None and is_cfg_node:
+                        child_claim = self.get_claim(nd, field, i)
+                    child_scope = symbols.get_child_scope(nd, field, scope) if opens_scope else scope
+                    work.append((child, child_owner, child_target, child_claim, statement, child_scope))
+
+        for statement, groups in target_groups.items():
+            # Names of the targets in the order of ast.walk per target
+            groups.sort(key=lambda elem: elem[0])
+            self.target_names[statement] = [name for _, name in groups]
+
+        # Local names of functions, lambdas, classes and comprehensions do not take part in the data flow
+        symbols.resolve()
+        if symbols.local_scope:
+            self.global_names = [nd for nd in self.name_list if symbols.is_global(nd)]
+            for names in self.flow_names.values():
+                names[:] = [nd for nd in names if symbols.is_global(nd)]
+        else:
+            self.global_names = self.name_list
+        return self
+
+    def add_name(self, nd, owner, target, claim, target_groups):
+        """
+        Records a ast.Name in every index.
+
+        :param nd: ast.Name
+        :param owner: Statement whose table contains the name or None
+        :param target: Index of the assign target the name belongs to or None
+        :param claim: Tuple of rank and statement of the control flow the name belongs to or None
+        :param target_groups: Names of the targets of every ast.Assign with the index of the target
+        """
+        self.name_list.append(nd)
+        self.name_count[nd.id] = self.name_count.get(nd.id, 0) + 1
+        if owner is not None:
+            if target is not None:
+                target_groups[owner].append((target, nd))
+            else:
+                self.statement_names[owner].append(nd)
+        if claim is not None:
+            rank, parent = claim
+            self.parent_by_node[nd] = parent
+            if nd.id not in self._parent_by_id_rank or rank < self._parent_by_id_rank[nd.id]:
+                self._parent_by_id_rank[nd.id] = rank
+                self.parent_by_id[nd.id] = parent
+
+    @staticmethod
+    def get_owner(nd, is_cfg_node, field, i, owner, target):
+        """
+        Determines the statement whose table contains the child. ast.Assign, ast.Expr and ast.Return contain all names
+        below them, ast.If only the names of its test and ast.For only the names outside of its body and else branch.
+
+        :return: Tuple of the owner and the index of the assign target of the child
+        """
+        if not is_cfg_node:
+            return owner, target
+        if isinstance(nd, ast.Assign):
+            return nd, (i if field == 'targets' else None)
+        elif isinstance(nd, (ast.Expr, ast.Return)):
+            return nd, None
+        elif isinstance(nd, ast.If):
+            return (nd, None) if field == 'test' else (None, None)
+        elif isinstance(nd, ast.For):
+            return (None, None) if field in BODY_FIELDS else (nd, None)
+        return owner, target
+
+    def get_claim(self, nd, field, i):
+        """
+        Determines the statement of the control flow the names below a child belong to. The outermost statement
+        claiming a name wins, ties between statements are resolved by the position of the statement and the
+        position of the child.
+
+        :return: Tuple of rank and statement or None if the statement does not claim the names of the child
+        """
+        pos = self.cfg_position[nd]
+        if isinstance(nd, ast.If):
+            # If variable is in test then it can't be in the body or "orelse" part.
+            if field == 'body':
+                return (pos, i), nd.body[i]
+            elif field == 'orelse':
+                return (pos, len(nd.body) + i), nd.orelse[i]
+            return (pos, len(nd.body) + len(nd.orelse)), nd
+        elif field in BODY_FIELDS:
+            # Names of the body of loops, functions, with, try, match and class statements belong to the statements of
+            # the body, the decorators, defaults and annotations of functions belong to the function definition
+            return None
+        return (pos, 0), nd
@@ -0,0 +1,359 @@
+"""
+Runs the visualization over whole folders of notebooks, e.g. the kernels pulled by get_kernels.py. Every notebook
+is analyzed in its own worker process, so a failing or hanging notebook does not stop the remaining ones.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from multiprocessing.connection import wait
+
+from data_tracing.instrumentation import create_profiler
+from data_tracing.kernel_index import KernelIndex
+from data_tracing.process_kernels import NotebookAnalyzer, NOTEBOOK_DIR, OUTPUT_DIR, FORMATS, OVERVIEW_MODES, \
+    add_cache_args, add_data_flow_args, add_overview_args, add_profile_args, add_render_args, create_cache, \
+    create_renderer
+from data_tracing.render_graph import GraphRenderer
+
+MANIFEST_FILE = 'manifest.jsonl'
+SUMMARY_FILE = 'summary.json'
+
+
+def find_notebooks(path):
+    """
+    Walks the folder and yields every notebook in it.
+
+    :param path: Folder with the notebooks
+    """
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith('.ipynb'):
+                yield os.path.join(root, file)
+
+
+def read_manifest(file):
+    """
+    Reads the manifest of a previous run. Later records of a notebook replace earlier ones.
+
+    :param file: Path of the manifest
+    :return: Dictionary with the last record for every notebook
+    """
+    records = dict()
+    if not os.path.exists(file):
+        return records
+    with open(file) as fp:
+        for line in fp:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Line of an interrupted write
+                continue
+            records[record['notebook']] = record
+    return records
+
+
+def analyze_notebook(conn, file, output_dir, formats, cache_dir=None, cache_size=512, renderer=None, overview=None,
+                     profile=('off', False), data_flow='reaching'):
+    """
+    Entry point of the worker processes. Analyzes one notebook and sends the result through the pipe.
+
+    :param conn: Sending end of the pipe to the batch runner
+    :param file: Notebook to analyze
+    :param output_dir: Folder the visualization is written to
+    :param formats: Output formats
+    :param cache_dir: Folder of the cell cache shared by all workers or None
+    :param cache_size: Maximal size of the cell cache in MB
+    :param renderer: GraphRenderer drawing the output files, has to draw in this process since workers are daemons
+    :param overview: Show the notebook as overview, None decides by the size of the notebook
+    :param profile: Mode of the profiler and whether cProfile runs, see create_profiler
+    :param data_flow: Extraction of the data flow edges, see DATA_FLOW_MODES
+    """
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        analyzer = NotebookAnalyzer(file, output_dir=output_dir, formats=formats, progress=False,
+                                    cache=create_cache(cache_dir, cache_size),
+                                    renderer=renderer if renderer is not None else GraphRenderer(jobs=1),
+                                    overview=overview, profiler=create_profiler(*profile), data_flow=data_flow)
+        conn.send({'status': 'ok', 'outputs': analyzer.run()})
+    except BaseException as ex:
+        conn.send({'status': 'failed', 'error': type(ex).__name__ + ': ' + str(ex)})
+    finally:
+        conn.close()
+
+
+class BatchRunner:
+    """
+    Class to analyze many notebooks with a pool of worker processes. Every notebook gets its own process, which is
+    terminated once the timeout is exceeded. Finished notebooks are appended to a manifest in the output folder,
+    so an interrupted run can be resumed.
+    """
+
+    def __init__(self, input_dir=NOTEBOOK_DIR, output_dir=OUTPUT_DIR, formats=FORMATS, jobs=None, timeout=300,
+                 retry_failed=False, cache_dir=None, cache_size=512, renderer=None, overview=None, index_file=None,
+                 profile=('off', False), data_flow='reaching'):
+        # With an index the notebooks are taken from the index, paths are relative to its folder
+        self.index_file = index_file
+        if index_file is not None:
+            input_dir = os.path.dirname(os.path.abspath(index_file))
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.formats = formats
+        self.jobs = jobs if jobs else os.cpu_count() or 1
+        self.timeout = timeout
+        self.retry_failed = retry_failed
+        self.cache_dir = cache_dir
+        self.cache_size = cache_size
+        # The workers are daemon processes, so every notebook is drawn in its worker without further processes
+        self.renderer = renderer if renderer is not None else GraphRenderer(jobs=1)
+        # Show the notebooks as overview, None decides by the size of every notebook
+        self.overview = overview
+        # Mode of the profiler of every notebook and whether cProfile runs
+        self.profile = profile
+        # Extraction of the data flow edges of every notebook
+        self.data_flow = data_flow
+        self.manifest_file = os.path.join(output_dir, MANIFEST_FILE)
+        self.summary_file = os.path.join(output_dir, SUMMARY_FILE)
+        self.ctx = multiprocessing.get_context()
+        # Opened index while the notebooks of the index are analyzed
+        self.index = None
+
+    def get_pending(self, notebooks, manifest):
+        """
+        Filters the notebooks which are already recorded in the manifest.
+
+        :param notebooks: Paths of all notebooks
+        :param manifest: Records of the previous runs
+        :return: Paths of the notebooks to analyze
+        """
+        pending = []
+        for file in notebooks:
+            record = manifest.get(self.key(file))
+            if record is None or (self.retry_failed and record['status'] != 'ok'):
+                pending.append(file)
+        return pending
+
+    def key(self, file):
+        """
+        :param file: Path of a notebook
+        :return: Path of the notebook relative to the input folder
+        """
+        return os.path.relpath(file, self.input_dir)
+
+    def start(self, file, index_record=None):
+        """
+        Starts the worker process for one notebook.
+
+        :param file: Notebook to analyze
+        :param index_record: Tuple of the ref and the content hash of the notebook in the index or None
+        :return: Dictionary with the state of the worker
+        """
+        output_dir = os.path.join(self.output_dir, os.path.dirname(self.key(file)))
+        recv_conn, send_conn = self.ctx.Pipe(duplex=False)
+        process = self.ctx.Process(target=analyze_notebook, args=(send_conn, file, output_dir, self.formats,
+                                                                       self.cache_dir, self.cache_size,
+                                                                       self.renderer, self.overview, self.profile,
+                                                                       self.data_flow),
+                                   daemon=True)
+        process.start()
+        send_conn.close()
+        return {'file': file, 'process': process, 'conn': recv_conn, 'start': time.perf_counter(), 'result': None,
+                'received': False, 'index_record': index_record}
+
+    def finish(self, job, manifest_fp, status=None):
+        """
+        Joins the worker process and appends its result to the manifest.
+
+        :param job: Dictionary with the state of the worker
+        :param manifest_fp: Opened manifest file
+        :param status: Overrides the status reported by the worker, e.g. in case of a timeout
+        :return: Record written to the manifest
+        """
+        process = job['process']
+        if status == 'timeout':
+            process.terminate()
+        process.join()
+
+        result = job['result']
+        if not job['received'] and status is None and job['conn'].poll():
+            result = job['conn'].recv()
+        if status is not None:
+            result = {'status': status, 'error': 'Exceeded timeout of ' + str(self.timeout) + 's'}
+        elif result is None:
+            # Worker died without reporting, e.g. a segmentation fault in dot
+            result = {'status': 'crashed', 'error': 'Worker exited with code ' + str(process.exitcode)}
+        job['conn'].close()
+        record = {'notebook': self.key(job['file']),
+                  'seconds': round(time.perf_counter() - job['start'], 3)}
+        record.update(result)
+        manifest_fp.write(json.dumps(record) + '\n')
+        manifest_fp.flush()
+        if job['index_record'] is not None:
+            ref, content_hash = job['index_record']
+            self.index.record_analysis(ref, content_hash, record['status'], record.get('error'))
+        return record
+
+    def run(self, notebooks=None):
+        """
+        Analyzes every notebook of the input folder which is not finished according to the manifest. With an index,
+        the notebooks of the index which were not analyzed with their current content are analyzed instead, without
+        scanning the input folder.
+
+        :param notebooks: Paths of the notebooks, defaults to all notebooks in the input folder
+        :return: Summary of the run
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        if self.index_file is not None:
+            with KernelIndex(self.index_file) as index:
+                self.index = index
+                return self.run_index()
+        if notebooks is None:
+            notebooks = list(find_notebooks(self.input_dir))
+        manifest = read_manifest(self.manifest_file)
+        pending = self.get_pending(notebooks, manifest)
+        return self.run_pending(pending, len(notebooks) - len(pending))
+
+    def run_index(self):
+        """
+        Analyzes the notebooks of the index which are new or changed since their last analysis.
+
+        :return: Summary of the run
+        """
+        pending = self.index.pending_analysis(retry_failed=self.retry_failed)
+        try:
+            return self.run_pending([file for _, file, _ in pending], self.index.count()['kernels'] - len(pending),
+                                    [(ref, content_hash) for ref, _, content_hash in pending])
+        finally:
+            self.index = None
+
+    def run_pending(self, notebooks, skipped, index_records=None):
+        """
+        Analyzes the notebooks with the pool of workers.
+
+        :param notebooks: Paths of the notebooks to analyze
+        :param skipped: Number of notebooks which are skipped, for the summary
+        :param index_records: Tuple of the ref and the content hash of every notebook if it is taken from the index
+        :return: Summary of the run
+        """
+        if index_records is None:
+            index_records = [None] * len(notebooks)
+        pending = deque(zip(notebooks, index_records))
+
+        records = []
+        running = []
+        start = time.perf_counter()
+        with open(self.manifest_file, 'a') as manifest_fp:
+            try:
+                while pending or running:
+                    while pending and len(running) < self.jobs:
+                        running.append(self.start(*pending.popleft()))
+
+                    now = time.perf_counter()
+                    remaining = min(job['start'] + self.timeout - now for job in running)
+                    waitables = [job['conn'] for job in running if not job['received']] \
+                        + [job['process'].sentinel for job in running]
+                    ready = wait(waitables, timeout=max(0.0, remaining))
+
+                    for job in list(running):
+                        if not job['received'] and job['conn'] in ready:
+                            job['received'] = True
+                            try:
+                                job['result'] = job['conn'].recv()
+                            except EOFError:
+                                pass
+                        if job['process'].sentinel in ready:
+                            records.append(self.finish(job, manifest_fp))
+                            running.remove(job)
+                        elif time.perf_counter() - job['start'] > self.timeout:
+                            records.append(self.finish(job, manifest_fp, status='timeout'))
+                            running.remove(job)
+                    print('Finished ' + str(len(records)) + '/' + str(len(records) + len(running) + len(pending)))
+            finally:
+                for job in running:
+                    job['process'].terminate()
+                    job['process'].join()
+
+        summary = self.summarize(records, skipped, time.perf_counter() - start)
+        with open(self.summary_file, 'w') as fp:
+            json.dump(summary, fp, indent=2)
+        return summary
+
+    def summarize(self, records, skipped, seconds):
+        """
+        :param records: Records of the notebooks analyzed in this run
+        :param skipped: Number of notebooks skipped because of the manifest
+        :param seconds: Wall time of the run
+        :return: Dictionary with the throughput and the failures of the run
+        """
+        status_count = dict()
+        for record in records:
+            status_count[record['status']] = status_count.get(record['status'], 0) + 1
+        return {
+            'notebooks': len(records),
+            'skipped': skipped,
+            'status': status_count,
+            'jobs': self.jobs,
+            'wall_seconds': round(seconds, 3),
+            'notebooks_per_second': round(len(records) / seconds, 3) if seconds > 0 else 0.0,
+            'mean_seconds': round(sum(r['seconds'] for r in records) / len(records), 3) if records else 0.0,
+            'failures': [{'notebook': r['notebook'], 'status': r['status'], 'error': r['error']}
+                         for r in records if r['status'] != 'ok'],
+        }
+
+
+def parse_args(argv=None):
+    """
+    Parses the command line arguments.
+
+    :param argv: Arguments, defaults to sys.argv
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Visualize every notebook of a folder with a pool of workers.")
+    parser.add_argument("--input-dir", default=NOTEBOOK_DIR,
+                        help="Folder which is searched recursively for notebooks.")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR,
+                        help="Folder the visualizations, the manifest and the summary are written to.")
+    parser.add_argument("--formats", default=",".join(FORMATS),
+                        help="Comma separated list of output formats, e.g. pdf,png,svg,json.")
+    parser.add_argument("--jobs", type=int, default=None,
+                        help="Number of worker processes, defaults to the number of cores.")
+    parser.add_argument("--timeout", type=float, default=300,
+                        help="Seconds after which the analysis of one notebook is aborted.")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="Analyze notebooks again which failed in a previous run.")
+    parser.add_argument("--index", default=None,
+                        help="SQLite index of get_kernels.py. Only its notebooks which are new or changed since "
+                             "their last analysis are analyzed, the input folder is not scanned.")
+    add_render_args(parser, jobs=False)
+    add_cache_args(parser)
+    add_overview_args(parser, expand=False)
+    add_data_flow_args(parser)
+    add_profile_args(parser)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    formats = tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip())
+    runner = BatchRunner(input_dir=args.input_dir, output_dir=args.output_dir, formats=formats, jobs=args.jobs,
+                         timeout=args.timeout, retry_failed=args.retry_failed, cache_dir=args.cache_dir,
+                         cache_size=args.cache_size, renderer=create_renderer(args, jobs=1),
+                         overview=OVERVIEW_MODES[args.overview], index_file=args.index,
+                         profile=(args.profile, args.cprofile), data_flow=args.data_flow)
+    summary = runner.run()
+    print("Analyzed " + str(summary['notebooks']) + " notebooks (" + str(summary['skipped']) + " skipped) in "
+          + str(summary['wall_seconds']) + "s, " + str(summary['notebooks_per_second']) + " notebooks/s")
+    for status, count in summary['status'].items():
+        print("  " + status + ": " + str(count))
+    for failure in summary['failures']:
+        print("  " + failure['notebook'] + " [" + failure['status'] + "] " + failure['error'])
+    print("EOF")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Persistent cache with the analysis results of single notebook cells. Entries are addressed by a hash of the cell
+source and the tool version, so cells shared by several notebooks or runs are only analyzed once.
+"""
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+
+# Increase whenever the content of the cached entries changes
+TOOL_VERSION = '9'
+
+
+class CellCache:
+    """
+    Class to store pickled per cell results in a folder. The folder is bounded in size, the least recently used
+    entries are evicted first. Several processes may use the same folder at the same time.
+    """
+
+    def __init__(self, path, max_size=512 * 1024 * 1024):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        # Size of the folder, None until it is scanned for the first time
+        self.size = None
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(source):
+        """
+        :param source: Source code of the cell
+        :return: Hash of the source, the tool version and the python version
+        """
+        digest = hashlib.sha256()
+        digest.update((TOOL_VERSION + '$' + str(sys.version_info[:2]) + '$').encode())
+        digest.update(source.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def get_file(self, key):
+        """
+        :param key: Hash of the entry
+        :return: Path of the file of the entry
+        """
+        return os.path.join(self.path, key[:2], key + '.pickle')
+
+    def get(self, source):
+        """
+        Loads the entry of the source.
+
+        :param source: Source code of the cell
+        :return: Entry or None if the source is not cached
+        """
+        file = self.get_file(self.key(source))
+        try:
+            with open(file, 'rb') as fp:
+                entry = pickle.load(fp)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, IndexError):
+            # Entry is corrupt or was written by an incompatible version
+            self.misses += 1
+            self.remove(file)
+            return None
+        # Mark as recently used
+        try:
+            os.utime(file)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry
+
+    def put(self, source, entry):
+        """
+        Stores the entry of the source. Entries which can not be pickled or written, e.g. on a full disk, are skipped.
+
+        :param source: Source code of the cell
+        :param entry: Picklable analysis result of the cell
+        """
+        try:
+            data = pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, RecursionError, TypeError):
+            return
+        file = self.get_file(self.key(source))
+        try:
+            os.makedirs(os.path.dirname(file), exist_ok=True)
+            # Write to a temporary file first, so other processes never read a partially written entry
+            fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(file), suffix='.tmp')
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            os.replace(tmp_file, file)
+        except OSError:
+            # The temporary file is not counted by scan_size, so it must not stay in the folder
+            self.remove(tmp_file)
+            return
+
+        if self.size is None:
+            self.size = self.scan_size()
+        else:
+            self.size += len(data)
+        if self.size > self.max_size:
+            self.evict()
+
+    def entries(self):
+        """
+        Yields path, last access and size of every entry in the folder.
+        """
+        for root, _, files in os.walk(self.path):
+            for file in files:
+                if not file.endswith('.pickle'):
+                    continue
+                path = os.path.join(root, file)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def scan_size(self):
+        """
+        :return: Size of all entries in the folder
+        """
+        return sum(size for _, _, size in self.entries())
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the folder is below 90 % of the maximal size. The margin
+        keeps the folder from being scanned on every put.
+        """
+        entries = sorted(self.entries(), key=lambda elem: elem[1])
+        self.size = sum(size for _, _, size in entries)
+        target = self.max_size * 0.9
+        for path, _, size in entries:
+            if self.size <= target:
+                break
+            self.remove(path)
+            self.size -= size
+
+    def clear(self):
+        """
+        Removes every entry of the cache.
+        """
+        for path, _, _ in list(self.entries()):
+            self.remove(path)
+        self.size = 0
+
+    @staticmethod
+    def remove(file):
+        """
+        :param file: Path of the entry to remove
+        """
+        try:
+            os.remove(file)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,206 @@
+"""
+Layout of large notebooks cell by cell. Every cluster of a cell is laid out on its own, the clusters are placed from
+left to right with their tops aligned, like the rank=same constraint of the cluster heads does in the layout of the
+whole graph. Only the edges between the cells are routed afterwards, every edge around the nodes of the cells it
+spans.
+"""
+from data_tracing.graph_ir import Graph
+
+# Horizontal space between two cells in points
+CELL_GAP = 36
+# Space around the ends of the edges between the cells in which nodes are obstacles of the routes
+ROUTE_MARGIN = 72
+
+
+def get_cell_parts(graph):
+    """
+    Groups the nodes of the graph by the cluster of their cell. Nodes outside of the clusters, e.g. the dummy nodes of
+    the line numbers, belong to the cluster of the nodes they share a subgraph with.
+
+    :param graph: graph_ir.Graph
+    :return: List of the node names of every cluster or None if the graph can not be split into independent clusters
+    """
+    part_of = dict()
+    parts = []
+    for subgraph in graph.subgraphs:
+        if subgraph.name is None or not subgraph.name.startswith('cluster'):
+            continue
+        for name in subgraph.nodes:
+            if name in part_of:
+                # Nested or overlapping clusters
+                return None
+            part_of[name] = len(parts)
+        parts.append(subgraph.nodes)
+
+    for subgraph in graph.subgraphs:
+        if subgraph.name is not None and subgraph.name.startswith('cluster'):
+            continue
+        indices = {part_of[name] for name in subgraph.nodes if name in part_of}
+        if len(indices) > 1:
+            # Constraint between several cells, e.g. rank=same
+            return None
+        for index in indices:
+            for name in subgraph.nodes:
+                part_of.setdefault(name, index)
+
+    if len(part_of) != len(graph.nodes):
+        return None
+    names = [[] for _ in parts]
+    for node in graph.nodes.values():
+        names[part_of[node.name]].append(node.name)
+    return names
+
+
+def get_part_graph(graph, names):
+    """
+    :param graph: graph_ir.Graph
+    :param names: Names of the nodes of one cell
+    :return: Graph of the cell, its edges are identified by the sequence numbers in the whole graph
+    """
+    part = graph.induced(names)
+    # The label of the whole graph is placed once below all cells
+    part.graph_attributes.pop('label', None)
+    # The cell heads are aligned by place_parts. Within a cell the rank constraint conflicts with the cluster, the
+    # nodes of the subgraph are kept at the top rank by ignoring its edges in the ranking instead.
+    for subgraph in list(part.subgraphs):
+        if subgraph.name is None and subgraph.attributes.get('rank') == 'same':
+            part.subgraphs.remove(subgraph)
+            for seq in subgraph.edges:
+                part.edges[seq].attributes['constraint'] = 'false'
+    internal = graph.induced_edges([graph.nodes[name] for name in names])
+    for edge, part_edge in zip(internal, part.edges):
+        part_edge.attributes['id'] = 'e' + str(edge.seq)
+    return part
+
+
+def translate_points(value, dx, dy):
+    """
+    :param value: Point "x,y" or spline "e,x,y s,x,y x,y ..." of Graphviz
+    :return: Translated value
+    """
+    points = []
+    for point in value.split():
+        prefix = ''
+        if point.startswith(('e,', 's,')):
+            prefix, point = point[:2], point[2:]
+        x, y = point.split(',')[:2]
+        points.append(prefix + str(round(float(x) + dx, 3)) + ',' + str(round(float(y) + dy, 3)))
+    return ' '.join(points)
+
+
+def translate_box(value, dx, dy):
+    """
+    :param value: Bounding box "llx,lly,urx,ury" of Graphviz
+    :return: Translated value
+    """
+    llx, lly, urx, ury = (float(elem) for elem in value.split(','))
+    return ','.join(str(round(elem, 3)) for elem in (llx + dx, lly + dy, urx + dx, ury + dy))
+
+
+def get_node_box(node):
+    """
+    :param node: GraphNode with the position and size of the layout
+    :return: Bounding box of the node in points
+    """
+    x, y = (float(elem) for elem in node.attributes['pos'].split(',')[:2])
+    width = float(node.attributes['width']) * 36
+    height = float(node.attributes['height']) * 36
+    return x - width, y - height, x + width, y + height
+
+
+def get_box(boxes, margin=0):
+    """
+    :param boxes: Bounding boxes
+    :param margin: Space added on every side in points
+    :return: Bounding box of all boxes
+    """
+    return (min(box[0] for box in boxes) - margin, min(box[1] for box in boxes) - margin,
+            max(box[2] for box in boxes) + margin, max(box[3] for box in boxes) + margin)
+
+
+def place_parts(graph, parts, layouts):
+    """
+    Places the laid out cells from left to right, the tops of the cells are aligned.
+
+    :param graph: graph_ir.Graph
+    :param parts: Node names of every cell, see get_cell_parts
+    :param layouts: Layout of every cell in the json0 format of Graphviz
+    :return: Copy of the graph with the positions of the nodes, of the edges within the cells and of the clusters
+    """
+    placed = graph.copy()
+    boxes = [[float(elem) for elem in layout['bb'].split(',')] for layout in layouts]
+    top = max(ury - lly for llx, lly, urx, ury in boxes)
+    x = 0.0
+    for layout, (llx, lly, urx, ury) in zip(layouts, boxes):
+        dx = x - llx
+        dy = top - ury
+        objects = layout.get('objects', [])
+        for obj in objects:
+            if 'nodes' in obj or 'edges' in obj:
+                subgraph = placed.subgraph_by_name.get(obj['name'])
+                if subgraph is not None and 'bb' in obj:
+                    subgraph.attributes['bb'] = translate_box(obj['bb'], dx, dy)
+                    if 'lp' in obj:
+                        subgraph.attributes['lp'] = translate_points(obj['lp'], dx, dy)
+            elif 'pos' in obj:
+                node = placed.nodes[obj['name']]
+                node.attributes['pos'] = translate_points(obj['pos'], dx, dy)
+                node.attributes['width'] = obj['width']
+                node.attributes['height'] = obj['height']
+        for obj in layout.get('edges', []):
+            if 'pos' in obj:
+                placed.edges[int(obj['id'][1:])].attributes['pos'] = translate_points(obj['pos'], dx, dy)
+        x += urx - llx + CELL_GAP
+    placed.graph_attributes['bb'] = translate_box('0,0,' + str(max(x - CELL_GAP, 0)) + ',' + str(top), 0, 0)
+    return placed
+
+
+def get_route_graphs(placed, parts):
+    """
+    Groups the edges without positions, i.e. the edges between the cells, by the range of cells they span. The
+    router of Graphviz is superlinear in the number of nodes, so every group is routed in a graph with only the
+    nodes of its cells.
+
+    :param placed: graph_ir.Graph with the positions of the nodes, see place_parts
+    :param parts: Node names of every cell, see get_cell_parts
+    :return: List of graphs with the positioned nodes and the edges to route, identified by their sequence numbers
+    """
+    part_of = {name: index for index, names in enumerate(parts) for name in names}
+    # DICT( (first cell, last cell): LIST( edges ) )
+    spans = dict()
+    for edge in placed.edges:
+        if 'pos' not in edge.attributes:
+            first, last = sorted((part_of[edge.tail], part_of[edge.head]))
+            spans.setdefault((first, last), []).append(edge)
+
+    graphs = []
+    for (first, last), edges in spans.items():
+        attributes = {key: value for key, value in placed.graph_attributes.items() if key not in ('label', 'bb')}
+        # Keep the coordinates of the whole graph
+        route = Graph(placed.name, placed.directed, placed.strict, notranslate='true', **attributes)
+        route.node_defaults = dict(placed.node_defaults)
+        route.edge_defaults = dict(placed.edge_defaults)
+        ends = {edge.tail for edge in edges} | {edge.head for edge in edges}
+        # Only the nodes around the ends of the edges are obstacles of the routes
+        llx, lly, urx, ury = get_box([get_node_box(placed.nodes[name]) for name in ends], ROUTE_MARGIN)
+        for names in parts[first:last + 1]:
+            for name in names:
+                node = placed.nodes[name]
+                box = get_node_box(node)
+                if name in ends or (box[0] < urx and box[2] > llx and box[1] < ury and box[3] > lly):
+                    route.add_node(name, **node.attributes)
+        for edge in edges:
+            route.add_edge(edge.tail, edge.head, id='e' + str(edge.seq), **edge.attributes)
+        graphs.append(route)
+    return graphs
+
+
+def set_routes(placed, layouts):
+    """
+    :param placed: graph_ir.Graph, see place_parts
+    :param layouts: Layout of every graph of get_route_graphs in the json0 format of Graphviz
+    """
+    for layout in layouts:
+        for obj in layout.get('edges', []):
+            if 'pos' in obj:
+                placed.edges[int(obj['id'][1:])].attributes['pos'] = obj['pos']
@@ -1,216 +1,377 @@
-import ast
-
-
-class ControlFlowExtractor:
-    """
-    Class to extract the control based on an AST.
-    """
-
-    def __init__(self, fan_out=1000):
-        self.fan_out = fan_out
-        self.edge_list_cfg = []
-        self.false_list = []
-        self.true_list = []
-
-    def get_nodes(self, skip_module=False):
-        """
-
-        :return:
-        """
-        temp = set()
-        for ((x, y), attr) in self.edge_list_cfg:
-            if skip_module:
-                if isinstance(x, ast.Module):
-                    # y can never be of instance ast.Module
-                    temp.add(y)
-                    continue
-                else:
-                    temp.add(x)
-                    temp.add(y)
-            else:
-                temp.add(x)
-                temp.add(y)
-        return list(temp)
-
-    def get_edge_list(self, with_attributes=True):
-        """
-
-        :param with_attributes:
-        :return:
-        """
-
-        if with_attributes:
-            return self.edge_list_cfg
-        else:
-            temp = []
-            for ((x, y), _) in self.edge_list_cfg:
-                temp.append((x, y))
-            return temp
-
-    def extract_CFG(self, nd: ast.AST):
-        """
-
-        :param nd:
-        """
-        self.edge_list_cfg.clear()
-        attr_edges_dict = {'color': '#00e629', 'weight': str(self.fan_out), 'style': 'invis'}
-        if isinstance(nd, ast.Module):
-            body = nd.__dict__['body']
-            if len(body) > 0:
-                self.edge_list_cfg.append(((nd, body[0]), attr_edges_dict.copy()))
-                # lst = self.create_CFG(body)
-                self.create_CFG(body)
-            else:
-                print('Empty file')
-        else:
-            print('No module found')
-
-    def create_CFG(self, body: list):
-        """
-
-        :param body:
-        :return:
-        """
-        for i in range(0, len(body)):
-            attr_edges_dict = {'color': '#00e629', 'weight': str(self.fan_out), 'style': 'invis'}
-            nd_curr = body[i]
-            if isinstance(nd_curr, ast.Assign) or isinstance(nd_curr, ast.AnnAssign) \
-                    or isinstance(nd_curr, ast.AugAssign):
-                if i == len(body) - 1:
-                    return [body[i]]
-                else:
-                    self.edge_list_cfg.append(((nd_curr, body[i + 1]), attr_edges_dict))
-            elif isinstance(nd_curr, ast.Expr):
-                exit_nodes = self.get_exit_nodes_EXPR(nd_curr)
-                if i == len(body) - 1:
-                    return exit_nodes
-                else:
-                    for exit_node in exit_nodes:
-                        self.edge_list_cfg.append(((exit_node, body[i + 1]), attr_edges_dict))
-            elif isinstance(nd_curr, ast.FunctionDef):
-                exit_nodes = self.get_exit_nodes_FUNCTION(nd_curr)
-                if i == len(body) - 1:
-                    return exit_nodes
-                else:
-                    for exit_node in exit_nodes:
-                        self.edge_list_cfg.append(((exit_node, body[i + 1]), attr_edges_dict))
-            elif isinstance(nd_curr, ast.If):
-                exit_nodes = self.get_exit_nodes_IF(nd_curr)
-                if i == len(body) - 1:
-                    return exit_nodes
-                else:
-                    break_nodes = []
-                    for exit_node in exit_nodes:
-                        if not isinstance(exit_node, ast.Break):
-                            if isinstance(exit_node, ast.Continue):
-                                break_nodes.append(exit_node)
-                            else:
-                                self.edge_list_cfg.append(((exit_node, body[i + 1]), attr_edges_dict))
-                        else:
-                            break_nodes.append(exit_node)
-                    if len(break_nodes) > 0:
-                        return break_nodes
-            elif isinstance(nd_curr, ast.While) or isinstance(nd_curr, ast.For):
-                exit_nodes = self.get_exit_nodes_WHILE(nd_curr)
-                if i == len(body) - 1:
-                    return exit_nodes
-                else:
-                    for exit_node in exit_nodes:
-                        self.edge_list_cfg.append(((exit_node, body[i + 1]), attr_edges_dict))
-                    # attr_edges_dict = dict()
-                    # attr_edges_dict['constraint'] = 'False'
-                    # attr_edges_dict['label'] = 'skip'
-                    # attr_edges_dict['color'] = '#00e629'
-                    # self.edge_list_cfg.append(((nd_curr, body[i + 1]), attr_edges_dict))
-            elif isinstance(nd_curr, ast.Break):
-                return [nd_curr]
-            elif isinstance(nd_curr, ast.Continue):
-                return [nd_curr]
-            elif isinstance(nd_curr, ast.Return):
-                return [nd_curr]
-            elif isinstance(nd_curr, ast.Import) or isinstance(nd_curr, ast.ImportFrom):
-                if i == len(body) - 1:
-                    return [body[i]]
-                else:
-                    self.edge_list_cfg.append(((nd_curr, body[i + 1]), attr_edges_dict))
-
-    def get_exit_nodes_EXPR(self, nd: ast.Expr):
-        """
-
-        :param nd:
-        :return:
-        """
-        # attr_edges_dict = {'color': '#00e629', 'weight': str(self.fan_out)}
-        # child = nd.__dict__['value']
-        # self.edge_list_cfg.append(((nd, child), attr_edges_dict))
-        return [nd]
-
-    def get_exit_nodes_IF(self, nd: ast.If):
-        """
-
-        :param nd:
-        :return:
-        """
-        exit_nodes = []
-        # attr_edges_dict = {'color': '#00e629', 'style': 'invis'}
-        # test = nd.__dict__['test']
-        # self.edge_list_cfg.append(((nd, test), attr_edges_dict))
-
-        body = nd.__dict__['body']
-        self.true_list.extend(body)
-        lst = self.create_CFG(body)
-        if isinstance(lst, list):
-            exit_nodes = lst
-        attr_edges_dict = dict()
-        attr_edges_dict['weight'] = str(self.fan_out)
-        attr_edges_dict['style'] = "invis"
-        self.edge_list_cfg.append(((nd, body[0]), attr_edges_dict))
-
-        orelse = nd.__dict__['orelse']
-        self.false_list.extend(orelse)
-        if len(orelse) > 0:
-            attr_edges_dict = dict()
-            attr_edges_dict['weight'] = str(self.fan_out)
-            attr_edges_dict['style'] = "invis"
-            self.edge_list_cfg.append(((body[-1], orelse[0]), attr_edges_dict))
-            lst = self.create_CFG(orelse)
-            if isinstance(lst, list):
-                exit_nodes += lst
-        return exit_nodes
-
-    def get_exit_nodes_WHILE(self, nd: ast.While or ast.For):
-        """
-
-        :param nd:
-        :return:
-        """
-        exit_nodes = []
-        attr_edges_dict = {'color': '#00e629', 'style': 'invis'}
-        body = nd.__dict__['body']
-        self.edge_list_cfg.append(((nd, body[0]), attr_edges_dict))
-        lst = self.create_CFG(body)
-        if isinstance(lst, list):
-            exit_nodes = lst
-        for exit_node in exit_nodes:
-            if isinstance(exit_node, ast.Break):
-                continue
-            else:
-                attr_edges_dict_cpy = attr_edges_dict.copy()
-                attr_edges_dict_cpy['constraint'] = 'False'
-                self.edge_list_cfg.append(((exit_node, nd), attr_edges_dict.copy()))
-        return exit_nodes
-
-    def get_exit_nodes_FUNCTION(self, nd: ast.FunctionDef):
-        """
-
-        :param nd:
-        """
-        exit_nodes = []
-        attr_edges_dict = {'color': '#00e629', 'style': 'invis'}
-
-        body = nd.__dict__['body']
-        self.edge_list_cfg.append(((nd, body[0]), attr_edges_dict))
-        lst = self.create_CFG(body)
-        if isinstance(lst, list):
-            exit_nodes = lst
-        return exit_nodes
+import ast
+
+# Kinds of the edges of the control flow
+NEXT = 'next'
+# Into the body of an if or a loop
+TRUE = 'true'
+# Into the else branch of an if or a loop, or past them if there is no else branch
+FALSE = 'false'
+# From the end of the body of a loop, or a continue, back to the loop
+BACK = 'back'
+# From a break to the statement after the loop
+BREAK = 'break'
+# From the statements of a try block to its handlers and to the finally block
+EXCEPTION = 'exception'
+# From a match to the body of a case
+CASE = 'case'
+# From a function definition into its body, which only runs when the function is called
+CALL = 'call'
+
+# Fields of compound statements which contain statements
+BODY_FIELDS = ('body', 'orelse', 'handlers', 'finalbody', 'cases')
+LOOPS = (ast.While, ast.For, ast.AsyncFor)
+FUNCTIONS = (ast.FunctionDef, ast.AsyncFunctionDef)
+TRY_STATEMENTS = (ast.Try, ast.TryStar) if hasattr(ast, 'TryStar') else (ast.Try,)
+MATCH_STATEMENTS = (ast.Match,) if hasattr(ast, 'Match') else ()
+JUMPS = (ast.Break, ast.Continue, ast.Return, ast.Raise)
+
+
+class BasicBlock:
+    """
+    Sequence of statements which is only entered at its first and only left after its last statement.
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.statements = []
+        self.successors = []
+        self.predecessors = []
+
+    def __repr__(self):
+        lines = [str(statement.lineno) for statement in self.statements if hasattr(statement, 'lineno')]
+        return 'BasicBlock(' + str(self.index) + ', lines ' + ','.join(lines) + ')'
+
+
+class ControlFlowExtractor:
+    """
+    Class to extract the control flow of one cell based on its AST.
+
+    The control flow is kept as adjacency of the statements: successors and predecessors map every statement to its
+    neighbours and the kind of the edge, see NEXT, TRUE, FALSE, ... . Handlers of try blocks are nodes of their own.
+    Basic blocks are built from the adjacency on the first call of get_blocks.
+
+    The drawing does not show the control flow itself, it uses the invisible edges of get_edge_list to place the
+    statements of the cell below each other and the branches of if statements next to each other.
+    """
+
+    def __init__(self, fan_out=1000):
+        self.fan_out = fan_out
+        self.module = None
+        # DICT( statement: None ), all nodes in the order of the source, starting with the module
+        self.nodes = dict()
+        # DICT( statement: DICT( statement: kind ) )
+        self.successors = dict()
+        self.predecessors = dict()
+        # DICT( statement: compound statement or module ), statement whose body contains the statement
+        self.parents = dict()
+        # Statements in the body and in the else branch of an if
+        self.true_nodes = set()
+        self.false_nodes = set()
+        # LIST( TUPLE( statement, kind ) ), edges out of the body of the module, they leave the cell
+        self.exits = []
+        # LIST( TUPLE( TUPLE( node, node ), attributes ) ), edges which order the statements in the drawing
+        self.edge_list_cfg = []
+        self.blocks = None
+        self.block_of = None
+
+    def reset(self):
+        """
+        Forgets the control flow of the previous cell.
+        """
+        self.module = None
+        self.nodes = dict()
+        self.successors = dict()
+        self.predecessors = dict()
+        self.parents = dict()
+        self.true_nodes = set()
+        self.false_nodes = set()
+        self.exits = []
+        self.edge_list_cfg = []
+        self.blocks = None
+        self.block_of = None
+
+    def get_nodes(self, skip_module=False):
+        """
+        :param skip_module: Leave out the module of the cell
+        :return: List of the statements of the cell in the order of the source
+        """
+        if skip_module and self.module is not None:
+            return [node for node in self.nodes if node is not self.module]
+        return list(self.nodes)
+
+    def get_edge_list(self, with_attributes=True):
+        """
+        :param with_attributes: Return the attributes of the drawing with every edge
+        :return: New list of the edges which order the statements in the drawing
+        """
+        if with_attributes:
+            return list(self.edge_list_cfg)
+        return [(x, y) for ((x, y), _) in self.edge_list_cfg]
+
+    def get_flow_edges(self):
+        """
+        :return: List of the edges of the control flow as tuples of source, target and kind
+        """
+        return [(x, y, kind) for x, targets in self.successors.items() for y, kind in targets.items()]
+
+    def is_true(self, node):
+        return node in self.true_nodes
+
+    def is_false(self, node):
+        return node in self.false_nodes
+
+    def extract_CFG(self, nd: ast.AST):
+        """
+        Extracts the control flow of a module, the result of a previous call is discarded.
+
+        :param nd: ast.Module of one cell
+        """
+        self.reset()
+        if not isinstance(nd, ast.Module):
+            print('No module found')
+            return
+        body = nd.__dict__['body']
+        if len(body) == 0:
+            print('Empty file')
+            return
+        self.module = nd
+        self.add_node(nd, None)
+        self.exits = self.flow_body(body, nd, [(nd, NEXT)], None)
+        self.edge_list_cfg.append(((nd, body[0]), self.sequence_attributes()))
+        self.order_body(body)
+
+    def add_node(self, nd, parent):
+        self.nodes[nd] = None
+        self.successors[nd] = dict()
+        self.predecessors[nd] = dict()
+        self.parents[nd] = parent
+
+    def add_edge(self, x, y, kind):
+        # The first kind is kept if two statements are connected twice, e.g. by an empty loop body
+        self.successors[x].setdefault(y, kind)
+        self.predecessors[y].setdefault(x, kind)
+
+    def connect(self, pending, target, kind=None):
+        """
+        :param pending: List of tuples of statement and kind of the edge which is still missing its target
+        :param target: Target of the edges
+        :param kind: Kind which replaces the kinds of the pending edges
+        """
+        for node, pending_kind in pending:
+            self.add_edge(node, target, kind or pending_kind)
+
+    def flow_body(self, body, parent, pending, loop):
+        """
+        Adds the statements of a body to the control flow.
+
+        :param body: List of statements
+        :param parent: Statement or module whose body it is
+        :param pending: Edges into the first statement of the body
+        :param loop: Dictionary with the innermost enclosing loop and its breaks, None outside of loops
+        :return: Edges out of the body into the following statement
+        """
+        for statement in body:
+            self.add_node(statement, parent)
+            self.connect(pending, statement)
+            pending = self.flow_statement(statement, loop)
+        return pending
+
+    def flow_statement(self, nd, loop):
+        """
+        :param nd: Statement which is already part of the control flow
+        :param loop: Dictionary with the innermost enclosing loop and its breaks
+        :return: Edges out of the statement into the following statement
+        """
+        if isinstance(nd, ast.If):
+            self.true_nodes.update(nd.body)
+            self.false_nodes.update(nd.orelse)
+            pending = self.flow_body(nd.body, nd, [(nd, TRUE)], loop)
+            return pending + self.flow_body(nd.orelse, nd, [(nd, FALSE)], loop)
+        elif isinstance(nd, LOOPS):
+            inner = {'loop': nd, 'breaks': []}
+            self.connect(self.flow_body(nd.body, nd, [(nd, TRUE)], inner), nd, BACK)
+            return self.flow_body(nd.orelse, nd, [(nd, FALSE)], loop) + inner['breaks']
+        elif isinstance(nd, ast.Break):
+            if loop is not None:
+                loop['breaks'].append((nd, BREAK))
+            return []
+        elif isinstance(nd, ast.Continue):
+            if loop is not None:
+                self.add_edge(nd, loop['loop'], BACK)
+            return []
+        elif isinstance(nd, (ast.Return, ast.Raise)):
+            return []
+        elif isinstance(nd, TRY_STATEMENTS):
+            return self.flow_try(nd, loop)
+        elif isinstance(nd, (ast.With, ast.AsyncWith)):
+            return self.flow_body(nd.body, nd, [(nd, NEXT)], loop)
+        elif isinstance(nd, MATCH_STATEMENTS):
+            pending = []
+            for case in nd.cases:
+                pending += self.flow_body(case.body, nd, [(nd, CASE)], loop)
+            # No case matched
+            return pending + [(nd, FALSE)]
+        elif isinstance(nd, FUNCTIONS):
+            # The body runs when the function is called, the definition continues with the next statement
+            self.flow_body(nd.body, nd, [(nd, CALL)], None)
+            return [(nd, NEXT)]
+        elif isinstance(nd, ast.ClassDef):
+            # The body of a class runs when the class is defined
+            return self.flow_body(nd.body, nd, [(nd, NEXT)], None)
+        return [(nd, NEXT)]
+
+    def flow_try(self, nd, loop):
+        """
+        Every statement of the try block may raise, so each of them and the try itself are connected to every
+        handler. The finally block follows the try, the else block and the handlers, and the exceptions which are not
+        handled.
+
+        :param nd: ast.Try or ast.TryStar
+        :param loop: Dictionary with the innermost enclosing loop and its breaks
+        :return: Edges out of the finally block, or out of the try, else and handlers without finally block
+        """
+        pending = self.flow_body(nd.body, nd, [(nd, NEXT)], loop)
+        raising = [nd] + nd.body
+        handled = []
+        for handler in nd.handlers:
+            self.add_node(handler, nd)
+            self.connect([(statement, EXCEPTION) for statement in raising], handler)
+            handled += self.flow_body(handler.body, handler, [(handler, NEXT)], loop)
+        pending = self.flow_body(nd.orelse, nd, pending, loop) + handled
+        if nd.finalbody:
+            pending = self.flow_body(nd.finalbody, nd, pending + [(nd, EXCEPTION)], loop)
+        return pending
+
+    def get_blocks(self):
+        """
+        Splits the statements into basic blocks. A block starts at the module, at every statement with no or several
+        predecessors, or a predecessor with several successors, and at the target of every jump, branch or back edge.
+        The bodies of functions start blocks of their own.
+
+        :return: List of the basic blocks, in the order of their first statement
+        """
+        if self.blocks is not None:
+            return self.blocks
+        self.blocks = []
+        self.block_of = dict()
+        for node in self.nodes:
+            predecessors = self.predecessors[node]
+            previous = next(iter(predecessors), None)
+            if len(predecessors) != 1 or predecessors[previous] != NEXT or len(self.successors[previous]) != 1 \
+                    or previous not in self.block_of:
+                block = BasicBlock(len(self.blocks))
+                self.blocks.append(block)
+            else:
+                block = self.block_of[previous]
+            block.statements.append(node)
+            self.block_of[node] = block
+        for block in self.blocks:
+            last = block.statements[-1]
+            for successor, kind in self.successors[last].items():
+                target = self.block_of[successor]
+                block.successors.append((target, kind))
+                target.predecessors.append((block, kind))
+        return self.blocks
+
+    def get_block(self, node):
+        """
+        :param node: Statement of the cell
+        :return: Basic block which contains the statement
+        """
+        self.get_blocks()
+        return self.block_of[node]
+
+    def sequence_attributes(self):
+        return {'color': '#00e629', 'weight': str(self.fan_out), 'style': 'invis'}
+
+    def branch_attributes(self):
+        return {'weight': str(self.fan_out), 'style': 'invis'}
+
+    @staticmethod
+    def body_attributes():
+        return {'color': '#00e629', 'style': 'invis'}
+
+    def order_body(self, body: list):
+        """
+        Adds the edges which place the statements of a body below each other in the drawing.
+
+        :param body: List of statements
+        :return: Statements at the bottom of the body, which are placed above the statement after the body
+        """
+        for i in range(0, len(body)):
+            attr_edges_dict = self.sequence_attributes()
+            nd_curr = body[i]
+            if isinstance(nd_curr, JUMPS):
+                return [nd_curr]
+            exit_nodes = self.order_statement(nd_curr)
+            if i == len(body) - 1:
+                return exit_nodes
+            if isinstance(nd_curr, ast.If):
+                # Jumps out of the branches of an if are not placed above the next statement
+                exit_nodes = [node for node in exit_nodes if not isinstance(node, (ast.Break, ast.Continue))]
+                if not exit_nodes:
+                    exit_nodes = [nd_curr]
+            for exit_node in exit_nodes:
+                self.edge_list_cfg.append(((exit_node, body[i + 1]), attr_edges_dict))
+        return []
+
+    def order_statement(self, nd):
+        """
+        :param nd: Statement which is not a jump
+        :return: Statements at the bottom of the statement
+        """
+        if isinstance(nd, ast.If):
+            exit_nodes = self.order_body(nd.body)
+            self.edge_list_cfg.append(((nd, nd.body[0]), self.branch_attributes()))
+            if len(nd.orelse) > 0:
+                self.edge_list_cfg.append(((nd.body[-1], nd.orelse[0]), self.branch_attributes()))
+                exit_nodes += self.order_body(nd.orelse)
+            return exit_nodes
+        elif isinstance(nd, LOOPS):
+            attr_edges_dict = self.body_attributes()
+            self.edge_list_cfg.append(((nd, nd.body[0]), attr_edges_dict))
+            exit_nodes = self.order_body(nd.body)
+            for exit_node in exit_nodes:
+                if not isinstance(exit_node, ast.Break):
+                    self.edge_list_cfg.append(((exit_node, nd), attr_edges_dict.copy()))
+            if len(nd.orelse) > 0:
+                self.edge_list_cfg.append(((nd.body[-1], nd.orelse[0]), self.branch_attributes()))
+                exit_nodes += self.order_body(nd.orelse)
+            return exit_nodes
+        elif isinstance(nd, TRY_STATEMENTS):
+            self.edge_list_cfg.append(((nd, nd.body[0]), self.body_attributes()))
+            exit_nodes = self.order_body(nd.body)
+            # Handlers, else and finally block are placed below each other after the try block
+            last = nd.body[-1]
+            for handler in nd.handlers:
+                self.order_after(exit_nodes, handler, last)
+                self.edge_list_cfg.append(((handler, handler.body[0]), self.body_attributes()))
+                exit_nodes = self.order_body(handler.body)
+                last = handler.body[-1]
+            for section in (nd.orelse, nd.finalbody):
+                if len(section) > 0:
+                    self.order_after(exit_nodes, section[0], last)
+                    exit_nodes = self.order_body(section)
+                    last = section[-1]
+            return exit_nodes
+        elif isinstance(nd, MATCH_STATEMENTS):
+            # The cases are placed next to each other like the branches of an if
+            exit_nodes = []
+            for case in nd.cases:
+                self.edge_list_cfg.append(((nd, case.body[0]), self.branch_attributes()))
+                exit_nodes += self.order_body(case.body)
+            return exit_nodes
+        elif isinstance(nd, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.With, ast.AsyncWith)):
+            self.edge_list_cfg.append(((nd, nd.body[0]), self.body_attributes()))
+            return self.order_body(nd.body)
+        return [nd]
+
+    def order_after(self, exit_nodes, nd, fallback):
+        """
+        Places a statement below the statements at the bottom of the previous section, or below the last statement of
+        the previous section if every statement at the bottom is a jump.
+        """
+        exit_nodes = [node for node in exit_nodes if not isinstance(node, JUMPS)] or [fallback]
+        attr_edges_dict = self.sequence_attributes()
+        for exit_node in exit_nodes:
+            self.edge_list_cfg.append(((exit_node, nd), attr_edges_dict))
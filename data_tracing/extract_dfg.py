@@ -1,143 +1,234 @@
-import ast
-import copy
-import itertools
-import itertools as itera
-
-
-def child_iter_return(p_nd, node, compare):
-    """
-
-    :param compare:
-    :param p_nd: node to iterate over
-    :param node: Compare node
-    :return: Potential parent node
-    """
-    for child in ast.walk(p_nd):
-        if compare(node, child):
-            return p_nd
-    return None
-
-
-class DataFlowExtractor:
-    """
-    Class to extract the data flow based on an AST of all the cells in the jupyter notebook.
-    """
-
-    def __init__(self, ast_tree_cells: dict):
-        self.ast_tree_cells = ast_tree_cells
-        # LIST( TUPLE( node: ast.Name, cell_num: int ) )
-        self.ast_name_list = []
-
-        # LIST( TUPLE( TUPLE( node: ast.Name, cell_num: int ), TUPLE( node: ast.Name, cell_num: int ) ) )
-        self.ast_edge_list = []
-
-    def walk_and_get_edges(self):
-        """
-        Walk tree and then return all edges according the data flow.
-
-        :return: List of edges to be added to the graph
-        """
-        self.walk_tree_by_name()
-        self.fill_edge_list()
-        return self.ast_edge_list
-
-    def walk_tree_by_name(self, no_dict=False, **kwargs):
-        """
-        Walks the tree for every cell and inserts ast.Name nodes into the ast_name_list
-
-        :return: List of the all ast.Names found in the ast trees of all cells
-        """
-        # Simulate the dict
-        if no_dict:
-            tree = kwargs["ast"]
-            for node in ast.walk(tree):
-                if isinstance(node, ast.Name) and not node in kwargs["to_exclude"]:
-                    self.ast_name_list.append((node, kwargs["cell_num"]))
-        else:
-            for cell_num in self.ast_tree_cells.keys():
-                ast_cell = self.ast_tree_cells[cell_num]
-                for node in ast.walk(ast_cell):
-                    if isinstance(node, ast.Name):
-                        self.ast_name_list.append((node, cell_num))
-        return self.ast_name_list
-
-    def fill_edge_list(self):
-        """
-        I dunno know
-        """
-        sorted_name_list = []
-        for iterable, group in itera.groupby(self.ast_name_list, key=lambda elem: elem[1]):
-            group = list(group)
-            group.sort(key=lambda elem: elem[0].__dict__["lineno"])
-            for _, g in itera.groupby(group, key=lambda elem: elem[0].__dict__["lineno"]):
-                g = list(g)
-                loads = []
-                stores = []
-                for elem in g:
-                    if isinstance(elem[0].__dict__["ctx"], ast.Load):
-                        loads.append(elem)
-                    else:
-                        stores.append(elem)
-
-                sorted_name_list.extend(loads)
-                sorted_name_list.extend(stores)
-        assert len(sorted_name_list) == len(self.ast_name_list)
-        self.ast_name_list = sorted_name_list
-        for pos, n_v_tuple in itera.zip_longest(range(len(self.ast_name_list)), self.ast_name_list):
-            # ctx is either LOAD, STORE or DEL
-            # n_v_tuple[0] -> node
-            # n_v_tuple[1] -> origin cell number
-            ctx = n_v_tuple[0].__dict__["ctx"]
-            identifier = n_v_tuple[0].__dict__["id"]
-            if isinstance(ctx, ast.Store):
-                rest = list(filter(lambda elem: elem[0].__dict__["id"] == identifier, self.ast_name_list[(pos + 1):]))
-                if len(rest) >= 1:
-                    first_node_in_rest = rest[0]
-                    if isinstance(first_node_in_rest[0].__dict__["ctx"], ast.Load):
-                        self.ast_edge_list.append((n_v_tuple, rest[0]))
-                        self._add_to_list(rest)
-
-    def _add_to_list(self, rest: [ast.AST]):
-        # n_v_tpl_tail is implicitly always form instance ast.Load due to the function call if procedure
-        for n_v_tpl_tail, n_v_tpl_head in itertools.pairwise(rest):
-            ctx_head = n_v_tpl_head[0].__dict__["ctx"]
-            if isinstance(ctx_head, ast.Load):
-                self.ast_edge_list.append((n_v_tpl_tail, n_v_tpl_head))
-            else:
-                # In case the node n_v_tpl_head has the type ast.Store or ast.Del we can break an exit the function.
-                # ast.Store -> Variable will be overwritten
-                # ast.Del   -> Variable will be destroyed for the remaining script
-                break
-
-    def get_parent_node(self, node: ast.AST, ast_nodes: [ast.AST], compare=lambda x, y: x == y):
-        """
-
-        :param compare:
-        :param ast_nodes:
-        :param node:
-        """
-        for ast_node in ast_nodes:
-            if not (isinstance(ast_node, ast.FunctionDef) or isinstance(ast_node, ast.Return)):
-                if isinstance(ast_node, ast.For):
-                    cpy = copy.deepcopy(ast_node)
-                    cpy.body.clear()
-                    for child in ast.walk(cpy):
-                        if compare(node, child):
-                            return ast_node
-                elif isinstance(ast_node, ast.If):
-                    # If variable is in test then it can't be in the body or "orelse" part.
-                    for component in [ast_node.body, ast_node.orelse, ast_node]:
-                        if isinstance(component, list):
-                            for line in component:
-                                parent = child_iter_return(line, node, compare)
-                                if parent is not None:
-                                    return parent
-                        else:
-                            parent = child_iter_return(component, node, compare)
-                            if parent is not None:
-                                return parent
-                else:
-                    for child in ast.walk(ast_node):
-                        if compare(node, child):
-                            return ast_node
-        return None
+import ast
+
+from data_tracing.ast_visitor import AstVisitor
+from data_tracing.extract_cfg import ControlFlowExtractor
+from data_tracing.function_summary import SUMMARIES, get_site, module_functions
+from data_tracing.reaching_definitions import CellDefinitions
+
+# "reaching" links every definition to the uses it reaches along the control flow, "positional" links every store to
+# the following loads of the same identifier in the order of the lines
+DATA_FLOW_MODES = ('reaching', 'positional')
+
+
+class DataFlowExtractor:
+    """
+    Class to extract the data flow based on an AST of all the cells in the jupyter notebook.
+    """
+
+    def __init__(self, ast_tree_cells: dict, visitors=None, cfgs=None, mode='reaching', summaries=SUMMARIES):
+        """
+        :param ast_tree_cells: Dictionary with the ast of every cell in notebook order
+        :param visitors: Dictionary with the AstVisitor of every cell
+        :param cfgs: Dictionary with the ControlFlowExtractor of every cell
+        :param mode: "reaching" or "positional", see DATA_FLOW_MODES
+        :param summaries: SummaryCache with the summaries of the functions defined in the notebook
+        """
+        if mode not in DATA_FLOW_MODES:
+            raise ValueError("Unknown data flow mode " + str(mode))
+        self.ast_tree_cells = ast_tree_cells
+        # DICT( cell_num: AstVisitor ), cells without a visitor are traversed again
+        self.visitors = visitors if visitors is not None else dict()
+        # DICT( cell_num: ControlFlowExtractor ), the control flow of cells without one is extracted again
+        self.cfgs = cfgs if cfgs is not None else dict()
+        self.mode = mode
+        self.summaries = summaries
+        # DICT( cell_num: TUPLE( ControlFlowExtractor, AstVisitor ) ), built for cells without them
+        self.flow_index = dict()
+        # LIST( TUPLE( node: ast.Name, cell_num: int ) )
+        self.ast_name_list = []
+
+        # LIST( TUPLE( TUPLE( node: ast.Name, cell_num: int ), TUPLE( node: ast.Name, cell_num: int ) ) )
+        self.ast_edge_list = []
+        # LIST( TUPLE( node: ast.Name, cell_num: int ) ), store which starts the chain of the edge at the same index
+        self.ast_edge_heads = []
+        # DICT( cell_num: AstVisitor ), visitors built by get_parent_node for cells without a visitor
+        self.parent_index = dict()
+
+    def walk_and_get_edges(self, identifiers=None):
+        """
+        Walk tree and then return all edges according the data flow.
+
+        :param identifiers: If given only the edges of variables with these identifiers are extracted
+        :return: List of edges to be added to the graph
+        """
+        self.walk_tree_by_name()
+        self.fill_edge_list(identifiers)
+        return self.ast_edge_list
+
+    def walk_tree_by_name(self):
+        """
+        Inserts the ast.Name nodes of the global variables of every cell into the ast_name_list. Local names of
+        functions, lambdas, classes and comprehensions are left out, see SymbolTable. The names collected by the
+        AstVisitor of a cell are reused, cells without a visitor are traversed once.
+
+        :return: List of all ast.Names of global variables found in the ast trees of all cells
+        """
+        for cell_num in self.ast_tree_cells.keys():
+            visitor = self.visitors.get(cell_num)
+            if visitor is None:
+                visitor = self.get_flow(cell_num)[1]
+            self.ast_name_list.extend((node, cell_num) for node in visitor.global_names)
+        return self.ast_name_list
+
+    def fill_edge_list(self, identifiers=None):
+        """
+        Sorts the name list by cell and line and fills the edge list with the edges of the mode of the extractor.
+
+        :param identifiers: If given only the edges of variables with these identifiers are extracted
+        """
+        self.sort_name_list()
+        if self.mode == 'reaching':
+            self.fill_reaching_edges(identifiers)
+        else:
+            self.fill_positional_edges(identifiers)
+
+    def fill_reaching_edges(self, identifiers=None):
+        """
+        Links every definition to the uses it reaches. The cells are solved one after another in notebook order, the
+        definitions reaching the end of a cell reach the start of the next cell. Every edge starts its own chain.
+
+        Calls of the functions defined in the notebook use the summary of the latest definition of the function in
+        notebook order, the definitions of a cell are known to the whole cell.
+
+        :param identifiers: If given only the edges of variables with these identifiers are extracted
+        """
+        # DICT( identifier: LIST( TUPLE( node: ast.Name, cell_num ) ) ), definitions reaching the current cell
+        reaching = dict()
+        # DICT( identifier: FunctionSummary ), functions defined up to the current cell
+        functions = dict()
+        edges = []
+        for cell_num in self.ast_tree_cells.keys():
+            cfg, visitor = self.get_flow(cell_num)
+            if cfg.module is None:
+                continue
+            for function_def in module_functions(cfg):
+                functions[function_def.name] = self.summaries.get(function_def)
+            edges.extend(CellDefinitions(cfg, visitor.flow_names, cell_num, identifiers, visitor.call_names,
+                                         functions).solve(reaching))
+        # Keep the order of the stores in the notebook, the colors of the variables are assigned in this order
+        position = self.get_positions()
+        edges.sort(key=lambda elem: (position[get_site(elem[0][0])], position[get_site(elem[1][0])]))
+        for definition, use in edges:
+            self.ast_edge_list.append((definition, use))
+            self.ast_edge_heads.append(definition)
+
+    def get_positions(self):
+        """
+        :return: Dictionary with the position of every ast.Name in the sorted name list, names created for calls have
+                 the position of the called name, see get_site
+        """
+        return {n_v_tuple[0]: pos for pos, n_v_tuple in enumerate(self.ast_name_list)}
+
+    def get_flow(self, cell_num):
+        """
+        :param cell_num: Key of the cell
+        :return: Tuple of the ControlFlowExtractor and the AstVisitor of the cell, built once if they were not given
+        """
+        cfg = self.cfgs.get(cell_num)
+        visitor = self.visitors.get(cell_num)
+        if cfg is not None and visitor is not None:
+            return cfg, visitor
+        if cell_num not in self.flow_index:
+            cfg = ControlFlowExtractor()
+            cfg.extract_CFG(self.ast_tree_cells[cell_num])
+            self.flow_index[cell_num] = (cfg, AstVisitor(cfg.get_nodes(skip_module=True)).visit(
+                self.ast_tree_cells[cell_num]))
+        return self.flow_index[cell_num]
+
+    def fill_positional_edges(self, identifiers=None):
+        """
+        Links every store to the following loads of the same identifier in the sorted name list. The names are indexed
+        by identifier first, so every chain is found without scanning the remaining names.
+
+        :param identifiers: If given only the edges of variables with these identifiers are extracted
+        """
+        occurrence_index = self.get_occurrence_index(identifiers)
+        # Iterate in the order of the sorted name list, so the edges keep the order of the stores in the notebook
+        for n_v_tuple in self.ast_name_list:
+            # ctx is either LOAD, STORE or DEL
+            # n_v_tuple[0] -> node
+            # n_v_tuple[1] -> origin cell number
+            if not isinstance(n_v_tuple[0].ctx, ast.Store):
+                continue
+            entry = occurrence_index.get(n_v_tuple[0].id)
+            if entry is None:
+                continue
+            occurrences, position = entry
+            rest_start = position[n_v_tuple[0]] + 1
+            if rest_start < len(occurrences) and isinstance(occurrences[rest_start][0].ctx, ast.Load):
+                self.ast_edge_list.append((n_v_tuple, occurrences[rest_start]))
+                self.ast_edge_heads.append(n_v_tuple)
+                self._add_to_list(occurrences, rest_start, n_v_tuple)
+
+    def get_occurrence_index(self, identifiers=None):
+        """
+        Groups the sorted name list by identifier.
+
+        :param identifiers: If given only names with these identifiers are indexed
+        :return: Dictionary with the list of occurrences in notebook order and the position of every node in this list
+                 for every identifier
+        """
+        occurrence_index = dict()
+        for n_v_tuple in self.ast_name_list:
+            identifier = n_v_tuple[0].id
+            if identifiers is not None and identifier not in identifiers:
+                continue
+            entry = occurrence_index.get(identifier)
+            if entry is None:
+                entry = ([], dict())
+                occurrence_index[identifier] = entry
+            occurrences, position = entry
+            position[n_v_tuple[0]] = len(occurrences)
+            occurrences.append(n_v_tuple)
+        return occurrence_index
+
+    def sort_name_list(self):
+        """
+        Sorts the name list by cell and line, loads are placed before stores and deletions of the same line. The sort
+        is stable, so names of the same kind keep the order of the walk within a line.
+        """
+        cell_order = {cell_num: i for i, cell_num in enumerate(self.ast_tree_cells.keys())}
+        self.ast_name_list.sort(key=lambda elem: (cell_order.get(elem[1], len(cell_order)),
+                                                  elem[0].lineno,
+                                                  not isinstance(elem[0].ctx, ast.Load)))
+
+    def _add_to_list(self, occurrences, start, chain_head):
+        """
+        Links the consecutive loads following the store which starts the chain.
+
+        :param occurrences: Occurrences of the identifier in notebook order
+        :param start: Position of the first load after the store
+        :param chain_head: Store which starts the chain
+        """
+        # n_v_tpl_tail is implicitly always form instance ast.Load due to the function call if procedure
+        for pos in range(start + 1, len(occurrences)):
+            n_v_tpl_tail = occurrences[pos - 1]
+            n_v_tpl_head = occurrences[pos]
+            if isinstance(n_v_tpl_head[0].ctx, ast.Load):
+                self.ast_edge_list.append((n_v_tpl_tail, n_v_tpl_head))
+                self.ast_edge_heads.append(chain_head)
+            else:
+                # In case the node n_v_tpl_head has the type ast.Store or ast.Del we can break an exit the function.
+                # ast.Store -> Variable will be overwritten
+                # ast.Del   -> Variable will be destroyed for the remaining script
+                break
+
+    def get_parent_node(self, n_v_tuple, ast_nodes: [ast.AST], on_id_lvl=False):
+        """
+        Looks up the statement of the control flow a name belongs to in the index of the AstVisitor of the cell. For
+        cells without a visitor the index is built once from the given statements.
+
+        :param n_v_tuple: Tuple of ast.Name and cell number
+        :param ast_nodes: Statements of the control flow of the cell of the name
+        :param on_id_lvl: Look up the first statement with a name of the same identifier instead of the node itself
+        :return: Statement or None if no statement claims the name
+        """
+        node, cell_num = n_v_tuple
+        node = get_site(node)
+        visitor = self.visitors.get(cell_num) or self.parent_index.get(cell_num)
+        if visitor is None:
+            visitor = AstVisitor(ast_nodes).visit(self.ast_tree_cells[cell_num])
+            self.parent_index[cell_num] = visitor
+        if on_id_lvl:
+            return visitor.parent_by_id.get(node.id)
+        return visitor.parent_by_node.get(node)
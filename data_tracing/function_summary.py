@@ -0,0 +1,338 @@
+"""
+Summaries of the functions defined in a notebook. A summary records the parameters and global variables a function
+reads, the global variables it writes and the variables its return values depend on. The data flow uses the summary
+at every call of the function instead of walking its body again. Summaries are memoized by a hash of the function
+definition, so a function which is defined in several cells or notebooks is summarized once.
+"""
+import ast
+import builtins
+import hashlib
+
+from data_tracing.extract_cfg import FUNCTIONS
+
+# Attribute of the function definitions the summary is stored in, it is pickled with the ast into the cell cache
+SUMMARY_ATTR = '_summary'
+# Attribute of the names standing for the variables a call reads or writes, holds the name of the called function
+CALL_SITE_ATTR = '_call_site'
+BUILTIN_NAMES = frozenset(dir(builtins))
+COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+
+
+class FunctionSummary:
+    """
+    Effect of a call of a function on the variables of the notebook.
+    """
+
+    def __init__(self, name, params, params_read, globals_read, globals_written, returns):
+        """
+        :param name: Name of the function
+        :param params: Tuple of the parameters in the order of the signature
+        :param params_read: Frozenset of the parameters the function reads
+        :param globals_read: Tuple of the global variables the function reads, in the order of their first use
+        :param globals_written: Tuple of the global variables the function assigns or deletes, in the order of the
+                                first assignment
+        :param returns: Frozenset of the parameters and global variables the return values depend on
+        """
+        self.name = name
+        self.params = params
+        self.params_read = params_read
+        self.globals_read = globals_read
+        self.globals_written = globals_written
+        self.returns = returns
+
+    def __repr__(self):
+        return 'FunctionSummary(' + self.name + ', reads ' + ','.join(self.globals_read) \
+               + ', writes ' + ','.join(self.globals_written) + ')'
+
+
+class Scope:
+    """
+    Names read and bound in one scope of a function. Names which nested functions, lambdas, comprehensions and classes
+    read without binding them are read by the enclosing scope, their declared global variables are written by it.
+    """
+
+    def __init__(self, params, body):
+        """
+        :param params: Names bound on entry of the scope
+        :param body: List of the nodes of the scope
+        """
+        # DICT( identifier: None ), names read in the order of the source
+        self.reads = dict()
+        # DICT( identifier: None ), names assigned or deleted in the order of the source
+        self.stores = dict.fromkeys(params)
+        self.declared = set()
+        # DICT( identifier: None ), global variables written by nested scopes
+        self.nested_writes = dict()
+        # DICT( identifier: SET( identifier ) ), names the values of every variable are computed from
+        self.depends = dict()
+        # Names of the values of the return statements
+        self.returned = set()
+        self.scan(body)
+
+    def scan(self, body):
+        """
+        Walks the nodes of the scope without entering the bodies of nested scopes.
+
+        :param body: List of the nodes of the scope
+        """
+        work = list(reversed(body))
+        while work:
+            nd = work.pop()
+            if isinstance(nd, ast.Name):
+                if isinstance(nd.ctx, ast.Load):
+                    self.reads.setdefault(nd.id, None)
+                else:
+                    self.stores.setdefault(nd.id, None)
+                continue
+            elif isinstance(nd, ast.Global):
+                self.declared.update(nd.names)
+                continue
+            elif isinstance(nd, FUNCTIONS + (ast.ClassDef,)):
+                self.stores.setdefault(nd.name, None)
+                if isinstance(nd, ast.ClassDef):
+                    outer = nd.decorator_list + nd.bases + [keyword.value for keyword in nd.keywords]
+                    self.add_nested(Scope((), nd.body))
+                else:
+                    outer = nd.decorator_list + default_values(nd.args) + annotations(nd)
+                    self.add_nested(Scope(parameters(nd.args), nd.body))
+                work.extend(reversed(outer))
+                continue
+            elif isinstance(nd, ast.Lambda):
+                self.add_nested(Scope(parameters(nd.args), [nd.body]))
+                work.extend(reversed(default_values(nd.args)))
+                continue
+            elif isinstance(nd, COMPREHENSIONS):
+                # The iterable of the first generator is evaluated in the enclosing scope
+                generators = nd.generators
+                inner = [generators[0].target] + generators[0].ifs + generators[1:]
+                inner += [nd.key, nd.value] if isinstance(nd, ast.DictComp) else [nd.elt]
+                self.add_nested(Scope((), inner))
+                work.append(generators[0].iter)
+                continue
+            self.add_dependencies(nd)
+            work.extend(reversed(list(ast.iter_child_nodes(nd))))
+
+    def add_nested(self, scope):
+        """
+        :param scope: Nested Scope
+        """
+        local = scope.get_locals()
+        for identifier in scope.reads:
+            if identifier not in local:
+                self.reads.setdefault(identifier, None)
+        for identifier in scope.get_global_writes():
+            self.nested_writes.setdefault(identifier, None)
+
+    def add_dependencies(self, nd):
+        """
+        Records the names the assigned values and the return values of a statement are computed from.
+
+        :param nd: Node of the scope
+        """
+        if isinstance(nd, ast.Return):
+            if nd.value is not None:
+                self.returned.update(loaded_names(nd.value))
+            return
+        if isinstance(nd, ast.Assign):
+            targets, values = nd.targets, [nd.value]
+        elif isinstance(nd, ast.AugAssign):
+            targets, values = [nd.target], [nd.target, nd.value]
+        elif isinstance(nd, ast.AnnAssign) and nd.value is not None:
+            targets, values = [nd.target], [nd.value]
+        elif isinstance(nd, (ast.For, ast.AsyncFor)):
+            targets, values = [nd.target], [nd.iter]
+        elif isinstance(nd, ast.NamedExpr):
+            targets, values = [nd.target], [nd.value]
+        elif isinstance(nd, (ast.With, ast.AsyncWith)):
+            targets = [item.optional_vars for item in nd.items if item.optional_vars is not None]
+            values = [item.context_expr for item in nd.items]
+        else:
+            return
+        sources = set()
+        for value in values:
+            sources.update(loaded_names(value))
+        for target in targets:
+            for node in ast.walk(target):
+                if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                    self.depends.setdefault(node.id, set()).update(sources)
+
+    def get_locals(self):
+        """
+        :return: Names bound in the scope which are not declared global
+        """
+        return {identifier for identifier in self.stores if identifier not in self.declared}
+
+    def get_global_writes(self):
+        """
+        :return: Dictionary with the global variables written in the scope and its nested scopes
+        """
+        writes = {identifier: None for identifier in self.stores if identifier in self.declared}
+        writes.update(self.nested_writes)
+        return writes
+
+    def get_return_sources(self):
+        """
+        :return: Set of the names the return values depend on, following the assignments of the scope
+        """
+        sources = set(self.returned)
+        work = list(sources)
+        while work:
+            for identifier in self.depends.get(work.pop(), ()):
+                if identifier not in sources:
+                    sources.add(identifier)
+                    work.append(identifier)
+        return sources
+
+
+def parameters(args):
+    """
+    :param args: ast.arguments
+    :return: List of the names of all parameters in the order of the signature
+    """
+    params = [arg.arg for arg in args.posonlyargs + args.args]
+    if args.vararg is not None:
+        params.append(args.vararg.arg)
+    params.extend(arg.arg for arg in args.kwonlyargs)
+    if args.kwarg is not None:
+        params.append(args.kwarg.arg)
+    return params
+
+
+def default_values(args):
+    """
+    :param args: ast.arguments
+    :return: List of the default values, they are evaluated in the enclosing scope
+    """
+    return args.defaults + [value for value in args.kw_defaults if value is not None]
+
+
+def annotations(function_def):
+    """
+    :param function_def: ast.FunctionDef or ast.AsyncFunctionDef
+    :return: List of the annotations of the parameters and of the return value
+    """
+    args = function_def.args
+    all_args = args.posonlyargs + args.args + args.kwonlyargs + [arg for arg in (args.vararg, args.kwarg) if arg]
+    nodes = [arg.annotation for arg in all_args if arg.annotation is not None]
+    if function_def.returns is not None:
+        nodes.append(function_def.returns)
+    return nodes
+
+
+def loaded_names(nd):
+    """
+    :param nd: Expression
+    :return: Identifiers of the ast.Name nodes in Load context below the expression
+    """
+    return [node.id for node in ast.walk(nd) if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load)]
+
+
+def summarize(function_def):
+    """
+    Summarizes a function definition. Names which the function reads without binding them are global variables,
+    unless they are builtins. Default values, decorators and annotations are evaluated at the definition, so they do
+    not belong to the summary.
+
+    :param function_def: ast.FunctionDef or ast.AsyncFunctionDef
+    :return: FunctionSummary
+    """
+    params = parameters(function_def.args)
+    scope = Scope(params, function_def.body)
+    local = scope.get_locals()
+    globals_read = tuple(identifier for identifier in scope.reads
+                         if identifier not in local and identifier not in BUILTIN_NAMES)
+    sources = scope.get_return_sources()
+    returns = frozenset(identifier for identifier in sources if identifier in params or identifier in globals_read)
+    return FunctionSummary(function_def.name, tuple(params), frozenset(p for p in params if p in scope.reads),
+                           globals_read, tuple(scope.get_global_writes()), returns)
+
+
+class SummaryCache:
+    """
+    Class to memoize the summaries of function definitions by a hash of the definition. The summary is also stored at
+    the definition itself, so a definition is only hashed once.
+    """
+
+    def __init__(self, max_entries=4096):
+        """
+        :param max_entries: Number of summaries kept, the oldest summary is dropped first
+        """
+        self.max_entries = max_entries
+        # DICT( hash: FunctionSummary ) in the order of insertion
+        self.summaries = dict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(function_def):
+        """
+        :param function_def: ast.FunctionDef or ast.AsyncFunctionDef
+        :return: Hash of the definition without the positions of its nodes
+        """
+        return hashlib.sha256(ast.dump(function_def).encode('utf-8', 'surrogatepass')).hexdigest()
+
+    def get(self, function_def):
+        """
+        :param function_def: ast.FunctionDef or ast.AsyncFunctionDef
+        :return: FunctionSummary of the definition
+        """
+        summary = function_def.__dict__.get(SUMMARY_ATTR)
+        if summary is not None:
+            self.hits += 1
+            return summary
+        key = self.key(function_def)
+        summary = self.summaries.get(key)
+        if summary is None:
+            self.misses += 1
+            summary = summarize(function_def)
+            if len(self.summaries) >= self.max_entries:
+                del self.summaries[next(iter(self.summaries))]
+            self.summaries[key] = summary
+        else:
+            self.hits += 1
+        setattr(function_def, SUMMARY_ATTR, summary)
+        return summary
+
+
+# Summaries shared by all data flow extractors of the process
+SUMMARIES = SummaryCache()
+
+
+def call_name(site, identifier, ctx):
+    """
+    Creates the name which stands for a variable read or written by a call. It has the position of the name of the
+    called function, so it is drawn at the port of the call.
+
+    :param site: ast.Name of the called function
+    :param identifier: Identifier of the variable
+    :param ctx: ast.Load or ast.Store
+    :return: ast.Name
+    """
+    node = ast.copy_location(ast.Name(id=identifier, ctx=ctx), site)
+    setattr(node, CALL_SITE_ATTR, site)
+    return node
+
+
+def get_site(node):
+    """
+    :param node: ast.Name
+    :return: Name of the called function for names created by call_name, the name itself otherwise
+    """
+    return node.__dict__.get(CALL_SITE_ATTR, node)
+
+
+def module_functions(cfg):
+    """
+    :param cfg: ControlFlowExtractor of a cell
+    :return: List of the function definitions of the cell which bind a global name, in the order of the source
+    """
+    functions = []
+    for statement in cfg.nodes:
+        if not isinstance(statement, FUNCTIONS):
+            continue
+        parent = cfg.parents.get(statement)
+        while parent is not None and parent is not cfg.module and not isinstance(parent, FUNCTIONS + (ast.ClassDef,)):
+            parent = cfg.parents.get(parent)
+        if parent is cfg.module:
+            functions.append(statement)
+    return functions
@@ -1,26 +1,265 @@
-import os
-import pandas as pd
-# import progressbar as pg
-
-file_name = 'kernel_data.csv'
-key_word = 'basics'
-cmd = 'kaggle kernels list -s ' + key_word + ' --page-size 50 --sort-by scoreDescending --kernel-type all -v'
-
-stream = os.popen(cmd)
-output = stream.read()
-with open(file_name, 'w') as file:
-    file.write(output)
-print('FILE:', file_name, 'CREATED')
-stream.close()
-
-kernel_data = pd.read_csv(file_name, sep=',', skipfooter=1, engine='python')
-dimension = kernel_data.shape
-
-# bar = pg.ProgressBar(max_value=dimension[0] - 1, redirect_stdout=True)
-for i in range(dimension[0]):
-    kernel = kernel_data.iloc[i, 0]
-    cmd = 'kaggle kernels pull -p ../notebooks/ ' + kernel
-    stream = os.popen(cmd)
-    output = stream.read()
-#   bar.update(i)
-print('EOS')
+"""
+Pulls notebooks from Kaggle with the kaggle command line tool. The kernels of several search terms are listed page by
+page and pulled by a pool of threads. The listing and the pulled files are stored in a KernelIndex, so kernels which
+did not change since the last run are skipped and an interrupted run can be resumed.
+
+The command is configurable, e.g. ``--kaggle-command "python my_stand_in.py"`` runs against a local script which
+answers ``kernels list`` and ``kernels pull`` like the kaggle tool.
+"""
+import argparse
+import csv
+import os
+import shlex
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from data_tracing.kernel_index import INDEX_FILE, KernelIndex
+
+NOTEBOOK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'notebooks')
+KAGGLE_COMMAND = 'kaggle'
+SEARCH_TERMS = ('basics',)
+PAGE_SIZE = 50
+SORT_BY = 'scoreDescending'
+KERNEL_TYPE = 'all'
+
+
+class KaggleError(RuntimeError):
+    """
+    Raised if the kaggle command still fails after all retries.
+    """
+
+
+def parse_listing(output):
+    """
+    Parses the CSV written by ``kaggle kernels list -v``. Lines before the header, e.g. warnings about the version of
+    the API, and the message of an empty page are ignored.
+
+    :param output: Output of the command
+    :return: List of dictionaries with the columns of every kernel, e.g. ref and lastRunTime
+    """
+    lines = output.splitlines()
+    for index, line in enumerate(lines):
+        if line.startswith('ref,'):
+            return [row for row in csv.DictReader(lines[index:]) if '/' in (row.get('ref') or '')]
+    return []
+
+
+class KernelFetcher:
+    """
+    Class to list and pull kernels with the kaggle command line tool. Failing commands are retried with exponential
+    backoff. Every kernel is pulled into a temporary folder first, so the output folder only contains complete
+    downloads. The kernels are kept in a folder per author, since kernels of different authors may share their slug.
+    """
+
+    def __init__(self, output_dir=NOTEBOOK_DIR, command=KAGGLE_COMMAND, jobs=4, retries=3, backoff=2.0,
+                 timeout=120, page_size=PAGE_SIZE, max_pages=1, sort_by=SORT_BY, kernel_type=KERNEL_TYPE,
+                 force=False, index_file=None):
+        """
+        :param output_dir: Folder the kernels are pulled into
+        :param command: Command of the kaggle tool, may contain arguments, e.g. "python stand_in.py"
+        :param jobs: Number of kernels pulled at the same time
+        :param retries: Number of retries of a failed command
+        :param backoff: Seconds waited before the first retry, doubled for every further retry
+        :param timeout: Seconds after which a command is aborted and retried
+        :param page_size: Number of kernels listed per page
+        :param max_pages: Maximal number of pages listed per search term
+        :param sort_by: Sort order of the listing
+        :param kernel_type: Type of the listed kernels, e.g. all, notebook or script
+        :param force: Pull kernels again which did not change since the last run
+        :param index_file: SQLite index of the kernels, defaults to kernels.sqlite in the output folder
+        """
+        self.output_dir = output_dir
+        self.command = shlex.split(command) if isinstance(command, str) else list(command)
+        self.jobs = max(1, jobs)
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.sort_by = sort_by
+        self.kernel_type = kernel_type
+        self.force = force
+        self.index_file = index_file if index_file is not None else os.path.join(output_dir, INDEX_FILE)
+
+    def run_command(self, args):
+        """
+        Runs the kaggle tool and retries it if it fails or exceeds the timeout.
+
+        :param args: Arguments of the kaggle tool
+        :return: Standard output of the command
+        """
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+            try:
+                result = subprocess.run(self.command + args, capture_output=True, encoding='utf-8',
+                                        timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                error = 'Exceeded timeout of ' + str(self.timeout) + 's'
+                continue
+            if result.returncode == 0:
+                return result.stdout
+            error = 'Exited with code ' + str(result.returncode) + ': ' + (result.stderr or result.stdout).strip()
+        raise KaggleError(' '.join(args[:2]) + ' failed after ' + str(self.retries + 1) + ' attempts. ' + error)
+
+    def list_page(self, term, page):
+        """
+        :param term: Search term
+        :param page: Number of the page, starting at 1
+        :return: List of the kernels on the page
+        """
+        return parse_listing(self.run_command(['kernels', 'list', '-s', term, '--page', str(page),
+                                               '--page-size', str(self.page_size), '--sort-by', self.sort_by,
+                                               '--kernel-type', self.kernel_type, '-v']))
+
+    def list_kernels(self, terms):
+        """
+        Lists the kernels of every search term page by page, until a page is not full or max_pages is reached.
+
+        :param terms: Search terms
+        :return: List of the kernels without duplicates, in the order of the listing
+        """
+        kernels = dict()
+        for term in terms:
+            for page in range(1, self.max_pages + 1):
+                rows = self.list_page(term, page)
+                for row in rows:
+                    kernels.setdefault(row['ref'], row)
+                if len(rows) < self.page_size:
+                    break
+        return list(kernels.values())
+
+    def get_kernel_dir(self, ref):
+        """
+        :param ref: Reference of the kernel, i.e. author/slug
+        :return: Folder of the author of the kernel in the output folder
+        """
+        author = ref.split('/')[0]
+        if author in ('', '.', '..'):
+            raise KaggleError('Invalid reference ' + ref)
+        return os.path.join(self.output_dir, author)
+
+    def pull(self, ref):
+        """
+        Pulls one kernel into a temporary folder and moves its files into the folder of its author, e.g.
+        <output folder>/<author>/<slug>.ipynb. Runs in the threads of the pool, so the index is not used here.
+
+        :param ref: Reference of the kernel
+        :return: Tuple of the pulled file and None, or None and the error message
+        """
+        try:
+            kernel_dir = self.get_kernel_dir(ref)
+            with tempfile.TemporaryDirectory(dir=self.output_dir, prefix='.pull-') as pull_dir:
+                self.run_command(['kernels', 'pull', '-p', pull_dir, ref])
+                files = sorted(os.listdir(pull_dir), key=lambda file: not file.endswith('.ipynb'))
+                if not files:
+                    raise KaggleError('kernels pull wrote no files')
+                os.makedirs(kernel_dir, exist_ok=True)
+                for file in files:
+                    os.replace(os.path.join(pull_dir, file), os.path.join(kernel_dir, file))
+            # A notebook is preferred over other files, e.g. kernel-metadata.json
+            return os.path.join(kernel_dir, files[0]), None
+        except (KaggleError, OSError) as ex:
+            return None, type(ex).__name__ + ': ' + str(ex)
+
+    def run(self, terms=SEARCH_TERMS):
+        """
+        Lists the kernels of the search terms and pulls every kernel which is new or was run again since the last
+        pull.
+
+        :param terms: Search terms
+        :return: Summary of the run
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        start = time.perf_counter()
+        status_count = dict()
+        failures = []
+        with KernelIndex(self.index_file) as index:
+            kernels = self.list_kernels(terms)
+            pending = index.pending_pulls(index.sync_listing(kernels), force=self.force)
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                futures = {executor.submit(self.pull, row['ref']): row for row in pending}
+                for done, future in enumerate(as_completed(futures), 1):
+                    row = futures[future]
+                    file, error = future.result()
+                    status = 'ok' if error is None else 'failed'
+                    # Only this thread writes to the index
+                    index.record_pull(row['ref'], status, row['last_run_time'],
+                                      path=os.path.relpath(file, index.base_dir) if file is not None else None,
+                                      error=error)
+                    status_count[status] = status_count.get(status, 0) + 1
+                    if error is not None:
+                        failures.append({'ref': row['ref'], 'error': error})
+                    print('Pulled ' + str(done) + '/' + str(len(pending)) + ' ' + row['ref'] + ' [' + status + ']')
+            totals = index.count()
+
+        return {
+            'listed': len(kernels),
+            'pulled': len(pending),
+            'skipped': len(kernels) - len(pending),
+            'status': status_count,
+            'index': totals,
+            'wall_seconds': round(time.perf_counter() - start, 3),
+            'failures': failures,
+        }
+
+
+def parse_args(argv=None):
+    """
+    Parses the command line arguments.
+
+    :param argv: Arguments, defaults to sys.argv
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Pull the notebooks of Kaggle search terms with the kaggle tool.")
+    parser.add_argument("--search", nargs="+", default=list(SEARCH_TERMS),
+                        help="Search terms whose kernels are pulled.")
+    parser.add_argument("--output-dir", default=NOTEBOOK_DIR,
+                        help="Folder the kernels are pulled into.")
+    parser.add_argument("--index", default=None,
+                        help="SQLite index of the kernels, defaults to kernels.sqlite in the output folder.")
+    parser.add_argument("--pages", type=int, default=1,
+                        help="Maximal number of pages listed per search term.")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE,
+                        help="Number of kernels per page.")
+    parser.add_argument("--sort-by", default=SORT_BY,
+                        help="Sort order of the listing, e.g. hotness, voteCount or scoreDescending.")
+    parser.add_argument("--kernel-type", default=KERNEL_TYPE, choices=('all', 'notebook', 'script'),
+                        help="Type of the listed kernels.")
+    parser.add_argument("--jobs", type=int, default=4,
+                        help="Number of kernels pulled at the same time.")
+    parser.add_argument("--retries", type=int, default=3,
+                        help="Number of retries of a failed kaggle command.")
+    parser.add_argument("--backoff", type=float, default=2.0,
+                        help="Seconds before the first retry, doubled for every further retry.")
+    parser.add_argument("--timeout", type=float, default=120,
+                        help="Seconds after which a kaggle command is aborted.")
+    parser.add_argument("--force", action="store_true",
+                        help="Pull kernels again which did not change since the last run.")
+    parser.add_argument("--kaggle-command", default=KAGGLE_COMMAND,
+                        help="Command of the kaggle tool, e.g. a local stand-in script for offline runs.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fetcher = KernelFetcher(output_dir=args.output_dir, command=args.kaggle_command, jobs=args.jobs,
+                            retries=args.retries, backoff=args.backoff, timeout=args.timeout,
+                            page_size=args.page_size, max_pages=args.pages, sort_by=args.sort_by,
+                            kernel_type=args.kernel_type, force=args.force, index_file=args.index)
+    summary = fetcher.run(args.search)
+    print("Listed " + str(summary['listed']) + " kernels, pulled " + str(summary['pulled']) + " ("
+          + str(summary['skipped']) + " unchanged) in " + str(summary['wall_seconds']) + "s")
+    for status, count in summary['status'].items():
+        print("  " + status + ": " + str(count))
+    print("Index: " + ", ".join(str(count) + " " + key for key, count in summary['index'].items()))
+    for failure in summary['failures']:
+        print("  " + failure['ref'] + " " + failure['error'])
+    print('EOS')
+
+
+if __name__ == "__main__":
+    main()
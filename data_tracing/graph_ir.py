@@ -0,0 +1,355 @@
+"""
+Plain Python representation of the graph of the visualization. The graph is built without calling into Graphviz and
+is written as DOT text at the end, so it can be streamed into the dot executable or read by pygraphviz in one call.
+"""
+import re
+
+# Identifiers which do not have to be quoted in DOT
+DOT_ID = re.compile(r'[A-Za-z_\x80-\U0010ffff][A-Za-z_0-9\x80-\U0010ffff]*|-?(\.[0-9]+|[0-9]+(\.[0-9]*)?)')
+DOT_KEYWORDS = {'node', 'edge', 'graph', 'digraph', 'subgraph', 'strict'}
+
+
+def quote(value):
+    """
+    :param value: Identifier or attribute value
+    :return: Value in the DOT syntax, values enclosed in <> are HTML-like labels and are written as they are
+    """
+    value = str(value)
+    if len(value) > 1 and value[0] == '<' and value[-1] == '>':
+        return value
+    if DOT_ID.fullmatch(value) and value.lower() not in DOT_KEYWORDS:
+        return value
+    value = value.replace('"', '\\"')
+    if value.endswith('\\'):
+        # A backslash at the end would escape the closing quote
+        value += '\\'
+    return '"' + value + '"'
+
+
+def format_attributes(attributes):
+    """
+    :param attributes: Dictionary of attributes
+    :return: Attribute list in the DOT syntax
+    """
+    return '[' + ', '.join(quote(key) + '=' + quote(value) for key, value in attributes.items()) + ']'
+
+
+class GraphNode:
+    """
+    Record of one node. The sequence number is the position of the node in the order of creation.
+    """
+    __slots__ = ('name', 'seq', 'attributes', 'out_edges', 'in_edges')
+
+    def __init__(self, name, seq):
+        self.name = name
+        self.seq = seq
+        self.attributes = dict()
+        # Edges in the order of creation
+        self.out_edges = []
+        self.in_edges = []
+
+
+class GraphEdge:
+    """
+    Record of one edge, several edges can connect the same nodes.
+    """
+    __slots__ = ('tail', 'head', 'seq', 'attributes')
+
+    def __init__(self, tail, head, seq, attributes):
+        self.tail = tail
+        self.head = head
+        self.seq = seq
+        self.attributes = attributes
+
+
+class Subgraph:
+    """
+    Record of a subgraph or cluster of the root graph. Subgraphs without a name are anonymous, e.g. for rank=same.
+    """
+    __slots__ = ('name', 'attributes', 'nodes', 'edges')
+
+    def __init__(self, name):
+        self.name = name
+        self.attributes = dict()
+        # Names of the nodes and sequence numbers of the edges in the subgraph
+        self.nodes = set()
+        self.edges = set()
+
+
+class Graph:
+    """
+    Class for a graph with clusters and attributes, a replacement of pygraphviz.AGraph for building the
+    visualization. Nodes are identified by their name, adding a node again updates its attributes. Edges are never
+    merged, every call of add_edge adds a new edge.
+
+    The DOT text is written in the same order as Graphviz writes its graphs: subgraphs first, then the remaining nodes
+    and edges, so the layout is the same as for the graph written by pygraphviz.
+    """
+
+    def __init__(self, name='', directed=True, strict=False, **attributes):
+        """
+        :param name: Name of the graph
+        :param directed: Write a digraph
+        :param strict: Write a strict graph
+        :param attributes: Attributes of the graph, e.g. rankdir="TB"
+        """
+        self.name = name
+        self.directed = directed
+        self.strict = strict
+        self.graph_attributes = {key: str(value) for key, value in attributes.items()}
+        # Default attributes of all nodes and edges, label="\N" is the default of Graphviz
+        self.node_defaults = {'label': '\\N'}
+        self.edge_defaults = dict()
+        # DICT( name: GraphNode ) in the order of creation
+        self.nodes = dict()
+        # LIST( GraphEdge ) in the order of creation
+        self.edges = []
+        # SET( TUPLE( tail: str, head: str ) ), all connected pairs of nodes
+        self.edge_pairs = set()
+        # LIST( Subgraph ) in the order of creation and the named subgraphs by name
+        self.subgraphs = []
+        self.subgraph_by_name = dict()
+
+    def add_node(self, name, **attributes):
+        """
+        Adds a node or updates the attributes of an existing node.
+
+        :param name: Name of the node
+        :param attributes: Attributes of the node
+        :return: GraphNode
+        """
+        node = self.nodes.get(name)
+        if node is None:
+            node = GraphNode(name, len(self.nodes))
+            self.nodes[name] = node
+        for key, value in attributes.items():
+            node.attributes[key] = str(value)
+        return node
+
+    def get_node(self, name):
+        """
+        :param name: Name of the node
+        :return: GraphNode, raises KeyError if the graph does not contain the node
+        """
+        return self.nodes[name]
+
+    def add_edge(self, tail, head, **attributes):
+        """
+        Adds an edge, missing nodes are added without attributes.
+
+        :param tail: Name of the tail node
+        :param head: Name of the head node
+        :param attributes: Attributes of the edge
+        :return: GraphEdge
+        """
+        tail_node = self.add_node(tail)
+        head_node = self.add_node(head)
+        edge = GraphEdge(tail, head, len(self.edges), {key: str(value) for key, value in attributes.items()})
+        self.edges.append(edge)
+        self.edge_pairs.add((tail, head))
+        tail_node.out_edges.append(edge)
+        head_node.in_edges.append(edge)
+        return edge
+
+    def has_edge(self, tail, head):
+        """
+        :return: True if an edge from the tail to the head node exists
+        """
+        return (tail, head) in self.edge_pairs
+
+    def add_subgraph(self, nbunch=None, name=None, **attributes):
+        """
+        Adds a subgraph or extends the subgraph with the same name. Like pygraphviz, only nodes of nbunch which are
+        in the graph already are added, together with the edges between the nodes of the subgraph.
+
+        :param nbunch: Names of the nodes of the subgraph
+        :param name: Name of the subgraph, clusters start with "cluster"
+        :param attributes: Attributes of the subgraph, e.g. label or rank
+        :return: Subgraph
+        """
+        subgraph = self.subgraph_by_name.get(name) if name is not None else None
+        if subgraph is None:
+            subgraph = Subgraph(name)
+            self.subgraphs.append(subgraph)
+            if name is not None:
+                self.subgraph_by_name[name] = subgraph
+        for key, value in attributes.items():
+            subgraph.attributes[key] = str(value)
+        for node_name in nbunch if nbunch is not None else ():
+            if isinstance(node_name, str) and node_name in self.nodes:
+                subgraph.nodes.add(node_name)
+        # Edges between the nodes of the subgraph, only the edges of its nodes are visited
+        for node_name in subgraph.nodes:
+            for edge in self.nodes[node_name].out_edges:
+                if edge.head in subgraph.nodes:
+                    subgraph.edges.add(edge.seq)
+        return subgraph
+
+    def induced_edges(self, nodes):
+        """
+        :param nodes: GraphNode records of the graph
+        :return: Edges between these nodes in the order of creation
+        """
+        names = {node.name for node in nodes}
+        edges = [edge for node in nodes for edge in node.out_edges if edge.head in names]
+        return sorted(edges, key=lambda edge: edge.seq)
+
+    def induced(self, names):
+        """
+        :param names: Names of nodes of the graph
+        :return: New graph with these nodes, the edges between them and the subgraphs restricted to them. The records
+                 are copied, so their attributes can be changed without changing this graph.
+        """
+        names = set(names)
+        graph = Graph(self.name, self.directed, self.strict, **self.graph_attributes)
+        graph.node_defaults = dict(self.node_defaults)
+        graph.edge_defaults = dict(self.edge_defaults)
+        nodes = sorted((self.nodes[name] for name in names), key=lambda node: node.seq)
+        for node in nodes:
+            graph.add_node(node.name, **node.attributes)
+        # DICT( seq in this graph: seq in the new graph )
+        edge_seq = dict()
+        for edge in self.induced_edges(nodes):
+            edge_seq[edge.seq] = graph.add_edge(edge.tail, edge.head, **edge.attributes).seq
+        for subgraph in self.subgraphs:
+            nodes = subgraph.nodes & names
+            if not nodes:
+                continue
+            copy = Subgraph(subgraph.name)
+            copy.attributes = dict(subgraph.attributes)
+            copy.nodes = nodes
+            copy.edges = {edge_seq[seq] for seq in subgraph.edges if seq in edge_seq}
+            graph.subgraphs.append(copy)
+            if copy.name is not None:
+                graph.subgraph_by_name[copy.name] = copy
+        return graph
+
+    def copy(self):
+        """
+        :return: Copy of the graph, see induced
+        """
+        return self.induced(self.nodes)
+
+    def to_dot(self):
+        """
+        :return: Graph in the DOT language
+        """
+        return ''.join(self.iter_dot())
+
+    def write_dot(self, fp):
+        """
+        Writes the graph in the DOT language, e.g. into the stdin of a Graphviz process.
+
+        :param fp: File object opened in text mode
+        """
+        for chunk in self.iter_dot():
+            fp.write(chunk)
+
+    def iter_dot(self):
+        """
+        Generates the DOT text statement by statement.
+        """
+        yield ('strict ' if self.strict else '') + ('digraph ' if self.directed else 'graph ') + quote(self.name) \
+            + ' {\n'
+        for kind, attributes in (('graph', self.graph_attributes), ('node', self.node_defaults),
+                                 ('edge', self.edge_defaults)):
+            attributes = {key: value for key, value in attributes.items() if value != ''}
+            if attributes:
+                yield '\t' + kind + ' ' + format_attributes(attributes) + ';\n'
+
+        # Anonymous subgraphs without attributes do not change the layout and are not written
+        subgraphs = [subgraph for subgraph in self.subgraphs if subgraph.name is not None or subgraph.attributes]
+        written = set()
+        for subgraph in subgraphs:
+            yield '\t' + ('subgraph ' + quote(subgraph.name) + ' {\n' if subgraph.name is not None else '{\n')
+            if subgraph.attributes:
+                yield '\t\tgraph ' + format_attributes(subgraph.attributes) + ';\n'
+            nodes = sorted((self.nodes[name] for name in subgraph.nodes), key=lambda node: node.seq)
+            yield from self.iter_body(nodes, subgraph.edges.__contains__, (), written, '\t\t')
+            yield '\t}\n'
+
+        # Nodes and edges of the subgraphs are written in the subgraphs
+        in_subgraph = set()
+        edges_in_subgraph = set()
+        for subgraph in subgraphs:
+            in_subgraph.update(subgraph.nodes)
+            edges_in_subgraph.update(subgraph.edges)
+        yield from self.iter_body(self.nodes.values(), lambda seq: True, in_subgraph, written, '\t',
+                                  edges_in_subgraph)
+        yield '}\n'
+
+    def iter_body(self, nodes, contains_edge, in_subgraph, written, indent, edges_in_subgraph=()):
+        """
+        Generates the node and edge statements of the root graph or a subgraph. A node gets its own statement unless
+        it is written in a subgraph, follows implicitly from an edge or was already written by an earlier node.
+
+        :param nodes: GraphNodes of the graph in the order of creation
+        :param contains_edge: Function which tests if the graph contains the edge with a sequence number
+        :param in_subgraph: Names of the nodes written in subgraphs
+        :param written: Names of the nodes whose attributes are written already
+        :param indent: Indentation of the statements
+        :param edges_in_subgraph: Sequence numbers of the edges written in subgraphs
+        """
+        # DICT( name: TUPLE( smallest sequence number of the tails: int, has edges: bool ) ) within this graph
+        predecessors = dict()
+        for node in nodes:
+            if self.needs_statement(node, node.seq, contains_edge, in_subgraph, predecessors):
+                yield indent + self.node_statement(node, written)
+            prev = node
+            # Graphviz orders the edges of a node by their head first
+            out_edges = sorted(((self.nodes[edge.head], edge) for edge in node.out_edges if contains_edge(edge.seq)),
+                               key=lambda elem: (elem[0].seq, elem[1].seq))
+            for head, edge in out_edges:
+                if head is not prev and self.needs_statement(head, node.seq, contains_edge, in_subgraph, predecessors):
+                    yield indent + self.node_statement(head, written)
+                    prev = head
+                if edge.seq not in edges_in_subgraph:
+                    yield indent + self.edge_statement(edge)
+
+    def needs_statement(self, node, seq, contains_edge, in_subgraph, predecessors):
+        """
+        :param predecessors: Cache of the predecessors of the nodes, see iter_body
+        :return: True if the node is written with its own statement before the edges of the node with the sequence
+                 number
+        """
+        if node.name in in_subgraph or node.seq < seq:
+            return False
+        entry = predecessors.get(node.name)
+        if entry is None:
+            tails = [self.nodes[edge.tail].seq for edge in node.in_edges if contains_edge(edge.seq)]
+            has_edges = bool(tails) or any(contains_edge(edge.seq) for edge in node.out_edges)
+            entry = (min(tails, default=node.seq), has_edges)
+            predecessors[node.name] = entry
+        min_tail, has_edges = entry
+        if min_tail < seq:
+            return False
+        return not has_edges or bool(self.get_attributes(node.attributes, self.node_defaults))
+
+    def node_statement(self, node, written):
+        """
+        :return: Node statement, the attributes are only written the first time
+        """
+        statement = quote(node.name)
+        if node.name not in written:
+            written.add(node.name)
+            attributes = self.get_attributes(node.attributes, self.node_defaults)
+            if attributes:
+                statement += ' ' + format_attributes(attributes)
+        return statement + ';\n'
+
+    def edge_statement(self, edge):
+        """
+        :return: Edge statement
+        """
+        statement = quote(edge.tail) + (' -> ' if self.directed else ' -- ') + quote(edge.head)
+        attributes = self.get_attributes(edge.attributes, self.edge_defaults)
+        if attributes:
+            statement += ' ' + format_attributes(attributes)
+        return statement + ';\n'
+
+    @staticmethod
+    def get_attributes(attributes, defaults):
+        """
+        :return: Attributes which differ from the defaults, missing defaults are empty
+        """
+        return {key: value for key, value in attributes.items() if value != defaults.get(key, '')}
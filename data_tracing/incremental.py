@@ -0,0 +1,153 @@
+"""
+Incremental re-analysis of a notebook. After an edit only the changed cells are analyzed again, the rest of the
+previous analysis is reused.
+"""
+import difflib
+
+from data_tracing.cell_cache import CellCache
+from data_tracing.function_summary import SUMMARIES, get_site, module_functions
+from data_tracing.process_kernels import NotebookAnalyzer
+
+
+def get_identifiers(entry):
+    """
+    :param entry: Analysis result of one cell, see NotebookAnalyzer.analyze_cell
+    :return: Set with the identifiers of all ast.Name nodes of the cell
+    """
+    if entry['visitor'] is None:
+        return set()
+    return set(entry['visitor'].name_count.keys())
+
+
+def get_function_identifiers(entries, names):
+    """
+    :param entries: Analysis results of cells, see NotebookAnalyzer.analyze_cell
+    :param names: Set of identifiers
+    :return: Set with the global variables read or written by the functions of the cells which have one of the names
+    """
+    identifiers = set()
+    for entry in entries:
+        if entry['cfg'] is None:
+            continue
+        for function_def in module_functions(entry['cfg']):
+            if function_def.name in names:
+                summary = SUMMARIES.get(function_def)
+                identifiers.update(summary.globals_read)
+                identifiers.update(summary.globals_written)
+    return identifiers
+
+
+class IncrementalAnalyzer(NotebookAnalyzer):
+    """
+    Class to analyze a notebook repeatedly while it is edited. Every call of build_graph diffs the code cells against
+    the cells of the previous call. Unchanged cells keep their ast, control flow and graph nodes. Only the data flow
+    edges of identifiers which occur in changed cells are extracted again.
+    """
+
+    def __init__(self, file, **kwargs):
+        """
+        :param file: Notebook to analyze
+        :param kwargs: Options of the NotebookAnalyzer, e.g. output_dir, cache, renderer, overview, expand or data_flow
+        """
+        super().__init__(file, **kwargs)
+        # Hashes and analysis results of the cells of the previous run, in notebook order
+        self.previous_hashes = []
+        self.previous_entries = []
+        # Parts of the graph and data flow of the previous run
+        self.previous_fragments = dict()
+        self.previous_edges = None
+        # Maps the cell keys of unchanged cells from the previous run to the current run
+        self.key_map = dict()
+        # Identifiers of all names in removed, inserted or changed cells, None if everything has to be extracted
+        self.changed_identifiers = None
+        # Number of cells analyzed in the last run
+        self.changed_cells = 0
+
+    def build_graph(self, code_cells=None):
+        """
+        Builds the graph of the visualization again and reuses everything not affected by changed cells.
+
+        :param code_cells: Code cells to analyze, defaults to the code cells read from the notebook file
+        :return: Graph of the visualization
+        """
+        # Keep the parts of the graph of the previous run, reset clears them
+        self.previous_fragments = self.fragments
+        return super().build_graph(code_cells)
+
+    def parse_cells(self, code_cells):
+        """
+        Diffs the code cells against the previous run and only analyzes cells which were inserted or changed.
+
+        :param code_cells: Code cells of the notebook
+        """
+        hashes = [CellCache.key(cell['source']) for cell in code_cells]
+        entries = [None] * len(code_cells)
+        self.key_map = dict()
+        changed_identifiers = set()
+        self.changed_cells = 0
+        matcher = difflib.SequenceMatcher(None, self.previous_hashes, hashes, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                for i, j in zip(range(i1, i2), range(j1, j2)):
+                    entries[j] = self.previous_entries[i]
+                    self.key_map[str(i)] = str(j)
+                continue
+            for i in range(i1, i2):
+                changed_identifiers |= get_identifiers(self.previous_entries[i])
+            for j in range(j1, j2):
+                source = code_cells[j]['source']
+                with self.profiler.stage('cell', cell=str(j)):
+                    entry = self.cache.get(source) if self.cache is not None else None
+                    if entry is None:
+                        entry = self.analyze_cell(source, self.profiler)
+                self.add_pending_entry(str(j), source, entry)
+                entries[j] = entry
+                changed_identifiers |= get_identifiers(entry)
+                self.changed_cells += 1
+        # Calls in changed cells read and write the global variables of the called functions
+        changed_identifiers |= get_function_identifiers(self.previous_entries + entries, changed_identifiers)
+
+        # Without a previous run every edge has to be extracted
+        self.changed_identifiers = changed_identifiers if self.previous_edges is not None else None
+
+        for i, entry in enumerate(entries):
+            if entry['traversal'] is not None:
+                self.ast_dict_parsed[str(i)] = entry['ast']
+                self.ast_dict[str(i)] = entry['traversal']
+                self.cfg_parsed[str(i)] = entry['cfg']
+                self.visitors[str(i)] = entry['visitor']
+        self.previous_hashes = hashes
+        self.previous_entries = entries
+
+    def build_cell(self, cell_key):
+        """
+        Reuses the part of the graph of unchanged cells which kept their position. The first cell is always built
+        again, since its overview depends on the other cells.
+
+        :param cell_key: Key of the cell in ast_dict_parsed
+        :return: Dictionary with the nodes, edges and cluster information of the cell
+        """
+        if cell_key != str(0) and self.key_map.get(cell_key) == cell_key and cell_key in self.previous_fragments:
+            return self.previous_fragments[cell_key]
+        return super().build_cell(cell_key)
+
+    def extract_data_flow(self):
+        """
+        Extracts the data flow edges of the identifiers in changed cells. The edges of all other identifiers are
+        taken from the previous run, since they only connect names of unchanged cells.
+
+        :return: List of edges between tuples of ast.Name and cell key
+        """
+        dfg_ex = self.create_data_flow_extractor()
+        dfg_ex.walk_and_get_edges(identifiers=self.changed_identifiers)
+        edges = list(zip(dfg_ex.ast_edge_heads, dfg_ex.ast_edge_list))
+        if self.changed_identifiers is not None:
+            remap = lambda n_v_tuple: (n_v_tuple[0], self.key_map[n_v_tuple[1]])
+            for head, (n_v_tuple_u, n_v_tuple_v) in self.previous_edges:
+                if head[0].id not in self.changed_identifiers:
+                    edges.append((remap(head), (remap(n_v_tuple_u), remap(n_v_tuple_v))))
+            # Restore the order of a full extraction, the colors of the variables are assigned in this order
+            position = dfg_ex.get_positions()
+            edges.sort(key=lambda elem: (position[get_site(elem[0][0])], position[get_site(elem[1][1][0])]))
+        self.previous_edges = edges
+        return [edge for _, edge in edges]
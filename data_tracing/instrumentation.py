@@ -0,0 +1,218 @@
+"""
+Instrumentation of the pipeline. The stages of the analysis are wrapped in Profiler.stage, which records the wall
+time, the CPU time, the number of calls and optionally the peak of the memory allocated within the stage, for the
+whole notebook and for every cell. Without instrumentation NULL_PROFILER is used, whose stages do nothing.
+"""
+import cProfile
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+PROFILE_MODES = ('off', 'time', 'memory')
+# Number of cells listed in the table of the report
+TABLE_CELLS = 5
+
+
+class NullProfiler:
+    """
+    Profiler which records nothing, its stages are one shared empty context.
+    """
+    enabled = False
+
+    def __init__(self):
+        self.context = nullcontext()
+
+    def stage(self, name, cell=None):
+        return self.context
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+NULL_PROFILER = NullProfiler()
+
+
+def new_stats():
+    return {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_bytes': None}
+
+
+class Profiler:
+    """
+    Class to record the stages of the analysis of one notebook. Stages can be nested, they are identified by the path
+    of their names, e.g. "build_graph/parse_cells/parse". A stage of a cell passes the cell on to its nested stages.
+    The peak memory of a stage is the highest amount of memory traced by tracemalloc within the stage, minus the
+    amount traced when it started.
+    """
+    enabled = True
+
+    def __init__(self, memory=False, cprofile=False):
+        """
+        :param memory: Trace the allocations with tracemalloc, which slows the analysis down considerably
+        :param cprofile: Run cProfile between start and stop
+        """
+        self.memory = memory
+        self.cprofile = cprofile
+        # DICT( path: stats ), in the order the stages were entered first
+        self.stages = dict()
+        # DICT( cell key: DICT( path: stats ) )
+        self.cells = dict()
+        self.stack = []
+        self.profile = None
+        self.started_tracing = False
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.start_times = None
+
+    def start(self):
+        """
+        Starts tracemalloc and cProfile if requested.
+        """
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+        if self.cprofile:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.start_times = (time.perf_counter(), time.process_time())
+
+    def stop(self):
+        """
+        Stops tracemalloc and cProfile if they were started by this profiler.
+        """
+        if self.start_times is not None:
+            self.wall_seconds += time.perf_counter() - self.start_times[0]
+            self.cpu_seconds += time.process_time() - self.start_times[1]
+            self.start_times = None
+        if self.profile is not None:
+            self.profile.disable()
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    @contextmanager
+    def stage(self, name, cell=None):
+        """
+        Records one call of a stage.
+
+        :param name: Name of the stage
+        :param cell: Key of the cell the stage belongs to, defaults to the cell of the enclosing stage
+        """
+        parent = self.stack[-1] if self.stack else None
+        path = parent['path'] + '/' + name if parent is not None else name
+        if cell is None and parent is not None:
+            cell = parent['cell']
+        stats = self.stages.setdefault(path, new_stats())
+        cell_stats = self.cells.setdefault(cell, dict()).setdefault(path, new_stats()) if cell is not None else None
+        frame = {'path': path, 'cell': cell, 'base': 0, 'peak': 0}
+        tracing = self.memory and tracemalloc.is_tracing()
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            # The peak is reset for this stage, the enclosing stage keeps the peak reached so far
+            if parent is not None:
+                parent['peak'] = max(parent['peak'], peak)
+            tracemalloc.reset_peak()
+            frame['base'] = current
+        self.stack.append(frame)
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            self.stack.pop()
+            peak = None
+            if tracing and tracemalloc.is_tracing():
+                frame['peak'] = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                peak = frame['peak'] - frame['base']
+                if parent is not None:
+                    parent['peak'] = max(parent['peak'], frame['peak'])
+                tracemalloc.reset_peak()
+            for entry in (stats, cell_stats):
+                if entry is not None:
+                    entry['calls'] += 1
+                    entry['wall_seconds'] += wall
+                    entry['cpu_seconds'] += cpu
+                    if peak is not None:
+                        entry['peak_bytes'] = max(entry['peak_bytes'] or 0, peak)
+
+    def report(self):
+        """
+        :return: Dictionary with the totals, the stats of every stage and the stats of every cell
+        """
+        return {'wall_seconds': round(self.wall_seconds, 6),
+                'cpu_seconds': round(self.cpu_seconds, 6),
+                'memory': self.memory,
+                'stages': {path: round_stats(stats) for path, stats in self.stages.items()},
+                'cells': {cell: {path: round_stats(stats) for path, stats in stages.items()}
+                          for cell, stages in self.cells.items()}}
+
+    def cell_seconds(self):
+        """
+        :return: Dictionary with the wall time of every cell, summed over the outermost stages of the cell
+        """
+        seconds = dict()
+        for cell, stages in self.cells.items():
+            seconds[cell] = sum(stats['wall_seconds'] for path, stats in stages.items()
+                                if not any(path.startswith(other + '/') for other in stages))
+        return seconds
+
+    def table(self):
+        """
+        :return: Report as text table, nested stages are indented
+        """
+        total = self.wall_seconds or sum(stats['wall_seconds'] for path, stats in self.stages.items()
+                                         if '/' not in path)
+        lines = ["{:<36} {:>7} {:>10} {:>10} {:>6} {:>10}".format("stage", "calls", "wall [ms]", "cpu [ms]", "%",
+                                                                   "peak [MB]")]
+        for path, stats in self.stages.items():
+            depth = path.count('/')
+            name = "  " * depth + path.rsplit('/', 1)[-1]
+            peak = "-" if stats['peak_bytes'] is None else "{:.2f}".format(stats['peak_bytes'] / 1024 / 1024)
+            lines.append("{:<36} {:>7} {:>10.1f} {:>10.1f} {:>6.1f} {:>10}".format(
+                name[:36], stats['calls'], stats['wall_seconds'] * 1000, stats['cpu_seconds'] * 1000,
+                100 * stats['wall_seconds'] / total if total else 0.0, peak))
+        slowest = sorted(self.cell_seconds().items(), key=lambda item: item[1], reverse=True)[:TABLE_CELLS]
+        if slowest:
+            lines.append("Slowest cells: " + ", ".join(str(cell) + " (" + "{:.1f}".format(seconds * 1000) + " ms)"
+                                                       for cell, seconds in slowest))
+        return "\n".join(lines)
+
+    def write(self, file):
+        """
+        :param file: Path of the JSON file of the report
+        """
+        with open(file, 'w') as fp:
+            json.dump(self.report(), fp, indent=1)
+
+    def dump_stats(self, file):
+        """
+        :param file: Path of the cProfile statistics, readable with pstats or snakeviz
+        :return: True if cProfile was running
+        """
+        if self.profile is None:
+            return False
+        self.profile.dump_stats(file)
+        return True
+
+
+def round_stats(stats):
+    result = dict(stats)
+    result['wall_seconds'] = round(stats['wall_seconds'], 6)
+    result['cpu_seconds'] = round(stats['cpu_seconds'], 6)
+    return result
+
+
+def create_profiler(mode='off', cprofile=False):
+    """
+    :param mode: "off", "time" or "memory", see PROFILE_MODES
+    :param cprofile: Also run cProfile
+    :return: Profiler or NULL_PROFILER if nothing is recorded
+    """
+    if mode == 'off' and not cprofile:
+        return NULL_PROFILER
+    return Profiler(memory=mode == 'memory', cprofile=cprofile)
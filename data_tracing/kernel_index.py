@@ -0,0 +1,190 @@
+"""
+SQLite index of the kernels listed on Kaggle. Every kernel has one row with its listing, the file it was pulled into
+and the hash of that file. The index tells which kernels are new or were run again since they were pulled, and which
+pulled notebooks were not analyzed with their current content, so neither get_kernels.py nor batch_kernels.py has to
+scan the folders of a large corpus.
+"""
+import hashlib
+import os
+import sqlite3
+import time
+
+INDEX_FILE = 'kernels.sqlite'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS kernels (
+    ref TEXT PRIMARY KEY,
+    title TEXT,
+    author TEXT,
+    score INTEGER,
+    last_run_time TEXT,
+    listed_at REAL,
+    -- Result of the last pull, pulled_run_time is the last_run_time of the listing at that time
+    pull_status TEXT,
+    pull_error TEXT,
+    pulled_run_time TEXT,
+    pulled_at REAL,
+    path TEXT,
+    content_hash TEXT,
+    -- Result of the last analysis, analyzed_hash is the content_hash of the analyzed file
+    analysis_status TEXT,
+    analysis_error TEXT,
+    analyzed_hash TEXT,
+    analyzed_at REAL
+);
+CREATE INDEX IF NOT EXISTS kernels_listed_at ON kernels (listed_at);
+CREATE INDEX IF NOT EXISTS kernels_analysis ON kernels (content_hash, analyzed_hash);
+"""
+
+
+def file_hash(file):
+    """
+    :param file: Path of a file
+    :return: SHA-256 of the content of the file
+    """
+    digest = hashlib.sha256()
+    with open(file, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_score(value):
+    """
+    :param value: Votes of the listing
+    :return: Votes as integer or None
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class KernelIndex:
+    """
+    Class to store the listing, the pulls and the analyses of kernels in a SQLite database. Paths are stored relative
+    to the folder of the database, so the folder can be moved together with the pulled kernels. The connection is
+    only used by the thread which opened the index.
+    """
+
+    def __init__(self, file):
+        self.file = file
+        self.base_dir = os.path.dirname(os.path.abspath(file))
+        os.makedirs(self.base_dir, exist_ok=True)
+        self.connection = sqlite3.connect(file)
+        self.connection.row_factory = sqlite3.Row
+        # Readers, e.g. a batch run, do not block a running sync
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def resolve(self, path):
+        """
+        :param path: Path stored in the index
+        :return: Path relative to the working directory
+        """
+        return os.path.join(self.base_dir, path)
+
+    def get(self, ref):
+        """
+        :param ref: Reference of the kernel, i.e. author/slug
+        :return: Row of the kernel or None
+        """
+        return self.connection.execute('SELECT * FROM kernels WHERE ref = ?', (ref,)).fetchone()
+
+    def sync_listing(self, kernels):
+        """
+        Inserts new kernels of a listing and updates the title, score and last run time of known ones.
+
+        :param kernels: Rows of the listing with ref, title, author, totalVotes and lastRunTime
+        :return: Time of the sync, which identifies the kernels of this listing
+        """
+        listed_at = time.time()
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO kernels (ref, title, author, score, last_run_time, listed_at) VALUES (?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT (ref) DO UPDATE SET title = excluded.title, author = excluded.author, '
+                'score = excluded.score, last_run_time = excluded.last_run_time, listed_at = excluded.listed_at',
+                [(kernel['ref'], kernel.get('title'), kernel.get('author'), parse_score(kernel.get('totalVotes')),
+                  kernel.get('lastRunTime'), listed_at) for kernel in kernels])
+        return listed_at
+
+    def pending_pulls(self, listed_at, force=False):
+        """
+        Kernels of a listing which are new, were run again since they were pulled, failed to pull or whose file is
+        missing.
+
+        :param listed_at: Time returned by sync_listing
+        :param force: Return every kernel of the listing
+        :return: List of rows in the order of the listing
+        """
+        rows = self.connection.execute('SELECT * FROM kernels WHERE listed_at = ? ORDER BY rowid',
+                                       (listed_at,)).fetchall()
+        if force:
+            return rows
+        return [row for row in rows if row['pull_status'] != 'ok' or row['pulled_run_time'] != row['last_run_time']
+                or row['path'] is None or not os.path.exists(self.resolve(row['path']))]
+
+    def record_pull(self, ref, status, run_time, path=None, error=None):
+        """
+        Stores the result of a pull. The hash of the pulled file decides whether the kernel is analyzed again.
+
+        :param ref: Reference of the kernel
+        :param status: "ok" or "failed"
+        :param run_time: Last run time of the listing the kernel was pulled for
+        :param path: Pulled file relative to the folder of the index
+        :param error: Error message of a failed pull
+        """
+        with self.connection:
+            if status == 'ok':
+                self.connection.execute(
+                    'UPDATE kernels SET pull_status = ?, pull_error = NULL, pulled_run_time = ?, pulled_at = ?, '
+                    'path = ?, content_hash = ? WHERE ref = ?',
+                    (status, run_time, time.time(), path, file_hash(self.resolve(path)), ref))
+            else:
+                # The previously pulled file, if any, stays valid
+                self.connection.execute('UPDATE kernels SET pull_status = ?, pull_error = ?, pulled_at = ? '
+                                        'WHERE ref = ?', (status, error, time.time(), ref))
+
+    def pending_analysis(self, retry_failed=False):
+        """
+        Pulled notebooks which were not analyzed with their current content.
+
+        :param retry_failed: Also return notebooks whose last analysis failed
+        :return: List of tuples of the ref, the path and the content hash
+        """
+        rows = self.connection.execute(
+            "SELECT ref, path, content_hash FROM kernels WHERE path LIKE '%.ipynb' AND content_hash IS NOT NULL "
+            "AND (analyzed_hash IS NOT content_hash OR (? AND analysis_status IS NOT 'ok')) ORDER BY rowid",
+            (retry_failed,)).fetchall()
+        return [(row['ref'], self.resolve(row['path']), row['content_hash']) for row in rows]
+
+    def record_analysis(self, ref, content_hash, status, error=None):
+        """
+        :param ref: Reference of the kernel
+        :param content_hash: Hash of the analyzed file
+        :param status: Status of the analysis, e.g. "ok", "failed" or "timeout"
+        :param error: Error message of a failed analysis
+        """
+        with self.connection:
+            self.connection.execute('UPDATE kernels SET analysis_status = ?, analysis_error = ?, analyzed_hash = ?, '
+                                    'analyzed_at = ? WHERE ref = ?',
+                                    (status, error, content_hash, time.time(), ref))
+
+    def count(self):
+        """
+        :return: Dictionary with the number of kernels, of pulled kernels and of analyzed kernels
+        """
+        row = self.connection.execute(
+            "SELECT COUNT(*), COUNT(CASE WHEN pull_status = 'ok' THEN 1 END), "
+            "COUNT(CASE WHEN analysis_status = 'ok' AND analyzed_hash IS content_hash THEN 1 END) FROM kernels"
+        ).fetchone()
+        return {'kernels': row[0], 'pulled': row[1], 'analyzed': row[2]}
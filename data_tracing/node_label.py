@@ -0,0 +1,162 @@
+"""
+Structured HTML-like labels of the graph nodes. The tables are kept as objects while the graph is built and are
+rendered to the Graphviz HTML syntax once, when the labels are added to the graph.
+"""
+import functools
+import html
+import math
+
+# Default font of Graphviz
+FONT_SIZE = 14
+# Advance widths of the printable ASCII characters (" " to "~") of Times-Roman in 1/1000 of the font size
+TIMES_ROMAN_WIDTHS = (
+    250, 333, 408, 500, 500, 833, 778, 333, 333, 333, 500, 564, 250, 333, 250, 278,
+    500, 500, 500, 500, 500, 500, 500, 500, 500, 500, 278, 278, 564, 564, 564, 444,
+    921, 722, 667, 667, 722, 611, 556, 722, 722, 333, 389, 722, 611, 889, 722, 722,
+    556, 722, 667, 556, 611, 722, 722, 944, 722, 722, 611, 333, 278, 333, 469, 500,
+    333, 444, 500, 444, 500, 444, 333, 500, 500, 278, 278, 500, 278, 778, 500, 500,
+    500, 500, 333, 389, 278, 500, 500, 722, 500, 500, 444, 480, 200, 480, 541,
+)
+# Width of all other characters
+DEFAULT_CHAR_WIDTH = 500
+# Graphviz falls back to a wider font if Times-Roman is not installed, widths are overestimated by this factor so the
+# tables are still wide enough
+TEXT_WIDTH_MARGIN = 1.3
+
+
+@functools.lru_cache(maxsize=8192)
+def text_width(text, font_size=FONT_SIZE):
+    """
+    Estimates the width of a text of a cell with the font metrics of Times-Roman.
+
+    :param text: Escaped content of a cell
+    :param font_size: Size of the font in points
+    :return: Width in points
+    """
+    width = 0
+    for char in html.unescape(text):
+        code = ord(char) - 32
+        width += TIMES_ROMAN_WIDTHS[code] if 0 <= code < len(TIMES_ROMAN_WIDTHS) else DEFAULT_CHAR_WIDTH
+    return width * font_size / 1000 * TEXT_WIDTH_MARGIN
+
+
+class TableCell:
+    """
+    Class for one <TD> of a table. The text is inserted as it is, so it has to be escaped already.
+    """
+    __slots__ = ('text', 'port', 'attributes')
+
+    def __init__(self, text='', port=None, **attributes):
+        """
+        :param text: Content of the cell
+        :param port: Port of the cell, edges of the data flow start and end at the ports
+        :param attributes: Further attributes of the cell, e.g. STYLE="ROUNDED"
+        """
+        self.text = text
+        self.port = port
+        self.attributes = attributes
+
+    def render(self, color=None):
+        """
+        :param color: Color of the border of the cell or None
+        :return: Cell in the Graphviz HTML syntax
+        """
+        html_str = "<TD" + "".join(" " + key + "=\"" + str(value) + "\"" for key, value in self.attributes.items())
+        if self.port is not None:
+            html_str += " PORT=\"" + self.port + "\""
+        if color is not None:
+            html_str += " COLOR=\"" + color + "\""
+        return html_str + ">" + self.text + "</TD>"
+
+    def get_width(self, cellpadding, cellborder):
+        """
+        :param cellpadding: CELLPADDING of the table
+        :param cellborder: CELLBORDER of the table
+        :return: Estimated width of the cell in points
+        """
+        width = text_width(self.text) + 2 * (cellpadding + cellborder)
+        if "WIDTH" in self.attributes:
+            width = max(width, float(self.attributes["WIDTH"]))
+        return width
+
+
+class TableLabel:
+    """
+    Class for a label with one table. The colors of the cells are not part of the table, they are passed to render,
+    so the same table can be colored differently in every graph it is used in.
+    """
+    __slots__ = ('rows', 'attributes')
+
+    def __init__(self, **attributes):
+        """
+        :param attributes: Attributes of the table, e.g. BORDER="0"
+        """
+        self.rows = []
+        self.attributes = attributes
+
+    def add_row(self, cells):
+        """
+        :param cells: TableCells of the row
+        :return: The table itself
+        """
+        self.rows.append(list(cells))
+        return self
+
+    def ports(self):
+        """
+        :return: Ports of all cells
+        """
+        return [cell.port for row in self.rows for cell in row if cell.port is not None]
+
+    def get_width(self):
+        """
+        Estimates the width of the rendered table like Graphviz sizes HTML tables: every column is as wide as its
+        widest cell, cells spanning several columns widen these columns evenly, the columns are separated by
+        CELLSPACING and the table is surrounded by its BORDER. The WIDTH of the table itself is ignored.
+
+        :return: Estimated width of the table in points
+        """
+        border = float(self.attributes.get("BORDER", 1))
+        cellspacing = float(self.attributes.get("CELLSPACING", 2))
+        cellpadding = float(self.attributes.get("CELLPADDING", 2))
+        cellborder = float(self.attributes.get("CELLBORDER", border))
+
+        # Place the cells in the grid, cells with ROWSPAN occupy the columns of the following rows
+        occupied = set()
+        placed = []
+        for r, row in enumerate(self.rows):
+            col = 0
+            for cell in row:
+                while (r, col) in occupied:
+                    col += 1
+                colspan = int(cell.attributes.get("COLSPAN", 1))
+                rowspan = int(cell.attributes.get("ROWSPAN", 1))
+                for i in range(r, r + rowspan):
+                    for j in range(col, col + colspan):
+                        occupied.add((i, j))
+                placed.append((col, colspan, cell.get_width(cellpadding, cellborder)))
+                col += colspan
+        columns = [0.0] * max((col + colspan for col, colspan, _ in placed), default=0)
+        for col, colspan, width in placed:
+            if colspan == 1:
+                columns[col] = max(columns[col], width)
+        for col, colspan, width in placed:
+            if colspan > 1:
+                missing = width - (colspan - 1) * cellspacing - sum(columns[col:col + colspan])
+                if missing > 0:
+                    for j in range(col, col + colspan):
+                        columns[j] += missing / colspan
+        return int(math.ceil(sum(columns) + (len(columns) + 1) * cellspacing + 2 * border))
+
+    def render(self, port_colors=None):
+        """
+        :param port_colors: Dictionary with the color of the cell of every port, cells without a color keep the
+                            default color
+        :return: Label in the Graphviz HTML syntax
+        """
+        port_colors = port_colors if port_colors is not None else dict()
+        html_str = "<<TABLE" + "".join(" " + key + "=\"" + str(value) + "\"" for key, value in self.attributes.items())
+        html_str += ">"
+        for row in self.rows:
+            html_str += "<TR>" + "".join(cell.render(port_colors.get(cell.port)) for cell in row) + "</TR>"
+        return html_str + "</TABLE>>"
@@ -0,0 +1,268 @@
+"""
+Streaming reader of the code cells of a notebook. The file is read in chunks and only the type, the source and the
+execution count of the cells are decoded. Outputs, e.g. base64 images, are skipped without being decoded or kept in
+memory. Notebooks older than nbformat 4 are read by nbformat.
+"""
+import json
+import re
+
+# Size of the chunks read from the file in characters
+CHUNK_SIZE = 64 * 1024
+# Keys of a cell which are decoded, all other values are skipped
+CELL_KEYS = ('cell_type', 'source', 'execution_count')
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+# A complete string or a single quote if the string does not end within the buffer
+STRING = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|"', re.DOTALL)
+# Characters which start a string or change the nesting depth
+STRUCTURE = re.compile(r'["\[\]{}]')
+
+
+class NotebookFormatError(ValueError):
+    """
+    Raised if the notebook has no list of cells, i.e. it was written by nbformat 3 or older.
+    """
+
+
+class JsonStream:
+    """
+    Class to read the tokens of a JSON document from a file object. Only the unread rest of the current chunk is kept
+    in memory, plus the value which is read at the moment.
+    """
+
+    def __init__(self, fp, chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def fill(self):
+        """
+        Drops the read part of the buffer and appends the next chunk of the file.
+
+        :return: False at the end of the file
+        """
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        self.eof = not chunk
+        return not self.eof
+
+    def peek(self):
+        """
+        :return: Next character after whitespace or "" at the end of the file
+        """
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def expect(self, chars):
+        """
+        :param chars: Allowed characters
+        :return: The next character, which has to be one of chars
+        """
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError("Expecting one of '" + chars + "'", self.buffer, self.pos)
+        self.pos += 1
+        return char
+
+    def read_string(self):
+        """
+        :return: Next value, which has to be a string
+        """
+        if self.peek() != '"':
+            raise json.JSONDecodeError("Expecting string", self.buffer, self.pos)
+        while True:
+            match = STRING.match(self.buffer, self.pos)
+            # A single quote is matched if the string does not end within the buffer
+            if match.end() - match.start() > 1:
+                self.pos = match.end()
+                return json.loads(match.group())
+            if not self.fill():
+                raise json.JSONDecodeError("Unterminated string", self.buffer, self.pos)
+
+    def read_value(self):
+        """
+        Decodes the next value, only used for small values like the source of a cell.
+
+        :return: Next value
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            # A number at the end of the buffer might continue in the next chunk
+            if end < len(self.buffer) or not self.fill():
+                self.pos = end
+                return value
+
+    def skip_string(self):
+        """
+        Moves behind the closing quote of the string the position is in.
+
+        :return: False if the string does not end within the buffer
+        """
+        buffer = self.buffer
+        index = buffer.find('"', self.pos)
+        while index != -1:
+            # The quote is escaped if it follows an odd number of backslashes
+            start = index
+            while start > 0 and buffer[start - 1] == '\\':
+                start -= 1
+            if (index - start) % 2 == 0:
+                self.pos = index + 1
+                return True
+            index = buffer.find('"', index + 1)
+        # Backslashes at the end of the buffer are kept, they might escape the first character of the next chunk
+        end = len(buffer)
+        while end > self.pos and buffer[end - 1] == '\\':
+            end -= 1
+        self.pos = end
+        return False
+
+    def skip_value(self):
+        """
+        Skips the next value without decoding it. Strings are skipped chunk by chunk, so long outputs are never kept
+        in memory as a whole.
+        """
+        char = self.peek()
+        if char not in '"[{':
+            self.read_value()
+            return
+        depth = 0
+        in_string = False
+        while True:
+            if in_string:
+                if self.skip_string():
+                    in_string = False
+                    if depth == 0:
+                        return
+                    continue
+            else:
+                match = STRUCTURE.search(self.buffer, self.pos)
+                if match is not None:
+                    self.pos = match.end()
+                    token = match.group()
+                    if token == '"':
+                        in_string = True
+                        continue
+                    depth += 1 if token in '[{' else -1
+                    if depth == 0:
+                        return
+                    continue
+                self.pos = len(self.buffer)
+            # The value continues in the next chunk
+            if not self.fill():
+                raise json.JSONDecodeError("Unterminated value", self.buffer, self.pos)
+
+    def iter_object(self):
+        """
+        Iterates over the keys of the next object. The value of every key has to be read or skipped before the
+        iteration continues.
+
+        :return: Generator of the keys
+        """
+        self.expect('{')
+        if self.peek() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_string()
+            self.expect(':')
+            yield key
+            if self.expect(',}') == '}':
+                return
+
+    def iter_array(self):
+        """
+        Iterates over the elements of the next array. Every element has to be read or skipped before the iteration
+        continues.
+
+        :return: Generator of the indices of the elements
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        index = 0
+        while True:
+            yield index
+            index += 1
+            if self.expect(',]') == ']':
+                return
+
+
+def read_cell(stream):
+    """
+    :param stream: JsonStream positioned at a cell
+    :return: Dictionary with the type, the source and the execution count of the cell
+    """
+    cell = {'cell_type': None, 'source': '', 'execution_count': None}
+    for key in stream.iter_object():
+        if key in CELL_KEYS:
+            cell[key] = stream.read_value()
+        else:
+            stream.skip_value()
+    if isinstance(cell['source'], list):
+        cell['source'] = ''.join(cell['source'])
+    return cell
+
+
+def iter_code_cells(fp, chunk_size=CHUNK_SIZE):
+    """
+    Yields the code cells of a notebook while the file is read.
+
+    :param fp: File object of the notebook opened in text mode
+    :param chunk_size: Size of the chunks read from the file
+    :return: Generator of dictionaries with the cell_type, the source and the execution_count of the code cells
+    """
+    stream = JsonStream(fp, chunk_size)
+    found_cells = False
+    for key in stream.iter_object():
+        if key == 'cells':
+            found_cells = True
+            for _ in stream.iter_array():
+                cell = read_cell(stream)
+                if cell['cell_type'] == 'code':
+                    yield cell
+        elif key == 'nbformat' and not found_cells:
+            version = stream.read_value()
+            if isinstance(version, int) and version < 4:
+                raise NotebookFormatError("nbformat " + str(version) + " has no list of cells")
+        else:
+            stream.skip_value()
+    if not found_cells:
+        raise NotebookFormatError("Notebook has no list of cells")
+
+
+def read_code_cells(file):
+    """
+    Reads the code cells of a notebook. Notebooks without a list of cells are converted by nbformat.
+
+    :param file: Path of the notebook
+    :return: List of dictionaries with the cell_type, the source and the execution_count of the code cells
+    """
+    try:
+        with open(file, encoding='utf-8') as fp:
+            return list(iter_code_cells(fp))
+    except NotebookFormatError:
+        pass
+    # nbformat is only imported for old notebooks, it takes longer to import than to read most notebooks
+    import nbformat
+    with open(file, encoding='utf-8') as fp:
+        notebook = nbformat.read(fp, as_version=4)
+    return [{'cell_type': cell['cell_type'], 'source': cell['source'],
+             'execution_count': cell.get('execution_count')}
+            for cell in notebook['cells'] if cell['cell_type'] == 'code']
@@ -0,0 +1,84 @@
+"""
+Overview of very large notebooks. Every cell is collapsed to one summary node with the variables it defines and uses,
+the data flow edges are aggregated between the cells. Selected cells can be expanded to the full graph of the cell.
+"""
+import ast
+import math
+
+from data_tracing.node_label import TableCell, TableLabel
+
+# Notebooks with more cells or more estimated nodes are shown as overview, unless the mode is chosen explicitly
+OVERVIEW_CELLS = 200
+OVERVIEW_NODES = 4000
+# Variables listed in a row of a summary node, the remaining ones are counted
+MAX_SUMMARY_NAMES = 8
+
+
+def summary_node(cell_key):
+    """
+    :param cell_key: Key of the cell
+    :return: Name of the summary node of the cell
+    """
+    return "Cell_c" + cell_key
+
+
+def estimate_nodes(visitors):
+    """
+    :param visitors: AstVisitor of every cell
+    :return: Estimated number of nodes of the full graph, every statement has a node and a line node
+    """
+    return sum(2 * len(visitor.cfg_nodes) + 2 for visitor in visitors.values())
+
+
+def get_cell_names(name_list):
+    """
+    Groups the names found by the DataFlowExtractor by cell.
+
+    :param name_list: List of tuples of ast.Name and cell key, see DataFlowExtractor.walk_tree_by_name
+    :return: Dictionary with the defined and the used identifiers of every cell in the order of their first occurrence
+    """
+    cell_names = dict()
+    for node, cell_key in name_list:
+        defined, used = cell_names.setdefault(cell_key, (dict(), dict()))
+        if isinstance(node.ctx, ast.Store):
+            defined.setdefault(node.id, None)
+        elif isinstance(node.ctx, ast.Load):
+            used.setdefault(node.id, None)
+    return {cell_key: (list(defined), list(used)) for cell_key, (defined, used) in cell_names.items()}
+
+
+def names_text(names):
+    """
+    :param names: Identifiers
+    :return: Text of a row of the summary node
+    """
+    text = ", ".join(names[:MAX_SUMMARY_NAMES])
+    if len(names) > MAX_SUMMARY_NAMES:
+        text += " (+" + str(len(names) - MAX_SUMMARY_NAMES) + ")"
+    return text if text else "-"
+
+
+def summary_table(cell_key, defined, used):
+    """
+    :param cell_key: Key of the cell
+    :param defined: Identifiers stored in the cell
+    :param used: Identifiers loaded in the cell
+    :return: Table of the summary node of the cell
+    """
+    table = TableLabel(STYLE="ROUNDED", BORDER="1", CELLBORDER="0", CELLSPACING="0", CELLPADDING="4")
+    table.add_row([TableCell("<B>Cell " + cell_key + "</B>", COLSPAN="2")])
+    table.add_row([TableCell("defines:", ALIGN="LEFT"), TableCell(names_text(defined), ALIGN="LEFT")])
+    table.add_row([TableCell("uses:", ALIGN="LEFT"), TableCell(names_text(used), ALIGN="LEFT")])
+    return table
+
+
+def aggregated_edge_attributes(names, colors):
+    """
+    :param names: Identifiers flowing from one cell into another
+    :param colors: Dictionary with the color of every identifier
+    :return: Attributes of the aggregated data flow edge, wider for more variables
+    """
+    return {"color": colors[names[0]] if len(names) == 1 else "black",
+            "penwidth": str(round(1 + math.log2(len(names)), 2)),
+            "arrowsize": "0.65",
+            "tooltip": ", ".join(names)}
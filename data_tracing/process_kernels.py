@@ -1,730 +1,1224 @@
-import ast
-import copy
-import csv
-import itertools
-import os
-import subprocess
-import time
-
-import matplotlib.pyplot as plt
-import pygraphviz as pgv
-import squarify
-from alive_progress import alive_bar
-from bs4 import BeautifulSoup
-from nbformat import read, NO_CONVERT
-
-from data_tracing.extract_cfg import ControlFlowExtractor
-from data_tracing.extract_dfg import DataFlowExtractor
-
-type_check_ld_st = lambda arg: not (isinstance(arg, ast.Load)
-                                    or isinstance(arg, ast.Store)
-                                    or isinstance(arg, ast.operator)
-                                    or isinstance(arg, ast.unaryop))
-
-
-def cmp_on_id_lvl(nd_x, nd_y):
-    """
-
-    :param nd_x:
-    :param nd_y:
-    :return:
-    """
-    if isinstance(nd_x, ast.Name) and isinstance(nd_y, ast.Name):
-        return nd_x.id == nd_y.id
-    else:
-        return False
-
-
-def count_name_occurence(alias_: str, cell_: ast.AST):
-    """
-    Counts occurrences of every alias in the AST of one cell. Returns the count.
-
-    :param alias_: alias to count over
-    :param cell_: ast with nodes to iterate over
-    """
-    counter = 0
-    for child_ in ast.walk(cell_):
-        if isinstance(child_, ast.Name):
-            if child_.id == alias_:
-                counter += 1
-    return counter
-
-
-def get_all_alias(cell_: ast.AST):
-    """
-
-    :param cell_:
-    """
-    for child_ in ast.walk(cell_):
-        if isinstance(child_, ast.alias):
-            if child_.asname is not None:
-                yield child_.asname
-            else:
-                yield child_.name
-
-
-def node_str_generator(ast_node, current_cell):
-    """
-
-    :param current_cell: Current cell resulting from the notebook.
-    :param ast_node: Node from the ast which has all the information to create a label for the graph
-
-    :return: name for the node in the graph and dictionary with attributes
-    """
-    if isinstance(ast_node, str):
-        return ast_node, {}
-    cell_str = "$cell" + str(current_cell)
-    attribute_dict = dict()
-    attribute_dict["margin"] = "0.1"
-    if isinstance(ast_node, ast.Module):
-        label = ''
-        attribute_dict["label"] = label
-        attribute_dict["shape"] = "plaintext"
-    elif isinstance(ast_node, ast.For):
-        temp = copy.deepcopy(ast_node)
-        temp.body.clear()
-        label = ast.unparse(temp)
-        attribute_dict["label"] = label
-    elif isinstance(ast_node, ast.FunctionDef):
-        attributes = ast_node.__dict__
-        label = "FunctionDef\\n"
-        name = attributes['name']
-        attribute_dict["label"] = label + name
-    elif isinstance(ast_node, ast.Name):
-        attributes = ast_node.__dict__
-        label = attributes['id']
-        attribute_dict["label"] = label
-    elif isinstance(ast_node, ast.Assign):
-        code_line = ast.unparse(ast_node)
-        code_line_split = code_line.split("=")
-        label = "=" + code_line_split[0]
-        attribute_dict["label"] = label
-    elif isinstance(ast_node, ast.Import) or isinstance(ast_node, ast.ImportFrom) \
-            or isinstance(ast_node, ast.Expr):
-        code_line = ast.unparse(ast_node)
-        label = code_line
-        attribute_dict["label"] = label
-    elif isinstance(ast_node, ast.Call):
-        code_line = ast.unparse(ast_node)
-        label = code_line
-        attribute_dict["label"] = label
-    elif isinstance(ast_node, ast.Constant):
-        attributes = ast_node.__dict__
-        value = attributes['value']
-        label = "\'" + str(value) + "\'"
-        attribute_dict["label"] = label
-    elif isinstance(ast_node, ast.Attribute):
-        code_line = ast.unparse(ast_node)
-        label = code_line
-        attribute_dict["label"] = label
-    elif isinstance(ast_node, ast.Dict):
-        code_line = ast.unparse(ast_node)
-        code_line.replace("{", 'U+007B')
-        label = code_line
-        attribute_dict["label"] = label
-    elif isinstance(ast_node, ast.arg):
-        attributes = ast_node.__dict__
-        arg = attributes['arg']
-        label = "arg\\n" + str(arg)
-        attribute_dict["label"] = label
-    else:
-        code_line = ast.unparse(ast_node)
-        label = code_line
-        attribute_dict["label"] = label
-    return label + str(ast_node) + cell_str, attribute_dict
-
-
-def node_traversal(nd, current_cell):
-    """
-    Function traverses the ast of the code beginning from the module node of the ast. Each ast corresponds
-    to a code cell in the jupyter notebook file.
-
-    :param current_cell: Cell in which the ast is traversed, cell from the notebook
-    :param nd: current node in the ast
-    """
-    skip_edge_list = False
-
-    node_str, attribute_dict = node_str_generator(nd, current_cell)
-    if not (node_str in node_list) and type_check_ld_st(nd):
-        node_list.append((node_str, attribute_dict))
-    if isinstance(nd, ast.AST):
-        if isinstance(nd, ast.FunctionDef):
-            skip_edge_list = True
-        lst = ast.iter_fields(nd)
-        for field, value in lst:
-            # Delete forward edges from function_def, so in other words skip body of function node.
-            if skip_edge_list and field == "body":
-                # In case we have a ast.FunctionDef and the field is body we skip the edges.
-                if isinstance(value, list):
-                    for child in value:
-                        if isinstance(child, ast.AST) and type_check_ld_st(child):
-                            node_traversal(child, current_cell)
-                elif isinstance(value, ast.AST) and type_check_ld_st(value):
-                    node_traversal(value, current_cell)
-            else:
-                # Insert every edge in the edge list as normal into the AST
-                if isinstance(value, list):
-                    for child in value:
-                        if isinstance(child, ast.AST) and type_check_ld_st(child):
-                            edge_list.append((node_str, node_str_generator(child, current_cell)[0]))
-                            node_traversal(child, current_cell)
-                elif isinstance(value, ast.AST) and type_check_ld_st(value):
-                    edge_list.append((node_str, node_str_generator(value, current_cell)[0]))
-                    node_traversal(value, current_cell)
-
-
-def update_html(n_attr, name, n_v_tuple):
-    """
-
-    :param n_attr:
-    :return:
-    """
-    html_str = n_attr["label"]
-    soup = BeautifulSoup(html_str, features="lxml")
-    for repElem in soup.find_all("td"):
-        if "port" in repElem.attrs.keys():
-            if trim_string(name) == repElem.attrs["port"]:
-                repElem.attrs["color"] = look_up_color[n_v_tuple[0].id]
-    html_str_updated = "<" + str(soup.find("table")) + ">"
-    n_attr["label"] = html_str_updated
-    return n_attr
-
-
-def parse_list(line_list):
-    """
-    Iterates over of string and yield every successful parsed line.
-
-    :param line_list:
-    """
-    for elem in line_list:
-        try:
-            _ = ast.parse(source=elem)
-            yield elem
-        except SyntaxError:
-            print('SyntaxError due to line: ' + elem + '\n')
-
-
-def trim_string(node_str):
-    """
-
-    :param node_str:
-    :return:
-    """
-    return str(int.from_bytes(node_str.encode(), 'little'))
-
-
-def prepare_html(s):
-    """
-
-    :param s:
-    """
-    s = s.replace("<", "&lt;")
-    s = s.replace(">", "&gt;")
-    return s
-
-
-def get_width_of_table(html_str):
-    """
-    Calculates the width of an HTML element by calling render_html.py
-
-    :param html_str: Valid HTML code
-    :return: offsetWidth of the rendered HTML element
-    """
-    p = subprocess.Popen(['python', 'render_html.py', html_str], stdout=subprocess.PIPE)
-    width = int(p.stdout.readline().decode('utf-8'))
-    p.wait()
-    p.kill()
-    return width
-
-
-def process_node(node, cell_key):
-    """
-
-    :param node:
-    :param cell_key:
-    """
-    dfg_ex = DataFlowExtractor(node)
-    attr_node_dict = {"shape": "plaintext", "margin": "0.1"}
-    if isinstance(node, ast.Assign):
-        to_exclude = []
-        for target in node.targets:
-            for child in ast.walk(target):
-                if isinstance(child, ast.Name):
-                    to_exclude.append(child)
-        dfg_node_list = dfg_ex.walk_tree_by_name(no_dict=True, ast=node, cell_num=cell_key, to_exclude=to_exclude)
-        rowspan = 2
-        if len(dfg_node_list) == 0:
-            rowspan = 1
-        target_string = "<<TABLE WIDTH=\"\" BORDER=\"0\" CELLBORDER=\"1\" CELLSPACING=\"4\" CELLPADDING=\"4\">" \
-                        + "<TR>" \
-                        + "".join(["<TD STYLE=\"ROUNDED\" ROWSPAN=\"" + str(rowspan)
-                                   + "\" PORT=\"" + trim_string(node_str_generator(n, cell_key)[0])
-                                   + "\">"
-                                   + prepare_html((node_str_generator(n, cell_key)[1])["label"])
-                                   + "</TD>"
-                                   for n in to_exclude]) \
-                        + "<TD STYLE=\"ROUNDED\" COLSPAN=\"" + str(max(1, len(dfg_node_list))) + "\">" \
-                        + prepare_html((node_str_generator(node.value, cell_key)[1])["label"]) \
-                        + "</TD>" \
-                        + "</TR>"
-        used_var_str = ""
-        if len(dfg_node_list) > 0:
-            used_var_str += "<TR>" + "".join(["<TD STYLE=\"ROUNDED\" PORT=\""
-                                              + trim_string(node_str_generator(n, int(val))[0])
-                                              + "\">"
-                                              + prepare_html((node_str_generator(n, int(val))[1])["label"])
-                                              + "</TD>"
-                                              for n, val in dfg_node_list]) + "</TR>"
-        label = target_string + used_var_str + "</TABLE>>"
-        attr_node_dict["label"] = label
-    elif isinstance(node, ast.Expr):
-        dfg_node_list = dfg_ex.walk_tree_by_name(no_dict=True, ast=node, cell_num=cell_key, to_exclude=[])
-        label = prepare_html((node_str_generator(node, cell_key)[1])["label"])
-        label = "<<TABLE WIDTH=\"\" BORDER=\"0\" CELLBORDER=\"1\" CELLSPACING=\"4\" " \
-                + "CELLPADDING=\"4\">" \
-                + "<TR><TD STYLE=\"ROUNDED\" COLSPAN=\"" \
-                + str(max(1, len(dfg_node_list))) + "\">" + label + "</TD></TR>"
-        if len(dfg_node_list) > 0:
-            label += "<TR>" + "".join(["<TD STYLE=\"ROUNDED\" PORT=\""
-                                       + trim_string(node_str_generator(var, cell_key)[0])
-                                       + "\">"
-                                       + prepare_html(((node_str_generator(var, cell_num))[1])["label"])
-                                       + "</TD>"
-                                       for var, cell_num in dfg_node_list]) + "</TR></TABLE>>"
-        else:
-            label += "</TABLE>>"
-        attr_node_dict["label"] = label
-    elif isinstance(node, ast.Import) or isinstance(node, ast.ImportFrom):
-        # Alias are not tracked throughout the document
-        label = "<<TABLE STYLE=\"ROUNDED\" WIDTH=\"\" BORDER=\"0\" CELLBORDER=\"1\" CELLSPACING=\"4\" " \
-                + "CELLPADDING=\"4\">" \
-                + "<TR><TD STYLE=\"ROUNDED\">" + prepare_html((node_str_generator(node, cell_key)[1])["label"]) \
-                + "</TD></TR></TABLE>>"
-        attr_node_dict["label"] = label
-    elif isinstance(node, ast.If) or isinstance(node, ast.For):
-        table_head = "IF"
-        to_exclude = []
-        if isinstance(node, ast.For):
-            table_head = "FOR"
-            test = node
-            for line in test.body:
-                for child in ast.walk(line):
-                    if isinstance(child, ast.Name):
-                        to_exclude.append(child)
-        else:
-            test = node.__dict__['test']
-        dfg_node_list = dfg_ex.walk_tree_by_name(no_dict=True, ast=test, cell_num=cell_key, to_exclude=to_exclude)
-        label = prepare_html((node_str_generator(test, cell_key)[1])["label"])
-        rowspan = 2
-        if len(dfg_node_list) == 0:
-            rowspan = 1
-        label = "<<TABLE WIDTH=\"\" BORDER=\"0\" CELLBORDER=\"1\" CELLSPACING=\"4\" CELLPADDING=\"4\">" \
-                + "<TR><TD STYLE=\"ROUNDED\" ROWSPAN=\"" + str(rowspan) + "\">" + table_head + "</TD>" \
-                + "<TD STYLE=\"ROUNDED\" COLSPAN=\"" \
-                + str(max(1, len(dfg_node_list))) + "\">" + label + "</TD></TR>"
-        if len(dfg_node_list) > 0:
-            label += "<TR>" + "".join(["<TD STYLE=\"ROUNDED\" PORT=\""
-                                       + trim_string(node_str_generator(var, cell_key)[0])
-                                       + "\">"
-                                       + prepare_html(((node_str_generator(var, cell_num))[1])["label"])
-                                       + "</TD>"
-                                       for var, cell_num in dfg_node_list]) + "</TR></TABLE>>"
-        else:
-            label += "</TABLE>>"
-        attr_node_dict["label"] = label
-
-    return node_str_generator(node, cell_key)[0], attr_node_dict
-
-
-if __name__ == "__main__":
-    ext = '.ipynb'
-    path = '../notebooks/'
-    dir_list = os.listdir(path)
-    print("Files in directory:")
-    for i in range(len(dir_list)):
-        print(str(i) + ": " + str(dir_list[i]))
-
-    file = "example_notebook_overview.ipynb"
-
-    not_chosen = True
-    while not_chosen:
-        file_index = input("\nChoose file from [0," + str(len(dir_list)-1) + "]:")
-        try:
-            if 0 <= int(file_index) < len(dir_list):
-                file = dir_list[int(file_index)]
-                not_chosen = False
-            else:
-                print("Index " + str(file_index) + " out of bounds")
-        except ValueError as ex:
-            print(ex.__str__())
-
-    with open(path + file) as fp:
-        notebook = read(fp, NO_CONVERT)
-    cells = notebook['cells']
-    code_cells = [c for c in cells if c['cell_type'] == 'code']
-
-    # One ast (ready for the graph) for every code cell, contains (List of nodes, List of edges)
-    ast_dict = dict()
-    # Dictionary with the ASTs itself
-    ast_dict_parsed = dict()
-
-    # Node and edge lists
-    node_list = []
-    edge_list = []
-    # Module node for every cell or cluster
-    cluster_head_list = []
-
-    for cell, i in itertools.zip_longest(code_cells, range(len(code_cells))):
-        source = cell['source']
-        try:
-            ast_cell = ast.parse(source=source)
-            # print(source + '\n')
-        except SyntaxError:
-            print('Cell: Parsing failed with SyntaxError')
-            lst = list(parse_list(source.split('\n')))
-            new_source_code = '\n'.join(lst)
-            ast_cell = ast.parse(source=new_source_code)
-            del lst
-            del new_source_code
-        # Save ast itself for the CFG extraction (and data flow)
-        body = ast_cell.__dict__['body']
-        if len(body) > 0:
-            ast_dict_parsed[str(i)] = ast_cell
-            node_traversal(ast_cell, i)
-            ast_dict[str(i)] = (node_list.copy(), edge_list.copy())
-            node_list.clear()
-            edge_list.clear()
-
-    # Create graph from edge list and nodelist using the dot-layout
-    G = pgv.AGraph(strict=False,
-                   directed=True,
-                   label="ast_" + file,
-                   compound=True,
-                   rankdir="TB",
-                   splines="spline")
-    # Set some default attributes
-    G.node_attr['shape'] = 'plaintext'
-
-    # Dictionary with nodes of the cfg for every cell
-    cfg_dict = dict()
-    # Dictionary with the node of the control flow excluding ast.Module for the DataFlow
-    ast_cfg_nodes_dict = dict()
-
-    # Assign nodes to be processed later
-    assign_nodes = []
-
-    # Extract the flow graphs from the ASTs of every cell in the jupyter notebook (potentially)
-    cfg_ex = ControlFlowExtractor()
-
-    # List with all nodes
-    line_nodes = []
-    last_line_nodes = []
-
-    with alive_bar(len(ast_dict_parsed.keys()),
-                   theme='smooth',
-                   stats=False,
-                   monitor="{count}/{total}",
-                   force_tty=True,
-                   title='Processing Cells') as bar:
-        for cell_key in ast_dict_parsed.keys():
-            ast_cell = ast_dict_parsed[cell_key]
-            cfg_ex.extract_CFG(ast_cell)
-
-            # Call this get_edge_list() before get.nodes() to include targets and values of ast.Assign
-            edge_list = cfg_ex.get_edge_list()
-            # Save for DataFlowExtractor later
-            ast_cfg_nodes_dict[cell_key] = cfg_ex.get_nodes(skip_module=True)
-
-            cluster_head = None
-            # "nodes" has string and attribute dict as content
-            nodes = []
-
-            # html nodes
-            html_nodes = []
-            skip_first_cell = False
-
-            if cell_key == str(0):
-                if all(map(lambda elem: isinstance(elem, ast.Import)
-                                        or isinstance(elem, ast.ImportFrom),
-                           cfg_ex.get_nodes(skip_module=True))):
-                    skip_first_cell = True
-                    list_of_alias = [alias for alias in get_all_alias(ast_cell)]
-                    occurence_dict = {key: 0 for key in list_of_alias}
-                    for cell_num in range(1, len(ast_dict_parsed.keys())):
-                        ast_cell_ = ast_dict_parsed[str(cell_num)]
-                        for alias in list_of_alias:
-                            count = count_name_occurence(alias, ast_cell_)
-                            occurence_dict[alias] += count
-                    # Delete keys with value == 0
-                    to_pop = []
-                    for key in occurence_dict.keys():
-                        if occurence_dict[key] == 0:
-                            to_pop.append(key)
-                    for key in to_pop:
-                        occurence_dict.pop(key)
-                    labels = [key + "(" + str(value) + ")" for key, value in zip(occurence_dict.keys(),
-                                                                                 occurence_dict.values())]
-                    squarify.plot(sizes=occurence_dict.values(), label=labels, alpha=0.6)
-                    plt.axis('off')
-                    image_path = '../output/plot_' + file + '.png'
-                    plt.savefig(image_path, bbox_inches='tight')
-                    edge_list = list(filter(lambda elem: isinstance((elem[0])[0], ast.Module), edge_list))
-                    if len(edge_list) == 1:
-                        node = ((edge_list[0])[0])[1]
-                        node_str, attr_dict = node_str_generator(node, cell_key)
-                        attr_dict['label'] = ''
-                        attr_dict['image'] = image_path
-                        G.add_node(node_str, **attr_dict)
-                        cfg_ex.edge_list_cfg = edge_list
-                        ast_cfg_nodes_dict[cell_key] = [node]
-
-            for node in cfg_ex.get_nodes():
-                if isinstance(node, ast.Module):
-                    cluster_head = node
-                    nodes.append(node_str_generator(node, cell_key))
-                elif isinstance(node, ast.Assign) or isinstance(node, ast.Expr):
-                    html_nodes.append(process_node(node, cell_key))
-                elif isinstance(node, ast.Import) or isinstance(node, ast.ImportFrom):
-                    if not skip_first_cell:
-                        html_nodes.append(process_node(node, cell_key))
-                    else:
-                        node_str, attr_dict = node_str_generator(node, cell_key)
-                        attr_dict['label'] = ""
-                        nodes.append((node_str, attr_dict))
-                elif isinstance(node, ast.If) or isinstance(node, ast.For):
-                    html_nodes.append(process_node(node, cell_key))
-                else:
-                    nodes.append(node_str_generator(node, cell_key))
-
-            # Create html_doc to render and obtain max offsetWidth to ensure left alignment of tables in nodes of the graph
-            html_doc = ""
-            for (node_str, attr_dict) in html_nodes:
-                html_str = attr_dict["label"]
-                html_doc += html_str[1:len(html_str) - 1]
-
-            max_width = 0
-            """if html_doc == "":
-                max_width = 0
-            else:
-                max_width = get_width_of_table(html_doc)"""
-            for (node_str, attr_dict) in html_nodes:
-                label = attr_dict["label"]
-                attr_dict["label"] = label.replace("WIDTH=\"\"", "WIDTH=\"" + str(max_width) + "\"")
-                nodes.append((node_str, attr_dict))
-            html_nodes.clear()
-
-            cfg_nodes_sorted = ast_cfg_nodes_dict[cell_key]
-            cfg_nodes_sorted.sort(key=lambda elem: elem.__dict__["lineno"])
-            previous_node_str = None
-            first = True
-            for node, cell_num in itertools.zip_longest(cfg_nodes_sorted, range(len(cfg_nodes_sorted))):
-                label_ext = ""
-                lineno = str(node.__dict__["lineno"])
-                end_lineno = str(node.__dict__["end_lineno"])
-                # if lineno == end_lineno:
-                label_ext += lineno
-                # else:
-                #     label_ext += lineno + "-" + end_lineno
-                node_str = node_str_generator(node, cell_key)[0] + "$line" + label_ext
-                if first:
-                    line_nodes.append(node_str)
-                    first = False
-                if cell_num == len(cfg_nodes_sorted) - 1:
-                    last_line_nodes.append(node_str)
-                color = "grey"
-                if node in cfg_ex.true_list:
-                    color = "green"
-                elif node in cfg_ex.false_list:
-                    color = "red"
-                font_string = "<B>Line</B> " + label_ext + ":"
-                if int(cell_key) == 0 and skip_first_cell:
-                    font_string = "<B>Overview</B>"
-                nodes.append((node_str,
-                              {
-                                  "label": "<<FONT COLOR=\"grey\" FACE=\"Monospace\">" + font_string + "</FONT>>",
-                                  "shape": "plaintext"}))
-                edge_list.append(((node_str, node), {"color": color, "constraint": "False", "arrowhead": "none"}))
-                if previous_node_str is not None:
-                    edge_list.append(((previous_node_str, node_str),
-                                      {"color": "grey",
-                                       "arrowhead": "none",
-                                       "weight": 3}))
-                previous_node_str = node_str
-
-            # Adding cluster anchor nodes with the corresponding cell number (node_str, cell_num)
-            if cluster_head is not None:
-                cluster_head_list.append((cluster_head, cell_key))
-            else:
-                raise ModuleNotFoundError
-            cfg_dict[cell_key] = nodes
-
-            for (node, attr_dict) in nodes:
-                G.add_node(node, **attr_dict)
-
-            G.add_subgraph(cfg_ex.get_nodes(), "cfg_cell" + str(cell_key))
-
-            for ((x, y), attr) in edge_list:
-                G.add_edge(node_str_generator(x, cell_key)[0], node_str_generator(y, cell_key)[0], **attr)
-            # Update beautiful progress bar
-            time.sleep(0)
-            bar()
-
-    # Add cluster with name cluster[cell number] into the graph with name Cell_[cell number]
-    for cell_key in cfg_dict.keys():
-        n_e_tuple = cfg_dict[cell_key]
-        name = 'Cell ' + cell_key
-        G.subgraph(list(map(lambda elem: elem[0], n_e_tuple)), name="cluster" + cell_key, label=name)
-
-    # Ensure that cells are displayed from left to right in the graph => Place Module node of every cell onto the
-    # same level
-    dummy_nodes = []
-    first = True
-    i = 0
-    attr = {"color": "grey", "arrowhead": "none", "weight": "3"}
-    if len(cluster_head_list) == 1:
-        x = cluster_head_list[0]
-        x_str = node_str_generator(x[0], x[1])[0]
-        x_str_ext = x_str + "$line" + str(x[1])
-        G.add_node(x_str_ext, label="")
-        if not G.has_edge(x_str_ext, x_str):
-            G.add_edge(x_str_ext, x_str, style="invis")
-        dummy_nodes.append(x_str + "$line" + str(x[1]))
-    else:
-        for x, y in itertools.pairwise(cluster_head_list):
-            x_str = node_str_generator(x[0], x[1])[0]
-            y_str = node_str_generator(y[0], y[1])[0]
-            x_str_ext = x_str + "$line" + str(x[1])
-            y_str_ext = y_str + "$line" + str(y[1])
-            if first:
-                dummy_nodes.append(x_str_ext)
-                first = False
-            dummy_nodes.append(y_str_ext)
-            G.add_node(x_str_ext, label="")
-            G.add_node(y_str_ext, label="")
-            if not G.has_edge(x_str_ext, x_str):
-                G.add_edge(x_str_ext, x_str, style="invis")
-            G.add_edge(last_line_nodes[i], y_str_ext, **attr)
-            if i == len(cluster_head_list) - 2:
-                G.add_edge(y_str_ext, y_str, style="invis")
-            i += 1
-
-    # Prepare the head list and extend with dummy nodes
-    head_nodes = [node_str_generator(node, cell)[0] for (node, cell) in cluster_head_list]
-    # assert len(dummy_nodes) == len(line_nodes)
-    for dummy, head in itertools.zip_longest(dummy_nodes, head_nodes):
-        G.add_subgraph([dummy, head], rank="same")
-
-    for dummy, line in itertools.zip_longest(dummy_nodes, line_nodes):
-        G.add_edge(dummy, line, **attr)
-
-    # Colors for color coding from lookup table
-    # Each variable name has its own color if all colors are assigned colors will be reused
-    look_up_color = dict()
-    # Current index in the color palette
-    curr_color_i = 0
-    csv_file = open('../resources/colors.csv', newline='')
-    color_palette = csv.reader(csv_file, delimiter=' ')
-    colors = [c[0] for c in color_palette]
-    csv_file.close()
-
-    attr = {"constraint": "False", "arrowsize": "0.65"}
-    dfg_ex = DataFlowExtractor(ast_dict_parsed)
-    dfg_edge_list = dfg_ex.walk_and_get_edges()
-    # Save every variable for every node
-    node_var_dict = dict()
-
-    for n_v_tupleU, n_v_tupleV in dfg_edge_list:
-        parent_U = dfg_ex.get_parent_node(n_v_tupleU[0], ast_cfg_nodes_dict[n_v_tupleU[1]])
-        parent_V = dfg_ex.get_parent_node(n_v_tupleV[0], ast_cfg_nodes_dict[n_v_tupleV[1]])
-        if parent_U is None:
-            parent_U = dfg_ex.get_parent_node(n_v_tupleU[0], ast_cfg_nodes_dict[n_v_tupleU[1]], compare=cmp_on_id_lvl)
-        elif parent_V is None:
-            parent_V = dfg_ex.get_parent_node(n_v_tupleV[0], ast_cfg_nodes_dict[n_v_tupleV[1]], compare=cmp_on_id_lvl)
-        if parent_V is None or parent_U is None:
-            # TODO eval function def edges
-            continue
-        elif parent_U == parent_V:
-            if n_v_tupleU[1] < n_v_tupleV[1]:
-                print("found" + n_v_tupleU[1] + " " + n_v_tupleV[1])
-            continue
-        else:
-            name = n_v_tupleU[0].id
-            nameU, _ = node_str_generator(n_v_tupleU[0], n_v_tupleU[1])
-            nameV, _ = node_str_generator(n_v_tupleV[0], n_v_tupleV[1])
-            if name in look_up_color.keys():
-                attr["color"] = look_up_color[name]
-            else:
-                color = colors[curr_color_i]
-                look_up_color[name] = color
-                attr["color"] = color
-                curr_color_i = (curr_color_i + 1) % len(colors)
-            # n_v_tupleX[1] is always the cell number.
-            if int(n_v_tupleU[1]) < int(n_v_tupleV[1]):
-                node_str = head_nodes[int(n_v_tupleV[1])]
-                if node_str in node_var_dict.keys():
-                    vari = node_var_dict[node_str]
-                    vari.append(name)
-                    node_var_dict[node_str] = vari
-                else:
-                    node_var_dict[node_str] = [name]
-                head = G.get_node(node_str)
-                attrs = head.attr.to_dict()
-                attr_in = attr.copy()
-                attr_in['arrowhead'] = "dot"
-                G.add_edge(node_str_generator(parent_U, n_v_tupleU[1])[0],
-                           node_str,
-                           tailport=trim_string(nameU) + ":" + "s",
-                           headport=trim_string(name + "$input") + ":" + "w",
-                           **attr_in)
-
-                # Updating the HTML string
-                node_attr = G.get_node(node_str_generator(parent_U, n_v_tupleU[1])[0]).attr.to_dict()
-                G.add_node(node_str_generator(parent_U, n_v_tupleU[1])[0], **update_html(node_attr, nameU, n_v_tupleU))
-
-                attr_out = attr.copy()
-                attr_out['arrowhead'] = "normal"
-                attr_out['arrowtail'] = "dot"
-                attr_out['dir'] = "both"
-                G.add_edge(node_str,
-                           node_str_generator(parent_V, n_v_tupleV[1])[0],
-                           tailport=trim_string(name + "$output") + ":" + "e",
-                           headport=trim_string(nameV) + ":" + "n",
-                           **attr_out)
-
-                # Updating the HTML string
-                node_attr = G.get_node(node_str_generator(parent_V, n_v_tupleV[1])[0]).attr.to_dict()
-                G.add_node(node_str_generator(parent_V, n_v_tupleV[1])[0], **update_html(node_attr, nameV, n_v_tupleV))
-            else:
-                G.add_edge(node_str_generator(parent_U, n_v_tupleU[1])[0],
-                           node_str_generator(parent_V, n_v_tupleV[1])[0],
-                           tailport=trim_string(nameU) + ":" + "s",
-                           headport=trim_string(nameV) + ":" + "n",
-                           **attr)
-
-                # Updating the HTML string
-                node_attr = G.get_node(node_str_generator(parent_U, n_v_tupleU[1])[0]).attr.to_dict()
-                G.add_node(node_str_generator(parent_U, n_v_tupleU[1])[0], **update_html(node_attr, nameU, n_v_tupleU))
-                node_attr = G.get_node(node_str_generator(parent_V, n_v_tupleV[1])[0]).attr.to_dict()
-                G.add_node(node_str_generator(parent_V, n_v_tupleV[1])[0], **update_html(node_attr, nameV, n_v_tupleV))
-
-    for (key, var_list) in node_var_dict.items():
-        attrs = {'shape': 'plaintext', 'margin': '0.1'}
-        label = "<<TABLE STYLE=\"ROUNDED\" BORDER=\"1\" CELLBORDER=\"0\" CELLSPACING=\"0\" CELLPADDING=\"4\">"
-        for var in var_list:
-            label += "<TR>" \
-                     + "<TD WIDTH=\"10\" HEIGHT=\"10\" FIXEDSIZE=\"TRUE\" PORT=\"" + trim_string(var + "$input") \
-                     + "\"></TD>" \
-                     + "<TD>" + var + "</TD>" \
-                     + "<TD WIDTH=\"10\" HEIGHT=\"10\" FIXEDSIZE=\"TRUE\" PORT=\"" \
-                     + trim_string(var + "$output") + "\"></TD></TR>"
-        label += "</TABLE>>"
-        attrs['label'] = label
-        G.add_node(key, **attrs)
-
-    # Layout chosen to be dot
-    G.layout(prog='dot')
-
-    # Write graph to a png file
-    G.draw('../output/vis_' + file + '.pdf')
-    G.draw('../output/vis_' + file + '.png')
-    print("EOF")
+import argparse
+import ast
+import copy
+import csv
+import itertools
+import os
+import time
+
+import matplotlib.pyplot as plt
+import squarify
+from alive_progress import alive_bar
+
+from data_tracing.ast_visitor import AstVisitor
+from data_tracing.cell_cache import CellCache
+from data_tracing.extract_cfg import BODY_FIELDS, MATCH_STATEMENTS, TRY_STATEMENTS, ControlFlowExtractor
+from data_tracing.extract_dfg import DATA_FLOW_MODES, DataFlowExtractor
+from data_tracing.function_summary import SUMMARIES, module_functions
+from data_tracing.graph_ir import Graph
+from data_tracing.instrumentation import NULL_PROFILER, PROFILE_MODES, create_profiler
+from data_tracing.node_label import TableCell, TableLabel
+from data_tracing.notebook_reader import read_code_cells
+from data_tracing.overview import OVERVIEW_CELLS, OVERVIEW_NODES, aggregated_edge_attributes, estimate_nodes, \
+    get_cell_names, summary_node, summary_table
+from data_tracing.render_graph import GraphRenderer, BACKENDS, LAYOUTS, PNG_DPI, PNG_MAX_PIXELS
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+NOTEBOOK_DIR = os.path.join(PACKAGE_DIR, '..', 'notebooks')
+OUTPUT_DIR = os.path.join(PACKAGE_DIR, '..', 'output')
+COLOR_FILE = os.path.join(PACKAGE_DIR, '..', 'resources', 'colors.csv')
+FORMATS = ('pdf', 'png')
+# Attribute of the ast nodes the generated label is stored in
+LABEL_ATTR = '_label'
+# Longer labels are cut, larger or deeper subtrees are shortened before they are unparsed
+MAX_LABEL_LENGTH = 4096
+MAX_LABEL_NODES = 2048
+MAX_LABEL_DEPTH = 64
+# Values of --overview and the corresponding overview argument of the NotebookAnalyzer
+OVERVIEW_MODES = {'auto': None, 'on': True, 'off': False}
+
+
+def node_str_generator(ast_node, current_cell):
+    """
+
+    :param current_cell: Current cell resulting from the notebook.
+    :param ast_node: Node from the ast which has all the information to create a label for the graph
+
+    :return: name for the node in the graph and dictionary with attributes
+    """
+    if isinstance(ast_node, str):
+        return ast_node, {}
+    # The label only depends on the node itself, so it is stored at the node and pickled with it into the cache
+    attribute_dict = ast_node.__dict__.get(LABEL_ATTR)
+    if attribute_dict is None:
+        attribute_dict = label_generator(ast_node)
+        setattr(ast_node, LABEL_ATTR, attribute_dict)
+    return node_id(ast_node, current_cell), attribute_dict.copy()
+
+
+def node_id(ast_node, current_cell):
+    """
+    Builds the name of a node in the graph from the cell, the position and the type of the node. Nodes of the same
+    type never share their position in the source, so the name is unique and the same in every run. The names are
+    also used as ports in the tables of the nodes.
+
+    :param ast_node: Node from the ast
+    :param current_cell: Current cell resulting from the notebook.
+    :return: Name of the node, e.g. "Assign_c3_4_0_4_12" for an assignment in line 4 of cell 3
+    """
+    node_str = type(ast_node).__name__ + "_c" + str(current_cell)
+    if hasattr(ast_node, 'lineno'):
+        node_str += "_" + str(ast_node.lineno) + "_" + str(ast_node.col_offset) \
+                    + "_" + str(ast_node.end_lineno) + "_" + str(ast_node.end_col_offset)
+    return node_str
+
+
+def cut_label(label):
+    """
+    :param label: Label of a node
+    :return: Label cut to MAX_LABEL_LENGTH characters
+    """
+    if len(label) > MAX_LABEL_LENGTH:
+        return label[:MAX_LABEL_LENGTH] + "..."
+    return label
+
+
+def exceeds_node_limit(ast_node, limit=MAX_LABEL_NODES):
+    """
+    :param ast_node: Root of the subtree
+    :param limit: Maximal number of nodes
+    :return: True if the subtree has more nodes than the limit, stops counting at the limit
+    """
+    for count, _ in enumerate(ast.walk(ast_node)):
+        if count >= limit:
+            return True
+    return False
+
+
+def shorten_ast(ast_node, budget, depth=MAX_LABEL_DEPTH):
+    """
+    Copies the subtree until the budget of nodes is spent. Every expression beyond the budget or below the maximal
+    depth is replaced by "...", lists of expressions end after the first replaced element. The original nodes are not
+    changed.
+
+    :param ast_node: Root of the subtree
+    :param budget: List with the number of nodes left, shared by all recursive calls
+    :param depth: Number of levels left
+    :return: Shortened copy of the subtree
+    """
+    budget[0] -= 1
+    short = copy.copy(ast_node)
+    cut = lambda child: isinstance(child, ast.expr) and (budget[0] <= 0 or depth <= 1)
+    for field, value in ast.iter_fields(ast_node):
+        if isinstance(value, list):
+            children = []
+            for child in value:
+                if cut(child):
+                    children.append(ast.Constant(value=Ellipsis))
+                    break
+                children.append(shorten_ast(child, budget, depth - 1) if isinstance(child, ast.AST) else child)
+            setattr(short, field, children)
+        elif cut(value):
+            setattr(short, field, ast.Constant(value=Ellipsis))
+        elif isinstance(value, ast.AST):
+            setattr(short, field, shorten_ast(value, budget, depth - 1))
+    return short
+
+
+def unparse_bounded(ast_node):
+    """
+    Unparses the node. Huge literals and calls are shortened first, so they are never unparsed completely.
+
+    :param ast_node: Node from the ast
+    :return: Source code of the node, cut to MAX_LABEL_LENGTH characters
+    """
+    if exceeds_node_limit(ast_node):
+        ast_node = shorten_ast(ast_node, [MAX_LABEL_NODES])
+    try:
+        return cut_label(ast.unparse(ast_node))
+    except RecursionError:
+        # Deeply nested expressions, e.g. long chains of binary operators
+        return cut_label(ast.unparse(shorten_ast(ast_node, [MAX_LABEL_NODES])))
+
+
+def header_label(ast_node):
+    """
+    :param ast_node: Compound statement, e.g. ast.For, ast.While, ast.With or ast.Try
+    :return: Header of the statement without the statements of its body, else branch, handlers and cases
+    """
+    # Shallow copy, the body of the original node stays untouched
+    temp = copy.copy(ast_node)
+    for field in BODY_FIELDS:
+        if hasattr(temp, field):
+            setattr(temp, field, [])
+    return unparse_bounded(temp)
+
+
+def assign_label(ast_node):
+    """
+    :param ast_node: ast.Assign
+    :return: "=" followed by the code before the first "=", the value is not unparsed
+    """
+    target = unparse_bounded(ast_node.targets[0])
+    if "=" in target:
+        return "=" + target.split("=")[0]
+    return "=" + target + " "
+
+
+# Label of the node for every type of node, all other types are unparsed
+LABEL_GENERATORS = {
+    ast.Module: lambda ast_node: '',
+    ast.For: header_label,
+    ast.AsyncFor: header_label,
+    ast.While: header_label,
+    ast.With: header_label,
+    ast.AsyncWith: header_label,
+    ast.Try: header_label,
+    ast.ExceptHandler: header_label,
+    ast.FunctionDef: lambda ast_node: "FunctionDef\\n" + ast_node.name,
+    ast.AsyncFunctionDef: lambda ast_node: "AsyncFunctionDef\\n" + ast_node.name,
+    ast.ClassDef: lambda ast_node: "ClassDef\\n" + ast_node.name,
+    ast.Name: lambda ast_node: ast_node.id,
+    ast.Assign: assign_label,
+    ast.Constant: lambda ast_node: cut_label("\'" + str(ast_node.value) + "\'"),
+    ast.arg: lambda ast_node: "arg\\n" + str(ast_node.arg),
+}
+for statement_type in TRY_STATEMENTS + MATCH_STATEMENTS:
+    LABEL_GENERATORS[statement_type] = header_label
+
+
+def label_generator(ast_node):
+    """
+
+    :param ast_node: Node from the ast which has all the information to create a label for the graph
+
+    :return: dictionary with attributes including the label
+    """
+    attribute_dict = dict()
+    attribute_dict["margin"] = "0.1"
+    attribute_dict["label"] = LABEL_GENERATORS.get(type(ast_node), unparse_bounded)(ast_node)
+    if isinstance(ast_node, ast.Module):
+        attribute_dict["shape"] = "plaintext"
+    return attribute_dict
+
+
+def parse_list(line_list):
+    """
+    Iterates over of string and yield every successful parsed line.
+
+    :param line_list:
+    """
+    for elem in line_list:
+        try:
+            _ = ast.parse(source=elem)
+            yield elem
+        except SyntaxError:
+            print('SyntaxError due to line: ' + elem + '\n')
+
+
+def prepare_html(s):
+    """
+
+    :param s:
+    """
+    s = s.replace("&", "&amp;")
+    s = s.replace("<", "&lt;")
+    s = s.replace(">", "&gt;")
+    return s
+
+
+def statement_table():
+    """
+    :return: Empty table of a statement
+    """
+    return TableLabel(WIDTH="", BORDER="0", CELLBORDER="1", CELLSPACING="4", CELLPADDING="4")
+
+
+def name_cell(name_node, cell_key, **attributes):
+    """
+    :param name_node: ast.Name shown in the cell
+    :param cell_key: Key of the cell of the name
+    :return: Cell of the table with the name as port
+    """
+    name_str, attr_dict = node_str_generator(name_node, cell_key)
+    return TableCell(prepare_html(attr_dict["label"]), port=name_str, STYLE="ROUNDED", **attributes)
+
+
+def process_node(node, cell_key, visitor):
+    """
+
+    :param node:
+    :param cell_key:
+    :param visitor: AstVisitor of the cell with the names of the table of the node
+    :return: Name of the node and its attributes, the label is a TableLabel
+    """
+    attr_node_dict = {"shape": "plaintext", "margin": "0.1"}
+    if isinstance(node, ast.Assign):
+        to_exclude = visitor.target_names[node]
+        dfg_node_list = visitor.statement_names[node]
+        rowspan = 2
+        if len(dfg_node_list) == 0:
+            rowspan = 1
+        table = statement_table()
+        table.add_row([name_cell(n, cell_key, ROWSPAN=rowspan) for n in to_exclude]
+                      + [TableCell(prepare_html((node_str_generator(node.value, cell_key)[1])["label"]),
+                                   STYLE="ROUNDED", COLSPAN=max(1, len(dfg_node_list)))])
+        if len(dfg_node_list) > 0:
+            table.add_row([name_cell(n, cell_key) for n in dfg_node_list])
+        attr_node_dict["label"] = table
+    elif isinstance(node, ast.Expr) or isinstance(node, ast.Return):
+        dfg_node_list = visitor.statement_names[node]
+        table = statement_table()
+        table.add_row([TableCell(prepare_html((node_str_generator(node, cell_key)[1])["label"]),
+                                 STYLE="ROUNDED", COLSPAN=max(1, len(dfg_node_list)))])
+        if len(dfg_node_list) > 0:
+            table.add_row([name_cell(n, cell_key) for n in dfg_node_list])
+        attr_node_dict["label"] = table
+    elif isinstance(node, ast.Import) or isinstance(node, ast.ImportFrom):
+        # Alias are not tracked throughout the document
+        table = TableLabel(STYLE="ROUNDED", WIDTH="", BORDER="0", CELLBORDER="1", CELLSPACING="4", CELLPADDING="4")
+        table.add_row([TableCell(prepare_html((node_str_generator(node, cell_key)[1])["label"]), STYLE="ROUNDED")])
+        attr_node_dict["label"] = table
+    elif isinstance(node, ast.If) or isinstance(node, ast.For):
+        table_head = "IF"
+        if isinstance(node, ast.For):
+            table_head = "FOR"
+            test = node
+        else:
+            test = node.__dict__['test']
+        # Names of the test, or of the loop without its body
+        dfg_node_list = visitor.statement_names[node]
+        rowspan = 2
+        if len(dfg_node_list) == 0:
+            rowspan = 1
+        table = statement_table()
+        table.add_row([TableCell(table_head, STYLE="ROUNDED", ROWSPAN=rowspan),
+                       TableCell(prepare_html((node_str_generator(test, cell_key)[1])["label"]),
+                                 STYLE="ROUNDED", COLSPAN=max(1, len(dfg_node_list)))])
+        if len(dfg_node_list) > 0:
+            table.add_row([name_cell(n, cell_key) for n in dfg_node_list])
+        attr_node_dict["label"] = table
+
+    return node_str_generator(node, cell_key)[0], attr_node_dict
+
+
+def read_color_palette(file=COLOR_FILE):
+    """
+    Reads the color palette used for the color coding of the variables.
+
+    :param file: csv file with one color per line
+    :return: List of colors
+    """
+    with open(file, newline='') as csv_file:
+        color_palette = csv.reader(csv_file, delimiter=' ')
+        return [c[0] for c in color_palette]
+
+
+class NotebookAnalyzer:
+    """
+    Class to analyze a jupyter notebook and to render the visualization of its data and control flow. Every
+    instance keeps its own state, so several notebooks can be analyzed one after another or in worker processes.
+    """
+
+    def __init__(self, file, output_dir=OUTPUT_DIR, formats=FORMATS, progress=True, cache=None, renderer=None,
+                 overview=None, expand=(), profiler=None, data_flow='reaching'):
+        self.file = file
+        self.name = os.path.basename(file)
+        self.output_dir = output_dir
+        self.formats = formats
+        self.progress = progress
+        # Optional CellCache with the results of analyze_cell
+        self.cache = cache
+        # GraphRenderer which lays out the graph and draws the output files
+        self.renderer = renderer if renderer is not None else GraphRenderer()
+        # Collapse every cell to a summary node, None decides by the size of the notebook
+        self.overview = overview
+        # Keys of the cells shown in full detail in the overview
+        self.expand = {str(cell_key) for cell_key in expand}
+        # Profiler recording the stages of the analysis, NULL_PROFILER records nothing
+        self.profiler = profiler if profiler is not None else NULL_PROFILER
+        # Extraction of the data flow edges, see DATA_FLOW_MODES
+        self.data_flow = data_flow
+        self.G = None
+        self.reset()
+
+    def reset(self):
+        """
+        Resets the state of the previous analysis, so the analyzer can build the graph again.
+        """
+        # One ast (ready for the graph) for every code cell, contains (List of nodes, List of edges)
+        self.ast_dict = dict()
+        # Dictionary with the ASTs itself
+        self.ast_dict_parsed = dict()
+        # Dictionary with the ControlFlowExtractor of every cell
+        self.cfg_parsed = dict()
+        # Dictionary with the AstVisitor of every cell
+        self.visitors = dict()
+        # Dictionary with the part of the graph built for every cell, see build_cell
+        self.fragments = dict()
+        # DICT( cell_key: TUPLE( source, entry ) ), entries which are written to the cache by store_cells
+        self.pending_entries = dict()
+
+        # Module node for every cell or cluster
+        self.cluster_head_list = []
+
+        # Dictionary with nodes of the cfg for every cell
+        self.cfg_dict = dict()
+        # Dictionary with the node of the control flow excluding ast.Module for the DataFlow
+        self.ast_cfg_nodes_dict = dict()
+
+        # List with all nodes
+        self.line_nodes = []
+        self.last_line_nodes = []
+        self.head_nodes = []
+
+        # Colors for color coding from lookup table
+        # Each variable name has its own color if all colors are assigned colors will be reused
+        self.look_up_color = dict()
+        # Palette read from COLOR_FILE on first use and the index of the next color to assign
+        self.colors = None
+        self.color_index = 0
+        # Table of every node with a TableLabel and the colors of its ports, rendered by add_labels
+        self.tables = dict()
+        self.port_colors = dict()
+
+    def read_code_cells(self):
+        """
+        Reads the notebook and returns its code cells. Only the sources are read, the outputs are skipped.
+
+        :return: List of code cells
+        """
+        return read_code_cells(self.file)
+
+    @staticmethod
+    def analyze_cell(source, profiler=NULL_PROFILER):
+        """
+        Parses the source of one cell and extracts everything which only depends on the source itself: the ast,
+        the nodes and edges of the ast, the control flow, the names collected by the AstVisitor and the summaries of the
+        functions defined in the cell. The result does not depend on the position of the cell, so it can be cached and
+        shared between notebooks.
+
+        :param source: Source code of the cell
+        :param profiler: Profiler recording the parse, cfg and traversal stages
+        :return: Dictionary with the ast, the traversal, the control flow and the visitor of the cell, "labelled" tells
+                 whether the labels of the nodes are stored at the ast
+        """
+        with profiler.stage('parse'):
+            try:
+                ast_cell = ast.parse(source=source)
+            except SyntaxError:
+                print('Cell: Parsing failed with SyntaxError')
+                lst = list(parse_list(source.split('\n')))
+                new_source_code = '\n'.join(lst)
+                ast_cell = ast.parse(source=new_source_code)
+                del lst
+                del new_source_code
+        entry = {'ast': ast_cell, 'traversal': None, 'cfg': None, 'visitor': None, 'labelled': False}
+        if len(ast_cell.__dict__['body']) > 0:
+            with profiler.stage('cfg'):
+                cfg_ex = ControlFlowExtractor()
+                cfg_ex.extract_CFG(ast_cell)
+                entry['cfg'] = cfg_ex
+            with profiler.stage('traversal'):
+                # Single traversal of the ast shared by the graph, the tables of the nodes and the data flow
+                visitor = AstVisitor(cfg_ex.get_nodes(skip_module=True)).visit(ast_cell)
+                entry['traversal'] = (visitor.node_list, visitor.edge_list)
+                entry['visitor'] = visitor
+                # The summaries are stored at the function definitions and cached with the ast
+                for function_def in module_functions(cfg_ex):
+                    SUMMARIES.get(function_def)
+        return entry
+
+    def parse_cells(self, code_cells):
+        """
+        Parses the source of every code cell and traverses the resulting ast. Cells found in the cache are not
+        parsed again. New entries are written to the cache by store_cells.
+
+        :param code_cells: Code cells of the notebook
+        """
+        for cell, i in itertools.zip_longest(code_cells, range(len(code_cells))):
+            source = cell['source']
+            entry = None
+            with self.profiler.stage('cell', cell=str(i)):
+                if self.cache is not None:
+                    entry = self.cache.get(source)
+                if entry is None:
+                    entry = self.analyze_cell(source, self.profiler)
+            self.add_pending_entry(str(i), source, entry)
+            # Save ast itself for the CFG extraction (and data flow)
+            if entry['traversal'] is not None:
+                self.ast_dict_parsed[str(i)] = entry['ast']
+                self.ast_dict[str(i)] = entry['traversal']
+                self.cfg_parsed[str(i)] = entry['cfg']
+                self.visitors[str(i)] = entry['visitor']
+
+    def add_pending_entry(self, cell_key, source, entry):
+        """
+        Remembers an entry which is not in the cache yet or whose labels were not generated when it was cached.
+
+        :param cell_key: Key of the cell
+        :param source: Source code of the cell
+        :param entry: Result of analyze_cell
+        """
+        if self.cache is not None and not entry['labelled']:
+            self.pending_entries[cell_key] = (source, entry)
+
+    def store_cells(self):
+        """
+        Writes the pending entries to the cache. The labels are generated while the cells are built, so the entries of
+        built cells are stored with their labels and cache hits skip the label generation.
+        """
+        for cell_key, (source, entry) in self.pending_entries.items():
+            entry['labelled'] = cell_key in self.fragments
+            self.cache.put(source, entry)
+        self.pending_entries = dict()
+
+    def plot_alias_overview(self, cell_key):
+        """
+        Plots how often the aliases imported in the first cell are used in the remaining cells.
+
+        :param cell_key: Key of the first cell
+        :return: Path of the plot
+        """
+        list_of_alias = self.visitors[cell_key].alias_list
+        occurence_dict = {key: 0 for key in list_of_alias}
+        for cell_num in range(1, len(self.ast_dict_parsed.keys())):
+            name_count = self.visitors[str(cell_num)].name_count
+            for alias in list_of_alias:
+                occurence_dict[alias] += name_count.get(alias, 0)
+        # Delete keys with value == 0
+        to_pop = []
+        for key in occurence_dict.keys():
+            if occurence_dict[key] == 0:
+                to_pop.append(key)
+        for key in to_pop:
+            occurence_dict.pop(key)
+        labels = [key + "(" + str(value) + ")" for key, value in zip(occurence_dict.keys(),
+                                                                     occurence_dict.values())]
+        fig, ax = plt.subplots()
+        squarify.plot(sizes=occurence_dict.values(), label=labels, alpha=0.6, ax=ax)
+        ax.axis('off')
+        # The plot is written while the graph is built, before the visualization is rendered
+        os.makedirs(self.output_dir, exist_ok=True)
+        image_path = os.path.join(self.output_dir, 'plot_' + self.name + '.png')
+        fig.savefig(image_path, bbox_inches='tight')
+        plt.close(fig)
+        return image_path
+
+    def build_cell(self, cell_key):
+        """
+        Builds the part of the graph which belongs to one cell: the nodes of the control flow with their HTML labels,
+        the line nodes and the edges between them.
+
+        :param cell_key: Key of the cell in ast_dict_parsed
+        :return: Dictionary with the nodes, edges and cluster information of the cell
+        """
+        visitor = self.visitors[cell_key]
+        # Control flow of the cell from analyze_cell, it may be shared with other notebooks and is not changed here
+        cfg_ex = self.cfg_parsed[cell_key]
+
+        # New list, the edge list is extended by the line nodes below
+        edge_list = cfg_ex.get_edge_list()
+        # Save for DataFlowExtractor later
+        cfg_nodes = cfg_ex.get_nodes(skip_module=True)
+        # Nodes of the cluster of the cell
+        graph_nodes = cfg_ex.get_nodes()
+
+        cluster_head = None
+        # Nodes which have to be added to the graph before the other nodes of the cell
+        pre_nodes = []
+        # "nodes" has string and attribute dict as content
+        nodes = []
+
+        # html nodes
+        html_nodes = []
+        skip_first_cell = False
+
+        if cell_key == str(0):
+            if all(map(lambda elem: isinstance(elem, ast.Import)
+                                    or isinstance(elem, ast.ImportFrom),
+                       cfg_nodes)):
+                skip_first_cell = True
+                image_path = self.plot_alias_overview(cell_key)
+                edge_list = list(filter(lambda elem: isinstance((elem[0])[0], ast.Module), edge_list))
+                if len(edge_list) == 1:
+                    node = ((edge_list[0])[0])[1]
+                    node_str, attr_dict = node_str_generator(node, cell_key)
+                    attr_dict['label'] = ''
+                    attr_dict['image'] = image_path
+                    pre_nodes.append((node_str, attr_dict))
+                    graph_nodes = [cfg_ex.module, node]
+                    cfg_nodes = [node]
+
+        for node in graph_nodes:
+            if isinstance(node, ast.Module):
+                cluster_head = node
+                nodes.append(node_str_generator(node, cell_key))
+            elif isinstance(node, ast.Assign) or isinstance(node, ast.Expr) or isinstance(node, ast.Return):
+                html_nodes.append(process_node(node, cell_key, visitor))
+            elif isinstance(node, ast.Import) or isinstance(node, ast.ImportFrom):
+                if not skip_first_cell:
+                    html_nodes.append(process_node(node, cell_key, visitor))
+                else:
+                    node_str, attr_dict = node_str_generator(node, cell_key)
+                    attr_dict['label'] = ""
+                    nodes.append((node_str, attr_dict))
+            elif isinstance(node, ast.If) or isinstance(node, ast.For):
+                html_nodes.append(process_node(node, cell_key, visitor))
+            else:
+                nodes.append(node_str_generator(node, cell_key))
+
+        # Give every table of the cell the width of the widest table to ensure left alignment of tables in nodes
+        # of the graph
+        max_width = max((attr_dict["label"].get_width() for (node_str, attr_dict) in html_nodes), default=0)
+        for (node_str, attr_dict) in html_nodes:
+            attr_dict["label"].attributes["WIDTH"] = str(max_width)
+            nodes.append((node_str, attr_dict))
+        html_nodes.clear()
+
+        cfg_nodes_sorted = cfg_nodes
+        cfg_nodes_sorted.sort(key=lambda elem: elem.__dict__["lineno"])
+        first_line_node = None
+        last_line_node = None
+        previous_node_str = None
+        line_nodes = []
+        for node, cell_num in itertools.zip_longest(cfg_nodes_sorted, range(len(cfg_nodes_sorted))):
+            label_ext = ""
+            lineno = str(node.__dict__["lineno"])
+            end_lineno = str(node.__dict__["end_lineno"])
+            # if lineno == end_lineno:
+            label_ext += lineno
+            # else:
+            #     label_ext += lineno + "-" + end_lineno
+            node_str = node_str_generator(node, cell_key)[0] + "_line"
+            line_nodes.append(node_str)
+            if first_line_node is None:
+                first_line_node = node_str
+            if cell_num == len(cfg_nodes_sorted) - 1:
+                last_line_node = node_str
+            color = "grey"
+            if cfg_ex.is_true(node):
+                color = "green"
+            elif cfg_ex.is_false(node):
+                color = "red"
+            font_string = "<B>Line</B> " + label_ext + ":"
+            if int(cell_key) == 0 and skip_first_cell:
+                font_string = "<B>Overview</B>"
+            nodes.append((node_str,
+                          {
+                              "label": "<<FONT COLOR=\"grey\" FACE=\"Monospace\">" + font_string + "</FONT>>",
+                              "shape": "plaintext"}))
+            edge_list.append(((node_str, node), {"color": color, "constraint": "False", "arrowhead": "none"}))
+            if previous_node_str is not None:
+                edge_list.append(((previous_node_str, node_str),
+                                  {"color": "grey",
+                                   "arrowhead": "none",
+                                   "weight": 3}))
+            previous_node_str = node_str
+
+        if cluster_head is None:
+            raise ModuleNotFoundError
+
+        return {'cfg_nodes': cfg_nodes,
+                'pre_nodes': pre_nodes,
+                'nodes': nodes,
+                'subgraph': graph_nodes + line_nodes,
+                'edges': [(node_str_generator(x, cell_key)[0], node_str_generator(y, cell_key)[0], attr)
+                          for ((x, y), attr) in edge_list],
+                'first_line_node': first_line_node,
+                'last_line_node': last_line_node,
+                'cluster_head': cluster_head}
+
+    def add_cell(self, cell_key, fragment):
+        """
+        Adds the part of the graph built by build_cell to the graph.
+
+        :param cell_key: Key of the cell in ast_dict_parsed
+        :param fragment: Dictionary returned by build_cell
+        """
+        G = self.G
+        self.fragments[cell_key] = fragment
+        for (node, attr_dict) in fragment['pre_nodes']:
+            G.add_node(node, **attr_dict)
+        self.ast_cfg_nodes_dict[cell_key] = fragment['cfg_nodes']
+        if fragment['first_line_node'] is not None:
+            self.line_nodes.append(fragment['first_line_node'])
+        if fragment['last_line_node'] is not None:
+            self.last_line_nodes.append(fragment['last_line_node'])
+        # Adding cluster anchor nodes with the corresponding cell number (node_str, cell_num)
+        self.cluster_head_list.append((fragment['cluster_head'], cell_key))
+        self.cfg_dict[cell_key] = fragment['nodes']
+
+        for (node, attr_dict) in fragment['nodes']:
+            if isinstance(attr_dict.get("label"), TableLabel):
+                # Tables are rendered once all ports are colored
+                self.tables[node] = attr_dict["label"]
+                G.add_node(node, **{key: value for key, value in attr_dict.items() if key != "label"})
+            else:
+                G.add_node(node, **attr_dict)
+
+        G.add_subgraph(fragment['subgraph'], "cfg_cell" + str(cell_key))
+
+        for (x, y, attr) in fragment['edges']:
+            G.add_edge(x, y, **attr)
+
+    def add_cells(self):
+        """
+        Builds the part of the graph of every cell and adds it to the graph.
+        """
+        with alive_bar(len(self.ast_dict_parsed.keys()),
+                       theme='smooth',
+                       stats=False,
+                       monitor="{count}/{total}",
+                       force_tty=True,
+                       disable=not self.progress,
+                       title='Processing Cells') as bar:
+            for cell_key in self.ast_dict_parsed.keys():
+                with self.profiler.stage('build_cell', cell=cell_key):
+                    fragment = self.build_cell(cell_key)
+                with self.profiler.stage('add_cell', cell=cell_key):
+                    self.add_cell(cell_key, fragment)
+                # Update beautiful progress bar
+                time.sleep(0)
+                bar()
+
+    def align_clusters(self):
+        """
+        Adds the clusters of every cell to the graph and ensures that the cells are displayed from left to right.
+        """
+        G = self.G
+        # Add cluster with name cluster[cell number] into the graph with name Cell_[cell number]
+        for cell_key in self.cfg_dict.keys():
+            n_e_tuple = self.cfg_dict[cell_key]
+            name = 'Cell ' + cell_key
+            G.add_subgraph(list(map(lambda elem: elem[0], n_e_tuple)), name="cluster" + cell_key, label=name)
+
+        # Ensure that cells are displayed from left to right in the graph => Place Module node of every cell onto
+        # the same level
+        cluster_head_list = self.cluster_head_list
+        dummy_nodes = []
+        first = True
+        i = 0
+        attr = {"color": "grey", "arrowhead": "none", "weight": "3"}
+        if len(cluster_head_list) == 1:
+            x = cluster_head_list[0]
+            x_str = node_str_generator(x[0], x[1])[0]
+            x_str_ext = x_str + "_line"
+            G.add_node(x_str_ext, label="")
+            if not G.has_edge(x_str_ext, x_str):
+                G.add_edge(x_str_ext, x_str, style="invis")
+            dummy_nodes.append(x_str + "_line")
+        else:
+            for x, y in itertools.pairwise(cluster_head_list):
+                x_str = node_str_generator(x[0], x[1])[0]
+                y_str = node_str_generator(y[0], y[1])[0]
+                x_str_ext = x_str + "_line"
+                y_str_ext = y_str + "_line"
+                if first:
+                    dummy_nodes.append(x_str_ext)
+                    first = False
+                dummy_nodes.append(y_str_ext)
+                G.add_node(x_str_ext, label="")
+                G.add_node(y_str_ext, label="")
+                if not G.has_edge(x_str_ext, x_str):
+                    G.add_edge(x_str_ext, x_str, style="invis")
+                G.add_edge(self.last_line_nodes[i], y_str_ext, **attr)
+                if i == len(cluster_head_list) - 2:
+                    G.add_edge(y_str_ext, y_str, style="invis")
+                i += 1
+
+        # Prepare the head list and extend with dummy nodes
+        self.head_nodes = [node_str_generator(node, cell)[0] for (node, cell) in cluster_head_list]
+        # assert len(dummy_nodes) == len(line_nodes)
+        for dummy, head in itertools.zip_longest(dummy_nodes, self.head_nodes):
+            G.add_subgraph([dummy, head], rank="same")
+
+        for dummy, line in itertools.zip_longest(dummy_nodes, self.line_nodes):
+            G.add_edge(dummy, line, **attr)
+
+    def extract_data_flow(self):
+        """
+        Extracts the data flow edges of the whole notebook.
+
+        :return: List of edges between tuples of ast.Name and cell key
+        """
+        return self.create_data_flow_extractor().walk_and_get_edges()
+
+    def create_data_flow_extractor(self):
+        """
+        :return: DataFlowExtractor over the parsed cells, their visitors and their control flow
+        """
+        return DataFlowExtractor(self.ast_dict_parsed, visitors=self.visitors, cfgs=self.cfg_parsed,
+                                 mode=self.data_flow)
+
+    def add_data_flow(self):
+        """
+        Extracts the data flow of the whole notebook and adds the color coded data flow edges to the graph.
+        """
+        G = self.G
+        head_nodes = self.head_nodes
+
+        attr = {"constraint": "False", "arrowsize": "0.65"}
+        dfg_ex = self.create_data_flow_extractor()
+        with self.profiler.stage('extract'):
+            dfg_edge_list = self.extract_data_flow()
+        # Save every variable for every node
+        node_var_dict = dict()
+        # SET( TUPLE( tail: str, head: str, identifier ) ), pairs of graph nodes linked for a variable already. A
+        # definition reaching several uses in a later cell enters the cell once, and the definitions merged by branches
+        # and loops link a pair of statements once, so every statement pair gets one edge per variable
+        linked = set()
+
+        for n_v_tupleU, n_v_tupleV in dfg_edge_list:
+            parents = self.get_flow_parents(dfg_ex, n_v_tupleU, n_v_tupleV)
+            if parents is None:
+                continue
+            else:
+                parent_U, parent_V = parents
+                name = n_v_tupleU[0].id
+                nameU, _ = node_str_generator(n_v_tupleU[0], n_v_tupleU[1])
+                nameV, _ = node_str_generator(n_v_tupleV[0], n_v_tupleV[1])
+                attr["color"] = self.get_color(name)
+                # n_v_tupleX[1] is always the cell number.
+                tail_str = node_str_generator(parent_U, n_v_tupleU[1])[0]
+                head_str = node_str_generator(parent_V, n_v_tupleV[1])[0]
+                if int(n_v_tupleU[1]) < int(n_v_tupleV[1]):
+                    node_str = head_nodes[int(n_v_tupleV[1])]
+                    if (tail_str, node_str, name) not in linked:
+                        linked.add((tail_str, node_str, name))
+                        var_list = node_var_dict.setdefault(node_str, [])
+                        if name not in var_list:
+                            var_list.append(name)
+                        attr_in = attr.copy()
+                        attr_in['arrowhead'] = "dot"
+                        G.add_edge(tail_str,
+                                   node_str,
+                                   tailport=nameU + ":" + "s",
+                                   headport="in_" + name + ":" + "w",
+                                   **attr_in)
+                        self.color_port(tail_str, nameU, name)
+
+                    if (node_str, head_str, name) in linked:
+                        continue
+                    linked.add((node_str, head_str, name))
+                    attr_out = attr.copy()
+                    attr_out['arrowhead'] = "normal"
+                    attr_out['arrowtail'] = "dot"
+                    attr_out['dir'] = "both"
+                    G.add_edge(node_str,
+                               head_str,
+                               tailport="out_" + name + ":" + "e",
+                               headport=nameV + ":" + "n",
+                               **attr_out)
+                    self.color_port(head_str, nameV, name)
+                elif (tail_str, head_str, name) not in linked:
+                    linked.add((tail_str, head_str, name))
+                    self.add_statement_flow(parent_U, parent_V, n_v_tupleU, n_v_tupleV, attr)
+
+        for (key, var_list) in node_var_dict.items():
+            table = TableLabel(STYLE="ROUNDED", BORDER="1", CELLBORDER="0", CELLSPACING="0", CELLPADDING="4")
+            for var in var_list:
+                table.add_row([TableCell(port="in_" + var, WIDTH="10", HEIGHT="10", FIXEDSIZE="TRUE"),
+                               TableCell(var),
+                               TableCell(port="out_" + var, WIDTH="10", HEIGHT="10", FIXEDSIZE="TRUE")])
+            self.tables[key] = table
+            G.add_node(key, shape='plaintext', margin='0.1')
+
+    def get_flow_parents(self, dfg_ex, n_v_tupleU, n_v_tupleV):
+        """
+        Looks up the statements of the control flow the two names of a data flow edge belong to.
+
+        :param dfg_ex: DataFlowExtractor of the notebook
+        :param n_v_tupleU: Tuple of ast.Name and cell key of the tail
+        :param n_v_tupleV: Tuple of ast.Name and cell key of the head
+        :return: Tuple of the statements or None if the edge is not shown
+        """
+        ast_cfg_nodes_dict = self.ast_cfg_nodes_dict
+        parent_U = dfg_ex.get_parent_node(n_v_tupleU, ast_cfg_nodes_dict[n_v_tupleU[1]])
+        parent_V = dfg_ex.get_parent_node(n_v_tupleV, ast_cfg_nodes_dict[n_v_tupleV[1]])
+        if parent_U is None:
+            parent_U = dfg_ex.get_parent_node(n_v_tupleU, ast_cfg_nodes_dict[n_v_tupleU[1]], on_id_lvl=True)
+        elif parent_V is None:
+            parent_V = dfg_ex.get_parent_node(n_v_tupleV, ast_cfg_nodes_dict[n_v_tupleV[1]], on_id_lvl=True)
+        if parent_V is None or parent_U is None:
+            # Names outside of every statement of the control flow
+            return None
+        elif parent_U == parent_V:
+            if n_v_tupleU[1] < n_v_tupleV[1]:
+                print("found" + n_v_tupleU[1] + " " + n_v_tupleV[1])
+            return None
+        return parent_U, parent_V
+
+    def get_color(self, name):
+        """
+        :param name: Identifier of a variable
+        :return: Color of the variable, the colors of the palette are assigned in the order of the first use
+        """
+        if name not in self.look_up_color:
+            if self.colors is None:
+                self.colors = read_color_palette()
+            self.look_up_color[name] = self.colors[self.color_index]
+            self.color_index = (self.color_index + 1) % len(self.colors)
+        return self.look_up_color[name]
+
+    def add_statement_flow(self, parent_U, parent_V, n_v_tupleU, n_v_tupleV, attr):
+        """
+        Adds a data flow edge between the ports of two statements and colors the ports.
+
+        :param parent_U: Statement of the tail
+        :param parent_V: Statement of the head
+        :param n_v_tupleU: Tuple of ast.Name and cell key of the tail
+        :param n_v_tupleV: Tuple of ast.Name and cell key of the head
+        :param attr: Attributes of the edge
+        """
+        name = n_v_tupleU[0].id
+        nameU, _ = node_str_generator(n_v_tupleU[0], n_v_tupleU[1])
+        nameV, _ = node_str_generator(n_v_tupleV[0], n_v_tupleV[1])
+        self.G.add_edge(node_str_generator(parent_U, n_v_tupleU[1])[0],
+                        node_str_generator(parent_V, n_v_tupleV[1])[0],
+                        tailport=nameU + ":" + "s",
+                        headport=nameV + ":" + "n",
+                        **attr)
+
+        self.color_port(node_str_generator(parent_U, n_v_tupleU[1])[0], nameU, name)
+        self.color_port(node_str_generator(parent_V, n_v_tupleV[1])[0], nameV, name)
+
+    def color_port(self, node_str, port, name):
+        """
+        Colors the cell of a port in the table of a node with the color of the variable.
+
+        :param node_str: Name of the node in the graph
+        :param port: Port of the cell
+        :param name: Identifier of the variable
+        """
+        self.port_colors.setdefault(node_str, dict())[port] = self.look_up_color[name]
+
+    def add_labels(self):
+        """
+        Renders the table of every node with the colors of its ports and sets it as label of the node.
+        """
+        for node_str, table in self.tables.items():
+            self.G.get_node(node_str).attributes['label'] = table.render(self.port_colors.get(node_str))
+
+    def build_graph(self, code_cells=None):
+        """
+        Parses the notebook and builds the graph of the visualization.
+
+        :param code_cells: Code cells to analyze, defaults to the code cells read from the notebook file
+        :return: Graph of the visualization
+        """
+        profiler = self.profiler
+        self.reset()
+        if code_cells is None:
+            with profiler.stage('read'):
+                code_cells = self.read_code_cells()
+        with profiler.stage('parse_cells'):
+            self.parse_cells(code_cells)
+        self.G = self.create_graph()
+
+        if self.use_overview():
+            with profiler.stage('overview'):
+                self.add_overview()
+        else:
+            with profiler.stage('add_cells'):
+                self.add_cells()
+            with profiler.stage('align_clusters'):
+                self.align_clusters()
+            with profiler.stage('data_flow'):
+                self.add_data_flow()
+        with profiler.stage('labels'):
+            self.add_labels()
+        with profiler.stage('store_cells'):
+            self.store_cells()
+        return self.G
+
+    def create_graph(self):
+        """
+        :return: Empty graph of the visualization with its default attributes
+        """
+        # Create graph from edge list and nodelist using the dot-layout
+        G = Graph(strict=False,
+                  directed=True,
+                  label="ast_" + self.name,
+                  compound=True,
+                  rankdir="TB",
+                  splines="spline")
+        # Set some default attributes
+        G.node_defaults['shape'] = 'plaintext'
+        return G
+
+    def use_overview(self):
+        """
+        :return: True if the parsed notebook is shown as overview
+        """
+        if self.overview is not None:
+            return self.overview
+        return len(self.ast_dict_parsed) > OVERVIEW_CELLS or estimate_nodes(self.visitors) > OVERVIEW_NODES
+
+    def add_overview(self):
+        """
+        Adds the overview of the notebook to the graph. Every cell is collapsed to a summary node with the variables
+        it defines and uses, the cells are placed from top to bottom and the data flow edges are aggregated between
+        the cells. The cells in self.expand show the summary on top of their full graph.
+        """
+        G = self.G
+        attr = {"color": "grey", "arrowhead": "none", "weight": "3"}
+        dfg_ex = self.create_data_flow_extractor()
+        cell_names = get_cell_names(dfg_ex.walk_tree_by_name())
+        # DICT( cell_key: TUPLE( first node, last node, summary node ) )
+        cell_nodes = dict()
+        for cell_key in self.ast_dict_parsed.keys():
+            if cell_key in self.expand:
+                fragment = self.build_cell(cell_key)
+                self.add_cell(cell_key, fragment)
+                head = node_str_generator(fragment['cluster_head'], cell_key)[0]
+                G.add_subgraph([node for (node, _) in fragment['nodes']], name="cluster" + cell_key,
+                               label='Cell ' + cell_key)
+                # The lines of the cell start below the summary
+                G.add_edge(head, fragment['first_line_node'], **attr)
+                cell_nodes[cell_key] = (head, fragment['last_line_node'], head)
+            else:
+                head = summary_node(cell_key)
+                G.add_node(head, margin='0.1')
+                cell_nodes[cell_key] = (head, head, head)
+            self.tables[head] = summary_table(cell_key, *cell_names.get(cell_key, ([], [])))
+
+        # Keep the order of the notebook from top to bottom
+        for (_, last, _), (first, _, _) in itertools.pairwise(cell_nodes.values()):
+            G.add_edge(last, first, **attr)
+
+        # DICT( TUPLE( cell key of the tail, cell key of the head ): LIST( identifier ) )
+        flows = dict()
+        for n_v_tupleU, n_v_tupleV in self.extract_data_flow():
+            name = n_v_tupleU[0].id
+            self.get_color(name)
+            if n_v_tupleU[1] != n_v_tupleV[1]:
+                names = flows.setdefault((n_v_tupleU[1], n_v_tupleV[1]), [])
+                if name not in names:
+                    names.append(name)
+            elif n_v_tupleU[1] in self.expand:
+                parents = self.get_flow_parents(dfg_ex, n_v_tupleU, n_v_tupleV)
+                if parents is not None:
+                    self.add_statement_flow(*parents, n_v_tupleU, n_v_tupleV,
+                                            {"constraint": "False", "arrowsize": "0.65", "color": self.get_color(name)})
+        for (tail, head), names in flows.items():
+            attributes = aggregated_edge_attributes(names, self.look_up_color)
+            G.add_edge(cell_nodes[tail][2], cell_nodes[head][2], **attributes)
+
+    def render(self):
+        """
+        Lays out the graph once and writes it into the output folder in every requested format.
+
+        :return: List of the written files
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        return self.renderer.render(self.G, os.path.join(self.output_dir, 'vis_' + self.name), self.formats,
+                                    profiler=self.profiler)
+
+    def run(self):
+        """
+        Analyzes the notebook and renders the visualization.
+
+        :return: List of the written files
+        """
+        profiler = self.profiler
+        profiler.start()
+        try:
+            with profiler.stage('build_graph'):
+                self.build_graph()
+            with profiler.stage('render'):
+                output_files = self.render()
+        finally:
+            profiler.stop()
+        if profiler.enabled:
+            output_files.extend(self.write_profile())
+        return output_files
+
+    def write_profile(self):
+        """
+        Writes the report of the profiler, and the cProfile statistics if cProfile was running, into the output
+        folder.
+
+        :return: List of the written files
+        """
+        base_path = os.path.join(self.output_dir, 'profile_' + self.name)
+        self.profiler.write(base_path + '.json')
+        files = [base_path + '.json']
+        if self.profiler.dump_stats(base_path + '.prof'):
+            files.append(base_path + '.prof')
+        return files
+
+
+def choose_notebook(path=NOTEBOOK_DIR):
+    """
+    Lists the notebooks folder and lets the user choose a file.
+
+    :param path: Folder with the notebooks
+    :return: Path of the chosen file
+    """
+    dir_list = os.listdir(path)
+    print("Files in directory:")
+    for i in range(len(dir_list)):
+        print(str(i) + ": " + str(dir_list[i]))
+
+    while True:
+        file_index = input("\nChoose file from [0," + str(len(dir_list) - 1) + "]:")
+        try:
+            if 0 <= int(file_index) < len(dir_list):
+                return os.path.join(path, dir_list[int(file_index)])
+            else:
+                print("Index " + str(file_index) + " out of bounds")
+        except ValueError as ex:
+            print(ex.__str__())
+
+
+def parse_args(argv=None):
+    """
+    Parses the command line arguments.
+
+    :param argv: Arguments, defaults to sys.argv
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Visualize data flow paths of jupyter notebooks.")
+    parser.add_argument("--input", nargs="+",
+                        help="Notebooks to analyze. If omitted the notebook is chosen from the notebooks folder.")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR,
+                        help="Folder the visualizations are written to.")
+    parser.add_argument("--formats", default=",".join(FORMATS),
+                        help="Comma separated list of output formats, e.g. pdf,png,svg,json.")
+    parser.add_argument("--no-progress", action="store_true",
+                        help="Do not show the progress bar.")
+    add_render_args(parser)
+    add_cache_args(parser)
+    add_overview_args(parser)
+    add_data_flow_args(parser)
+    add_profile_args(parser)
+    return parser.parse_args(argv)
+
+
+def add_overview_args(parser, expand=True):
+    """
+    Adds the arguments of the overview to the parser.
+
+    :param parser: ArgumentParser of a command line tool
+    :param expand: Add the cells to expand, only useful for tools which analyze single notebooks
+    """
+    parser.add_argument("--overview", choices=OVERVIEW_MODES.keys(), default='auto',
+                        help="Collapse every cell to a node with its defined and used variables, by default for "
+                             "notebooks with more than " + str(OVERVIEW_CELLS) + " cells or " + str(OVERVIEW_NODES)
+                             + " nodes.")
+    if expand:
+        parser.add_argument("--expand-cells", default="",
+                            help="Comma separated list of cells shown in full detail in the overview.")
+
+
+def add_data_flow_args(parser):
+    """
+    Adds the arguments of the data flow extraction to the parser.
+
+    :param parser: ArgumentParser of a command line tool
+    """
+    parser.add_argument("--data-flow", choices=DATA_FLOW_MODES, default='reaching',
+                        help="'reaching' links every definition to the uses it reaches along the control flow, "
+                             "'positional' links every assignment to the following uses in the order of the lines.")
+
+
+def add_profile_args(parser):
+    """
+    Adds the arguments of the instrumentation to the parser.
+
+    :param parser: ArgumentParser of a command line tool
+    """
+    parser.add_argument("--profile", choices=PROFILE_MODES, default='off',
+                        help="Record the wall and CPU time of every stage and cell, with 'memory' also the peak of the "
+                             "allocated memory. The report is written to profile_<notebook>.json in the output "
+                             "folder.")
+    parser.add_argument("--cprofile", action="store_true",
+                        help="Also run cProfile and write its statistics to profile_<notebook>.prof.")
+
+
+def add_cache_args(parser):
+    """
+    Adds the arguments of the cell cache to the parser.
+
+    :param parser: ArgumentParser of a command line tool
+    """
+    parser.add_argument("--cache-dir", default=None,
+                        help="Folder of the persistent cell cache. The cache is disabled if omitted.")
+    parser.add_argument("--cache-size", type=int, default=512,
+                        help="Maximal size of the cell cache in MB.")
+
+
+def add_render_args(parser, jobs=True):
+    """
+    Adds the arguments of the renderer to the parser.
+
+    :param parser: ArgumentParser of a command line tool
+    :param jobs: Add the number of render processes, tools which render in daemon processes can not start them
+    """
+    if jobs:
+        parser.add_argument("--render-jobs", type=int, default=None,
+                            help="Number of processes drawing the output formats, defaults to one per file. With "
+                             "--layout cells also the number of processes laying out the cells, defaults to one per "
+                             "core.")
+    parser.add_argument("--render-backend", choices=BACKENDS, default=None,
+                        help="Lay out and draw the graph with the dot executable or with pygraphviz, defaults to dot "
+                             "if it is installed.")
+    parser.add_argument("--layout", choices=LAYOUTS, default='global',
+                        help="Lay out the whole graph at once, or every cell on its own and only route the edges "
+                             "between the cells afterwards, which is faster for large notebooks.")
+    parser.add_argument("--png-dpi", type=float, default=PNG_DPI,
+                        help="Resolution of PNG files.")
+    parser.add_argument("--png-max-pixels", type=float, default=PNG_MAX_PIXELS / 1000 / 1000,
+                        help="Maximal size of a PNG file in megapixels, larger graphs are drawn with a lower "
+                             "resolution.")
+    parser.add_argument("--png-tiles", action="store_true",
+                        help="Split PNG files larger than --png-max-pixels into tiles instead of lowering the "
+                             "resolution.")
+
+
+def create_renderer(args, jobs=None):
+    """
+    :param args: Parsed arguments, see add_render_args
+    :param jobs: Number of processes, overrides --render-jobs
+    :return: GraphRenderer
+    """
+    return GraphRenderer(jobs=jobs if jobs is not None else args.render_jobs, png_dpi=args.png_dpi,
+                         png_max_pixels=args.png_max_pixels * 1000 * 1000, png_tiles=args.png_tiles,
+                         backend=args.render_backend, layout=args.layout)
+
+
+def create_cache(cache_dir, cache_size):
+    """
+    :param cache_dir: Folder of the cache or None
+    :param cache_size: Maximal size in MB
+    :return: CellCache or None if no folder is given
+    """
+    if cache_dir is None:
+        return None
+    return CellCache(cache_dir, max_size=cache_size * 1024 * 1024)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = args.input if args.input is not None else [choose_notebook()]
+    formats = tuple(fmt.strip() for fmt in args.formats.split(",") if fmt.strip())
+    cache = create_cache(args.cache_dir, args.cache_size)
+    renderer = create_renderer(args)
+    expand = [cell.strip() for cell in args.expand_cells.split(",") if cell.strip()]
+    for file in files:
+        analyzer = NotebookAnalyzer(file, output_dir=args.output_dir, formats=formats, progress=not args.no_progress,
+                                    cache=cache, renderer=renderer, overview=OVERVIEW_MODES[args.overview],
+                                    expand=expand, profiler=create_profiler(args.profile, args.cprofile),
+                                    data_flow=args.data_flow)
+        for output_file in analyzer.run():
+            print("Written: " + output_file)
+        if analyzer.profiler.enabled:
+            print(analyzer.profiler.table())
+    if cache is not None:
+        print("Cell cache: " + str(cache.hits) + " hits, " + str(cache.misses) + " misses")
+    print("EOF")
+
+
+if __name__ == "__main__":
+    main()
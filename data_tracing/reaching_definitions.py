@@ -0,0 +1,280 @@
+"""
+Reaching definitions of the variables of a notebook. Every cell is solved on its own over the basic blocks of its
+control flow, the definitions which reach the end of a cell are passed on to the next cell in notebook order. Sets of
+definitions are encoded as bits of Python integers, bit i stands for the i-th definition known to the cell.
+"""
+import ast
+from collections import deque
+
+from data_tracing.extract_cfg import CALL
+from data_tracing.function_summary import call_name
+
+
+def iterate_bits(bits):
+    """
+    :param bits: Set of definitions as integer
+    :return: Generator of the indices of the set bits, lowest first
+    """
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+class CellDefinitions:
+    """
+    Class to solve the reaching definitions of one cell with a worklist over the basic blocks of its control flow.
+
+    Definitions are the ast.Name nodes in Store context, ast.Name nodes in Del context remove the definitions of their
+    identifier without defining it again. Within a statement the names are read before they are written, the target
+    of ast.AugAssign is read and written. The bodies of functions see the definitions which reach the function
+    definition, definitions inside them do not reach the rest of the cell.
+
+    A call of a function defined in the notebook reads and writes the global variables of the summary of the function
+    before the statement of the call writes its own targets. They are represented by names at the position of the
+    called name, see call_name.
+    """
+
+    def __init__(self, cfg, flow_names, cell_num, identifiers=None, call_names=(), functions=None):
+        """
+        :param cfg: ControlFlowExtractor of the cell
+        :param flow_names: Names of every statement, see AstVisitor.flow_names
+        :param cell_num: Key of the cell
+        :param identifiers: If given only names with these identifiers are analyzed
+        :param call_names: Names of the called functions, see AstVisitor.call_names
+        :param functions: DICT( identifier: FunctionSummary ), functions defined in the notebook
+        """
+        self.cfg = cfg
+        self.flow_names = flow_names
+        self.cell_num = cell_num
+        self.identifiers = identifiers
+        self.call_names = call_names
+        self.functions = functions if functions is not None else dict()
+        # LIST( TUPLE( node: ast.Name, cell_num ) ), the definition of every bit, starting with the definitions
+        # reaching the cell
+        self.definitions = []
+        # DICT( identifier: int ), bits of all definitions of the identifier
+        self.masks = dict()
+        # DICT( statement: TUPLE( LIST( node: ast.Name ), gen: int, kill: int ) ), uses and effect of every statement
+        self.effects = dict()
+
+    def define(self, n_v_tuple):
+        """
+        :param n_v_tuple: Tuple of ast.Name and cell key of a definition
+        :return: Bit of the definition
+        """
+        bit = 1 << len(self.definitions)
+        self.definitions.append(n_v_tuple)
+        identifier = n_v_tuple[0].id
+        self.masks[identifier] = self.masks.get(identifier, 0) | bit
+        return bit
+
+    def classify(self):
+        """
+        Splits the names of every statement into uses and writes.
+
+        :return: Dictionary with the uses and writes of every statement, a write is a tuple of the name and its bit,
+                 which is 0 for deletions
+        """
+        accesses = dict()
+        for statement, names in self.flow_names.items():
+            uses = []
+            writes = []
+            call_writes = []
+            for node in names:
+                if node in self.call_names and node.id in self.functions:
+                    self.add_call(node, self.functions[node.id], uses, call_writes)
+                if self.identifiers is not None and node.id not in self.identifiers:
+                    continue
+                if isinstance(node.ctx, ast.Load):
+                    uses.append(node)
+                elif isinstance(node.ctx, ast.Del):
+                    writes.append((node, 0))
+                elif isinstance(statement, ast.AnnAssign) and statement.value is None and node is statement.target:
+                    # A bare annotation does not assign the variable
+                    continue
+                else:
+                    if isinstance(statement, ast.AugAssign) and node is statement.target:
+                        uses.append(node)
+                    writes.append((node, None))
+            accesses[statement] = (uses, call_writes + writes)
+        return accesses
+
+    def add_call(self, site, summary, uses, writes):
+        """
+        Adds the global variables a call reads and writes to the accesses of its statement.
+
+        :param site: ast.Name of the called function
+        :param summary: FunctionSummary of the function
+        :param uses: Uses of the statement
+        :param writes: Writes of the statement done by calls
+        """
+        identifiers = self.identifiers
+        for identifier in summary.globals_read:
+            if identifiers is None or identifier in identifiers:
+                uses.append(call_name(site, identifier, ast.Load()))
+        for identifier in summary.globals_written:
+            if identifiers is None or identifier in identifiers:
+                writes.append((call_name(site, identifier, ast.Store()), None))
+
+    def solve(self, reaching):
+        """
+        :param reaching: DICT( identifier: LIST( TUPLE( ast.Name, cell_num ) ) ), definitions which reach the start of
+                         the cell, updated in place to the definitions which reach the end of the cell
+        :return: List of the def-use edges as tuples of definition and use, both tuples of ast.Name and cell key
+        """
+        accesses = self.classify()
+        identifiers = dict.fromkeys(node.id for uses, writes in accesses.values()
+                                    for node in uses + [n for n, _ in writes])
+        # Only the definitions of identifiers which occur in the cell are numbered, all others pass the cell unchanged
+        entry = 0
+        for identifier in identifiers:
+            for n_v_tuple in reaching.get(identifier, ()):
+                entry |= self.define(n_v_tuple)
+        # Local definitions are numbered in the order of the statements
+        for statement in self.cfg.nodes:
+            if statement in accesses:
+                writes = accesses[statement][1]
+                writes[:] = [(node, 0 if bit == 0 else self.define((node, self.cell_num))) for node, bit in writes]
+        for statement, (uses, writes) in accesses.items():
+            gen = kill = 0
+            for node, bit in writes:
+                mask = self.masks[node.id]
+                kill |= mask
+                gen = (gen & ~mask) | bit
+            self.effects[statement] = (uses, gen, kill)
+
+        blocks = self.cfg.get_blocks()
+        block_in = self.solve_blocks(blocks, entry)
+        edges = self.resolve_uses(blocks, block_in)
+
+        exit_bits = self.get_exit_bits(blocks, block_in)
+        for identifier in identifiers:
+            defs = [self.definitions[i] for i in iterate_bits(exit_bits & self.masks.get(identifier, 0))]
+            if defs:
+                reaching[identifier] = defs
+            else:
+                reaching.pop(identifier, None)
+        return edges
+
+    def transfer(self, block, bits, last=None):
+        """
+        :param block: BasicBlock
+        :param bits: Definitions reaching the start of the block
+        :param last: Statement of the block after which to stop, the last statement of the block if None
+        :return: Definitions reaching the end of the block or of the given statement
+        """
+        for statement in block.statements:
+            effect = self.effects.get(statement)
+            if effect is not None:
+                bits = effect[1] | (bits & ~effect[2])
+            if statement is last:
+                break
+        return bits
+
+    def get_exit_bits(self, blocks, block_in):
+        """
+        The cell is left along the edges out of the body of its module, see ControlFlowExtractor.exits. They also
+        leave loops and ifs without else branch at the end of the cell, whose blocks still have successors. A raise
+        ends the cell as well, the definitions made before it remain in the kernel.
+
+        :param blocks: Basic blocks of the cell
+        :param block_in: Definitions reaching the start of every block
+        :return: Definitions reaching the end of the cell
+        """
+        bits = 0
+        for block in self.exit_blocks(blocks):
+            bits |= self.transfer(block, block_in[block.index])
+        reachable = self.reachable_blocks(blocks)
+        for statement, _ in self.cfg.exits:
+            block = self.cfg.get_block(statement)
+            if block.index in reachable:
+                bits |= self.transfer(block, block_in[block.index], statement)
+        return bits
+
+    def solve_blocks(self, blocks, entry):
+        """
+        Solves the data flow equations IN = OR(OUT of predecessors), OUT = gen | (IN & ~kill) with a worklist.
+
+        :param blocks: Basic blocks of the cell, the first block starts with the module
+        :param entry: Definitions reaching the start of the cell
+        :return: List of the definitions reaching the start of every block
+        """
+        gen = []
+        kill = []
+        for block in blocks:
+            block_gen = block_kill = 0
+            for statement in block.statements:
+                effect = self.effects.get(statement)
+                if effect is not None:
+                    block_gen = effect[1] | (block_gen & ~effect[2])
+                    block_kill |= effect[2]
+            gen.append(block_gen)
+            kill.append(block_kill)
+        block_in = [0] * len(blocks)
+        block_out = list(gen)
+        work = deque(range(len(blocks)))
+        queued = [True] * len(blocks)
+        while work:
+            i = work.popleft()
+            queued[i] = False
+            bits = entry if i == 0 else 0
+            for predecessor, _ in blocks[i].predecessors:
+                bits |= block_out[predecessor.index]
+            block_in[i] = bits
+            out = gen[i] | (bits & ~kill[i])
+            if out != block_out[i]:
+                block_out[i] = out
+                for successor, _ in blocks[i].successors:
+                    if not queued[successor.index]:
+                        queued[successor.index] = True
+                        work.append(successor.index)
+        return block_in
+
+    def resolve_uses(self, blocks, block_in):
+        """
+        :param blocks: Basic blocks of the cell
+        :param block_in: Definitions reaching the start of every block
+        :return: List of the def-use edges
+        """
+        edges = []
+        cell_num = self.cell_num
+        for block in blocks:
+            bits = block_in[block.index]
+            for statement in block.statements:
+                effect = self.effects.get(statement)
+                if effect is None:
+                    continue
+                uses, gen, kill = effect
+                for node in uses:
+                    for i in iterate_bits(bits & self.masks.get(node.id, 0)):
+                        edges.append((self.definitions[i], (node, cell_num)))
+                bits = gen | (bits & ~kill)
+        return edges
+
+    @staticmethod
+    def reachable_blocks(blocks):
+        """
+        :param blocks: Basic blocks of the cell
+        :return: Set of the indices of the blocks reachable from the start of the cell without entering a function
+                 body
+        """
+        seen = {0} if blocks else set()
+        work = [blocks[0]] if blocks else []
+        while work:
+            block = work.pop()
+            for successor, kind in block.successors:
+                if kind != CALL and successor.index not in seen:
+                    seen.add(successor.index)
+                    work.append(successor)
+        return seen
+
+    @classmethod
+    def exit_blocks(cls, blocks):
+        """
+        :param blocks: Basic blocks of the cell
+        :return: Reachable blocks without successors, they end with a raise
+        """
+        reachable = cls.reachable_blocks(blocks)
+        return [block for block in blocks if block.index in reachable
+                and not any(kind != CALL for _, kind in block.successors)]
@@ -0,0 +1,254 @@
+"""
+Render stage of the visualization. The graph is laid out once, every output format is drawn from the positioned
+graph without running the layout again. The Graphviz executables are used if they are installed, otherwise
+pygraphviz.
+"""
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+try:
+    import pygraphviz as pgv
+except ImportError:
+    # Optional backend, only needed without the Graphviz executables
+    pgv = None
+
+from data_tracing.cell_layout import get_cell_parts, get_part_graph, get_route_graphs, place_parts, set_routes
+from data_tracing.instrumentation import NULL_PROFILER
+
+# Resolution of PNG files
+PNG_DPI = 96
+# Larger PNG files are drawn with a lower resolution or split into tiles
+PNG_MAX_PIXELS = 50 * 1000 * 1000
+# Maximal width and height of a PNG file or tile, cairo can not draw larger images
+PNG_MAX_SIDE = 32767
+# Width and height of a tile in pixels
+PNG_TILE_SIZE = 4096
+# Default pad of Graphviz around the drawing in points
+GRAPH_PAD = 4
+# Name of the Graphviz executable
+DOT_EXECUTABLE = 'dot'
+BACKENDS = ('dot', 'pygraphviz')
+# Lay out the whole graph at once or every cell on its own
+LAYOUTS = ('global', 'cells')
+
+
+def default_backend():
+    """
+    :return: "dot" if the Graphviz executable is installed, otherwise "pygraphviz"
+    """
+    if shutil.which(DOT_EXECUTABLE) is not None:
+        return 'dot'
+    if pgv is not None:
+        return 'pygraphviz'
+    raise RuntimeError("Neither the Graphviz executable '" + DOT_EXECUTABLE + "' nor pygraphviz is installed")
+
+
+def run_layout(source, backend, prog='dot', fmt='dot'):
+    """
+    Lays out a graph with the dot executable or with the Graphviz library of pygraphviz. A graph_ir.Graph is
+    streamed into the stdin of the executable.
+
+    :param source: graph_ir.Graph or graph in the DOT language
+    :param backend: "dot" or "pygraphviz"
+    :param prog: Layout engine, e.g. dot or nop2 for a graph with positions
+    :param fmt: Output format, e.g. dot for the positioned graph or json0
+    :return: Output of Graphviz
+    """
+    if backend == 'dot':
+        with subprocess.Popen([DOT_EXECUTABLE, '-K' + prog, '-T' + fmt], stdin=subprocess.PIPE,
+                              stdout=subprocess.PIPE, encoding='utf-8') as process:
+            # dot reads the whole graph before it writes anything, so stdout can be read afterwards
+            if isinstance(source, str):
+                process.stdin.write(source)
+            else:
+                source.write_dot(process.stdin)
+            process.stdin.close()
+            output = process.stdout.read()
+        if process.returncode != 0:
+            raise RuntimeError(DOT_EXECUTABLE + " exited with code " + str(process.returncode))
+        return output
+    G = pgv.AGraph(string=source if isinstance(source, str) else source.to_dot())
+    if fmt == 'dot':
+        G.layout(prog=prog)
+        return G.string()
+    return G.draw(format=fmt, prog=prog).decode('utf-8')
+
+
+def run_concurrently(function, tasks, backend, jobs):
+    """
+    Calls the function for every task. The dot executable runs in threads, since the work is done by the dot
+    processes, pygraphviz runs in worker processes.
+
+    :param function: Function to call, has to be picklable
+    :param tasks: Tuples with the arguments of every call
+    :param backend: "dot" or "pygraphviz"
+    :param jobs: Number of threads or processes, with 1 the tasks run one after another in this process
+    :return: List of the results in the order of the tasks
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        return [function(*args) for args in tasks]
+    executor_class = ThreadPoolExecutor if backend == 'dot' else ProcessPoolExecutor
+    with executor_class(max_workers=min(jobs, len(tasks))) as executor:
+        futures = [executor.submit(function, *args) for args in tasks]
+        return [future.result() for future in futures]
+
+
+def draw_executable(positioned, output_file, fmt, graph_attr):
+    """
+    Draws a positioned graph into a file with the dot executable.
+
+    :param positioned: Graph with the positions of the layout in the DOT language
+    :param output_file: Path of the file
+    :param fmt: Output format, e.g. svg, pdf, png or json
+    :param graph_attr: Attributes of the graph only used for this file, e.g. dpi or viewport
+    :return: Path of the file
+    """
+    command = [DOT_EXECUTABLE, '-Knop2', '-T' + fmt, '-o', output_file]
+    command.extend('-G' + key + '=' + value for key, value in graph_attr.items())
+    subprocess.run(command, input=positioned, encoding='utf-8', check=True)
+    return output_file
+
+
+def draw_pygraphviz(positioned, output_file, fmt, graph_attr):
+    """
+    Draws a positioned graph into a file with pygraphviz. Entry point of the worker processes, so it only takes
+    picklable arguments.
+
+    :param positioned: Graph with the positions of the layout in the DOT language
+    :param output_file: Path of the file
+    :param fmt: Output format, e.g. svg, pdf, png or json
+    :param graph_attr: Attributes of the graph only used for this file, e.g. dpi or viewport
+    :return: Path of the file
+    """
+    G = pgv.AGraph(string=positioned)
+    G.graph_attr.update(graph_attr)
+    # nop2 keeps the positions and splines of the layout
+    G.draw(output_file, format=fmt, prog='nop2')
+    return output_file
+
+
+def get_bounding_box(positioned):
+    """
+    :param positioned: Graph with the positions of the layout in the DOT language
+    :return: Width and height of the drawing in points and its upper left corner
+    """
+    # The attributes of the root graph are written before the ones of the clusters
+    llx, lly, urx, ury = (float(value) for value in re.search(r'\bbb="([^"]*)"', positioned).group(1).split(','))
+    return urx - llx, ury - lly, llx, ury
+
+
+class GraphRenderer:
+    """
+    Class to draw a graph into several formats. The layout runs once, the formats are drawn concurrently, by dot
+    processes or by pygraphviz in worker processes. PNG files which would exceed the pixel limit are drawn with a
+    lower resolution, or split into tiles.
+    """
+
+    def __init__(self, jobs=None, png_dpi=PNG_DPI, png_max_pixels=PNG_MAX_PIXELS, png_tiles=False, backend=None,
+                 layout='global'):
+        """
+        :param jobs: Number of worker processes, defaults to one per file and one per core for the layout of the
+                     cells. With 1 everything runs in this process.
+        :param png_dpi: Resolution of PNG files
+        :param png_max_pixels: Maximal number of pixels of a PNG file or tile
+        :param png_tiles: Split large PNG files into tiles instead of lowering their resolution
+        :param backend: "dot" or "pygraphviz", defaults to the dot executable if it is installed
+        :param layout: "global" to lay out the whole graph at once, "cells" to lay out every cell in its own process
+                       and to route only the edges between the cells afterwards
+        """
+        self.backend = backend
+        self.layout = layout
+        self.jobs = jobs
+        self.png_dpi = png_dpi
+        self.png_max_pixels = png_max_pixels
+        self.png_tiles = png_tiles
+
+    def get_png_files(self, positioned, base_path):
+        """
+        Determines the PNG files of the graph, either one file with a resolution within the limits or a grid of
+        tiles.
+
+        :param positioned: Graph with the positions of the layout in the DOT language
+        :param base_path: Path of the files without extension
+        :return: List of paths and graph attributes
+        """
+        width, height, left, top = get_bounding_box(positioned)
+        dpi = self.png_dpi
+        width_px = max((width + 2 * GRAPH_PAD) * dpi / 72, 1)
+        height_px = max((height + 2 * GRAPH_PAD) * dpi / 72, 1)
+        if width_px * height_px <= self.png_max_pixels and max(width_px, height_px) <= PNG_MAX_SIDE:
+            return [(base_path + '.png', {'dpi': str(dpi)})]
+
+        if not self.png_tiles:
+            # Scale the drawing down until it is within the limits. The size in inches scales the positioned drawing
+            # exactly, a lower dpi would change the font metrics and with it the size of the nodes.
+            scale = min(math.sqrt(self.png_max_pixels / (width_px * height_px)),
+                        PNG_MAX_SIDE / max(width_px, height_px))
+            size = ",".join(str(math.floor(value * scale / dpi * 100) / 100) for value in (width_px, height_px))
+            return [(base_path + '.png', {'dpi': str(dpi), 'size': size})]
+
+        # Square tiles within the limits, the viewport selects the part of the graph of every tile
+        tile_px = min(PNG_TILE_SIZE, PNG_MAX_SIDE, int(math.sqrt(self.png_max_pixels)))
+        tile = tile_px * 72 / dpi
+        files = []
+        for row in range(math.ceil(height / tile)):
+            tile_height = min(tile, height - row * tile)
+            for col in range(math.ceil(width / tile)):
+                tile_width = min(tile, width - col * tile)
+                center_x = left + col * tile + tile_width / 2
+                center_y = top - row * tile - tile_height / 2
+                viewport = ",".join(str(round(value, 2)) for value in (tile_width, tile_height, 1, center_x, center_y))
+                files.append((base_path + '.tile_' + str(row) + '_' + str(col) + '.png',
+                              {'dpi': str(dpi), 'viewport': viewport, 'pad': '0'}))
+        return files
+
+    def render(self, graph, base_path, formats, profiler=NULL_PROFILER):
+        """
+        Lays out the graph and draws it in every format.
+
+        :param graph: graph_ir.Graph of the visualization
+        :param base_path: Path of the output files without extension
+        :param formats: Output formats, e.g. svg, pdf, png or json
+        :param profiler: Profiler recording the layout and draw stages
+        :return: List of the written files
+        """
+        backend = self.backend if self.backend is not None else default_backend()
+        with profiler.stage('layout'):
+            positioned = self.layout_graph(graph, backend)
+
+        tasks = []
+        for fmt in formats:
+            if fmt == 'png':
+                tasks.extend((path, fmt, attr) for path, attr in self.get_png_files(positioned, base_path))
+            else:
+                tasks.append((base_path + '.' + fmt, fmt, {}))
+
+        draw = draw_executable if backend == 'dot' else draw_pygraphviz
+        with profiler.stage('draw'):
+            return run_concurrently(draw, [(positioned, path, fmt, attr) for path, fmt, attr in tasks], backend,
+                                    self.jobs if self.jobs is not None else len(tasks))
+
+    def layout_graph(self, graph, backend):
+        """
+        :param graph: graph_ir.Graph of the visualization
+        :param backend: "dot" or "pygraphviz"
+        :return: Graph with the positions of the layout in the DOT language
+        """
+        if self.layout == 'cells':
+            parts = get_cell_parts(graph)
+            if parts is not None and len(parts) > 1:
+                jobs = self.jobs if self.jobs is not None else os.cpu_count() or 1
+                tasks = [(get_part_graph(graph, names).to_dot(), backend, 'dot', 'json0') for names in parts]
+                layouts = run_concurrently(run_layout, tasks, backend, jobs)
+                placed = place_parts(graph, parts, [json.loads(layout) for layout in layouts])
+                # Nodes and edges within the cells keep their positions, only the edges between them are routed
+                tasks = [(route.to_dot(), backend, 'nop2', 'json0') for route in get_route_graphs(placed, parts)]
+                layouts = run_concurrently(run_layout, tasks, backend, jobs)
+                set_routes(placed, [json.loads(layout) for layout in layouts])
+                return run_layout(placed, backend, prog='nop2')
+        return run_layout(graph, backend)
@@ -0,0 +1,463 @@
+"""
+Queries on the data flow of a notebook without drawing its graph: the definitions and uses of a variable, and the
+statements a variable, cell or line depends on (backward slice) or affects (forward slice). The def-use edges of the
+DataFlowExtractor are indexed once per notebook and stored in the index folder, later queries load the index and are
+answered from its dictionaries and adjacency lists.
+"""
+import argparse
+import ast
+import hashlib
+import os
+import pickle
+import tempfile
+import time
+from collections import deque
+
+from data_tracing.cell_cache import TOOL_VERSION
+from data_tracing.function_summary import get_site
+from data_tracing.kernel_index import file_hash
+from data_tracing.process_kernels import OUTPUT_DIR, NotebookAnalyzer, add_cache_args, add_data_flow_args, \
+    create_cache
+
+INDEX_DIR = os.path.join(OUTPUT_DIR, 'slices')
+QUERIES = ('definitions', 'uses', 'backward', 'forward')
+# Longer source lines of statements are cut in the index
+MAX_TEXT_LENGTH = 120
+
+
+def occurrence_kind(node):
+    """
+    :param node: ast.Name
+    :return: "use", "def" or "del"
+    """
+    if isinstance(node.ctx, ast.Load):
+        return 'use'
+    elif isinstance(node.ctx, ast.Del):
+        return 'del'
+    return 'def'
+
+
+def header_end(statement):
+    """
+    :param statement: Statement of the control flow
+    :return: Last line of the statement without its body, e.g. the line of the condition of an if
+    """
+    body = getattr(statement, 'body', None)
+    if isinstance(body, list) and len(body) > 0:
+        return max(statement.lineno, body[0].lineno - 1)
+    return statement.end_lineno
+
+
+class SliceIndex:
+    """
+    Class with the def-use results of one notebook, indexed by variable, cell and line. Statements and occurrences of
+    names are numbered, the data flow between the statements is kept as adjacency lists of these numbers.
+    """
+
+    def __init__(self, name, data_flow):
+        """
+        :param name: Name of the notebook
+        :param data_flow: Data flow mode the index was built with, see DATA_FLOW_MODES
+        """
+        self.name = name
+        self.data_flow = data_flow
+        # LIST( TUPLE( cell key, first line, last line, type of the statement, first line of the source ) )
+        self.statements = []
+        # LIST( TUPLE( identifier, statement, line, column, "def", "del" or "use" ) )
+        self.occurrences = []
+        # DICT( identifier: LIST( occurrence ) ), definitions and deletions in notebook order
+        self.definitions_by_variable = dict()
+        # DICT( identifier: LIST( occurrence ) ), uses in notebook order
+        self.uses_by_variable = dict()
+        # DICT( identifier: LIST( statement ) ), statements with an occurrence of the variable
+        self.statements_by_variable = dict()
+        # DICT( cell key: LIST( statement ) )
+        self.statements_by_cell = dict()
+        # DICT( TUPLE( cell key, line ): LIST( statement ) ), statements whose header covers the line
+        self.statements_by_line = dict()
+        # LIST( LIST( TUPLE( statement, identifier ) ) ), data flow from and to every statement
+        self.successors = []
+        self.predecessors = []
+        # DICT( occurrence: LIST( occurrence ) ), def-use edges of the data flow in both directions
+        self.uses_of = dict()
+        self.definitions_of = dict()
+        # DICT( TUPLE( direction, variable, cell, line ): TUPLE( statement ) ), the slices of every variable are
+        # computed when the index is built, other slices on their first query
+        self.slices = dict()
+
+    def build(self, analyzer, code_cells):
+        """
+        Extracts the data flow of the code cells and fills the indexes.
+
+        :param analyzer: NotebookAnalyzer of the notebook
+        :param code_cells: Code cells of the notebook
+        :return: The index itself
+        """
+        analyzer.parse_cells(code_cells)
+        analyzer.store_cells()
+        dfg_ex = analyzer.create_data_flow_extractor()
+        edges = dfg_ex.walk_and_get_edges()
+        lines = {str(i): cell['source'].split('\n') for i, cell in enumerate(code_cells)}
+        # DICT( statement node: int ), DICT( node: ast.Name, int ), only needed while the index is built
+        statement_ids = dict()
+        occurrence_ids = dict()
+        # The statements are numbered in notebook order, so slices are sorted by their numbers
+        statements = dict()
+        for n_v_tuple in dfg_ex.ast_name_list + [n_v_tuple for edge in edges for n_v_tuple in edge]:
+            statement = dfg_ex.get_parent_node(n_v_tuple, ())
+            if statement is not None and statement not in statements:
+                statements[statement] = n_v_tuple[1]
+        for statement, cell_key in sorted(statements.items(), key=lambda elem: (int(elem[1]), elem[0].lineno,
+                                                                                 elem[0].col_offset)):
+            self.add_statement(statement, cell_key, lines, statement_ids)
+        for n_v_tuple in dfg_ex.ast_name_list:
+            self.add_occurrence(dfg_ex, n_v_tuple, lines, statement_ids, occurrence_ids)
+        flows = set()
+        for n_v_tuple_u, n_v_tuple_v in edges:
+            u = self.add_occurrence(dfg_ex, n_v_tuple_u, lines, statement_ids, occurrence_ids)
+            v = self.add_occurrence(dfg_ex, n_v_tuple_v, lines, statement_ids, occurrence_ids)
+            if u is None or v is None:
+                continue
+            self.uses_of.setdefault(u, []).append(v)
+            self.definitions_of.setdefault(v, []).append(u)
+            identifier, statement_u = self.occurrences[u][:2]
+            statement_v = self.occurrences[v][1]
+            if statement_u != statement_v and (statement_u, statement_v, identifier) not in flows:
+                flows.add((statement_u, statement_v, identifier))
+                self.successors[statement_u].append((statement_v, identifier))
+                self.predecessors[statement_v].append((statement_u, identifier))
+        # Names created for calls are added while the edges are read, keep every list in notebook order
+        for variable_statements in self.statements_by_variable.values():
+            variable_statements.sort()
+        for occurrences in list(self.definitions_by_variable.values()) + list(self.uses_by_variable.values()):
+            occurrences.sort(key=self.occurrence_position)
+        for variable in self.statements_by_variable:
+            self.slice('backward', variable)
+            self.slice('forward', variable)
+        return self
+
+    def add_statement(self, statement, cell_key, lines, statement_ids):
+        """
+        :param statement: Statement of the control flow
+        :param cell_key: Key of the cell of the statement
+        :param lines: Source lines of every cell
+        :param statement_ids: Numbers of the statements added so far
+        :return: Number of the statement
+        """
+        statement_id = statement_ids.get(statement)
+        if statement_id is not None:
+            return statement_id
+        statement_id = len(self.statements)
+        statement_ids[statement] = statement_id
+        cell_lines = lines.get(cell_key, [])
+        text = cell_lines[statement.lineno - 1].strip() if statement.lineno <= len(cell_lines) else ''
+        last = header_end(statement)
+        self.statements.append((cell_key, statement.lineno, last, type(statement).__name__, text[:MAX_TEXT_LENGTH]))
+        self.successors.append([])
+        self.predecessors.append([])
+        self.statements_by_cell.setdefault(cell_key, []).append(statement_id)
+        for line in range(statement.lineno, last + 1):
+            self.statements_by_line.setdefault((cell_key, line), []).append(statement_id)
+        return statement_id
+
+    def add_occurrence(self, dfg_ex, n_v_tuple, lines, statement_ids, occurrence_ids):
+        """
+        :param dfg_ex: DataFlowExtractor of the notebook
+        :param n_v_tuple: Tuple of ast.Name and cell key
+        :param lines: Source lines of every cell
+        :param statement_ids: Numbers of the statements added so far
+        :param occurrence_ids: Numbers of the names added so far
+        :return: Number of the occurrence or None if the name belongs to no statement
+        """
+        node, cell_key = n_v_tuple
+        occurrence = occurrence_ids.get(node)
+        if occurrence is not None:
+            return occurrence
+        statement = dfg_ex.get_parent_node(n_v_tuple, ())
+        if statement is None:
+            return None
+        statement_id = self.add_statement(statement, cell_key, lines, statement_ids)
+        occurrence = len(self.occurrences)
+        occurrence_ids[node] = occurrence
+        site = get_site(node)
+        kind = occurrence_kind(node)
+        self.occurrences.append((node.id, statement_id, site.lineno, site.col_offset, kind))
+        by_variable = self.uses_by_variable if kind == 'use' else self.definitions_by_variable
+        by_variable.setdefault(node.id, []).append(occurrence)
+        statements = self.statements_by_variable.setdefault(node.id, [])
+        if statement_id not in statements:
+            statements.append(statement_id)
+        return occurrence
+
+    def occurrence_position(self, occurrence):
+        """
+        :param occurrence: Number of an occurrence
+        :return: Sort key of the occurrence in notebook order
+        """
+        _, statement, line, column, _ = self.occurrences[occurrence]
+        return statement, line, column
+
+    def definitions(self, variable, cell=None, line=None):
+        """
+        :param variable: Identifier of the variable
+        :param cell: Key of a cell, only definitions in this cell are returned
+        :param line: Line in the cell, only definitions in this line are returned
+        :return: List of the occurrences which define or delete the variable
+        """
+        return self.filter_occurrences(self.definitions_by_variable.get(variable, ()), cell, line)
+
+    def uses(self, variable, cell=None, line=None):
+        """
+        :param variable: Identifier of the variable
+        :param cell: Key of a cell, only uses in this cell are returned
+        :param line: Line in the cell, only uses in this line are returned
+        :return: List of the occurrences which use the variable
+        """
+        return self.filter_occurrences(self.uses_by_variable.get(variable, ()), cell, line)
+
+    def filter_occurrences(self, occurrences, cell, line):
+        """
+        :param occurrences: Numbers of occurrences
+        :param cell: Key of a cell or None
+        :param line: Line in the cell or None
+        :return: List of the occurrences in the cell and line
+        """
+        if cell is None:
+            return list(occurrences)
+        return [occurrence for occurrence in occurrences
+                if self.statements[self.occurrences[occurrence][1]][0] == cell
+                and (line is None or self.occurrences[occurrence][2] == line)]
+
+    def get_seeds(self, variable=None, cell=None, line=None):
+        """
+        :param variable: Identifier of a variable or None
+        :param cell: Key of a cell or None
+        :param line: Line in the cell or None, requires the cell
+        :return: List of the statements which start a slice
+        """
+        if line is not None and cell is None:
+            raise ValueError("A line requires a cell")
+        if variable is not None:
+            statements = self.statements_by_variable.get(variable, ())
+            if cell is None:
+                return list(statements)
+            if line is None:
+                return [statement for statement in statements if self.statements[statement][0] == cell]
+            return [statement for statement in statements if statement in self.statements_by_line.get((cell, line), ())]
+        if line is not None:
+            return list(self.statements_by_line.get((cell, line), ()))
+        if cell is not None:
+            return list(self.statements_by_cell.get(cell, ()))
+        raise ValueError("A slice requires a variable, cell or line")
+
+    def slice(self, direction, variable=None, cell=None, line=None):
+        """
+        Collects the statements which the criterion depends on (backward) or which depend on it (forward). With a
+        variable only its data flow leaves the statements of the criterion, the other statements are followed along
+        the data flow of every variable.
+
+        :param direction: "backward" or "forward"
+        :param variable: Identifier of a variable or None
+        :param cell: Key of a cell or None
+        :param line: Line in the cell or None
+        :return: List of the statements of the slice in notebook order, including the statements of the criterion
+        """
+        key = (direction, variable, cell, line)
+        result = self.slices.get(key)
+        if result is not None:
+            return list(result)
+        adjacency = self.predecessors if direction == 'backward' else self.successors
+        seeds = self.get_seeds(variable, cell, line)
+        visited = set(seeds)
+        work = deque()
+        for statement in seeds:
+            for neighbour, identifier in adjacency[statement]:
+                if neighbour not in visited and (variable is None or identifier == variable):
+                    visited.add(neighbour)
+                    work.append(neighbour)
+        while work:
+            for neighbour, _ in adjacency[work.popleft()]:
+                if neighbour not in visited:
+                    visited.add(neighbour)
+                    work.append(neighbour)
+        result = tuple(sorted(visited))
+        self.slices[key] = result
+        return list(result)
+
+    def backward_slice(self, variable=None, cell=None, line=None):
+        """
+        :return: Statements the variable, cell or line depends on, see slice
+        """
+        return self.slice('backward', variable, cell, line)
+
+    def forward_slice(self, variable=None, cell=None, line=None):
+        """
+        :return: Statements which depend on the variable, cell or line, see slice
+        """
+        return self.slice('forward', variable, cell, line)
+
+    def describe_statement(self, statement):
+        """
+        :param statement: Number of a statement
+        :return: Line of text with the cell, the line and the source of the statement
+        """
+        cell_key, first, _, _, text = self.statements[statement]
+        return "Cell " + cell_key + ", line " + str(first) + ": " + text
+
+    def describe_occurrence(self, occurrence):
+        """
+        :param occurrence: Number of an occurrence
+        :return: Line of text with the kind and position of the occurrence and the source of its statement
+        """
+        identifier, statement, line, column, kind = self.occurrences[occurrence]
+        cell_key, _, _, _, text = self.statements[statement]
+        return kind + " " + identifier + " in cell " + cell_key + ", line " + str(line) + ":" + str(column) + ": " \
+            + text
+
+
+class SliceStore:
+    """
+    Class to keep the indexes of the notebooks in a folder. An index is addressed by a hash of the notebook content,
+    the tool version and the data flow mode, so it is built again after the notebook changed. Indexes which were
+    loaded once are kept in memory.
+    """
+
+    def __init__(self, path=INDEX_DIR, cache=None):
+        """
+        :param path: Folder of the indexes
+        :param cache: Optional CellCache used when an index is built
+        """
+        self.path = path
+        self.cache = cache
+        self.built = 0
+        self.loaded = 0
+        # DICT( TUPLE( file, data flow ): TUPLE( modification time, size, SliceIndex ) )
+        self.indexes = dict()
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def key(content_hash, data_flow):
+        """
+        :param content_hash: Hash of the notebook file
+        :param data_flow: Data flow mode
+        :return: Hash of the index
+        """
+        return hashlib.sha256((TOOL_VERSION + '$' + data_flow + '$' + content_hash).encode()).hexdigest()
+
+    def get_file(self, key):
+        """
+        :param key: Hash of the index
+        :return: Path of the index file
+        """
+        return os.path.join(self.path, key[:2], key + '.pickle')
+
+    def get(self, file, data_flow='reaching'):
+        """
+        :param file: Notebook file
+        :param data_flow: Data flow mode, see DATA_FLOW_MODES
+        :return: SliceIndex of the notebook, loaded from the folder or built and stored there
+        """
+        stat = os.stat(file)
+        known = self.indexes.get((file, data_flow))
+        if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            return known[2]
+        index_file = self.get_file(self.key(file_hash(file), data_flow))
+        index = None
+        if os.path.exists(index_file):
+            try:
+                with open(index_file, 'rb') as fp:
+                    index = pickle.load(fp)
+                self.loaded += 1
+            except (OSError, EOFError, pickle.UnpicklingError):
+                index = None
+        if index is None:
+            analyzer = NotebookAnalyzer(file, progress=False, cache=self.cache, data_flow=data_flow)
+            index = SliceIndex(analyzer.name, data_flow).build(analyzer, analyzer.read_code_cells())
+            self.built += 1
+            self.put(index_file, index)
+        self.indexes[(file, data_flow)] = (stat.st_mtime_ns, stat.st_size, index)
+        return index
+
+    @staticmethod
+    def put(index_file, index):
+        """
+        :param index_file: Path of the index file
+        :param index: SliceIndex
+        """
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        # Write to a temporary file first, so other processes never read a partially written index
+        fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(index_file), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as fp:
+            pickle.dump(index, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, index_file)
+
+
+def run_query(index, query, variable=None, cell=None, line=None):
+    """
+    :param index: SliceIndex of the notebook
+    :param query: One of QUERIES
+    :param variable: Identifier of a variable or None
+    :param cell: Key of a cell or None
+    :param line: Line in the cell or None
+    :return: Lines of text with the result
+    """
+    if query in ('definitions', 'uses'):
+        if variable is None:
+            raise ValueError("The query " + query + " requires a variable")
+        occurrences = index.definitions(variable, cell, line) if query == 'definitions' \
+            else index.uses(variable, cell, line)
+        return [index.describe_occurrence(occurrence) for occurrence in occurrences]
+    return [index.describe_statement(statement) for statement in index.slice(query, variable, cell, line)]
+
+
+def parse_args(argv=None):
+    """
+    Parses the command line arguments.
+
+    :param argv: Arguments, defaults to sys.argv
+    :return: Parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="Query the definitions, uses and slices of the variables of "
+                                                 "notebooks.")
+    parser.add_argument("--input", nargs="+", required=True,
+                        help="Notebooks to query.")
+    parser.add_argument("--query", choices=QUERIES, default='backward',
+                        help="'definitions' and 'uses' list the occurrences of the variable, 'backward' lists the "
+                             "statements the criterion depends on and 'forward' the statements depending on it.")
+    parser.add_argument("--variable", default=None,
+                        help="Identifier of the variable.")
+    parser.add_argument("--cell", default=None,
+                        help="Number of the code cell, starting with 0 as in the graph.")
+    parser.add_argument("--line", type=int, default=None,
+                        help="Line in the cell, requires --cell.")
+    parser.add_argument("--index-dir", default=INDEX_DIR,
+                        help="Folder the indexes of the notebooks are stored in.")
+    add_cache_args(parser)
+    add_data_flow_args(parser)
+    args = parser.parse_args(argv)
+    if args.line is not None and args.cell is None:
+        parser.error("--line requires --cell")
+    if args.query in ('definitions', 'uses') and args.variable is None:
+        parser.error("--query " + args.query + " requires --variable")
+    if args.variable is None and args.cell is None:
+        parser.error("--query " + args.query + " requires --variable or --cell")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = SliceStore(args.index_dir, cache=create_cache(args.cache_dir, args.cache_size))
+    for file in args.input:
+        index = store.get(file, args.data_flow)
+        start = time.perf_counter()
+        result = run_query(index, args.query, args.variable, args.cell, args.line)
+        seconds = time.perf_counter() - start
+        print(index.name + ": " + str(len(result)) + " results in " + str(round(seconds * 1000, 3)) + " ms")
+        for line in result:
+            print("  " + line)
+    print("Indexes: " + str(store.built) + " built, " + str(store.loaded) + " loaded")
+    print("EOF")
+
+
+if __name__ == "__main__":
+    main()
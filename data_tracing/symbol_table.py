@@ -0,0 +1,195 @@
+"""
+Scopes of the names of a cell. Only names which bind or read a global variable of the notebook take part in the data
+flow between the statements and cells. Parameters and local variables of functions and lambdas, targets of
+comprehensions and names bound in class bodies are local to their scope, even if a global variable has the same
+identifier.
+"""
+import ast
+
+from data_tracing.extract_cfg import FUNCTIONS
+
+COMPREHENSIONS = (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+# Nodes which open a scope or evaluate some of their children in another scope than themselves
+SCOPE_NODES = FUNCTIONS + (ast.Lambda, ast.ClassDef, ast.arguments, ast.arg, ast.comprehension, ast.NamedExpr) \
+              + COMPREHENSIONS
+MATCH_BINDINGS = tuple(getattr(ast, name) for name in ('MatchAs', 'MatchStar', 'MatchMapping') if hasattr(ast, name))
+# Nodes other than ast.Name which bind or declare identifiers
+BINDING_NODES = FUNCTIONS + (ast.ClassDef, ast.arg, ast.alias, ast.Global, ast.Nonlocal, ast.ExceptHandler) \
+                + MATCH_BINDINGS
+
+
+class SymbolScope:
+    """
+    Scope of a module, function, lambda, class or comprehension with the identifiers bound in it.
+    """
+
+    def __init__(self, node, parent):
+        """
+        :param node: Node which opens the scope
+        :param parent: Enclosing SymbolScope or None for the module
+        """
+        self.node = node
+        self.parent = parent
+        self.is_class = isinstance(node, ast.ClassDef)
+        self.is_comprehension = isinstance(node, COMPREHENSIONS)
+        self.bound = set()
+        self.declared_global = set()
+        self.declared_nonlocal = set()
+        # LIST( node: ast.Name ), names which occur in the scope
+        self.names = []
+
+    def get_function_scope(self):
+        """
+        :return: Innermost scope which is not a comprehension, targets of assignment expressions are bound there
+        """
+        scope = self
+        while scope.is_comprehension:
+            scope = scope.parent
+        return scope
+
+
+class SymbolTable:
+    """
+    Class to resolve the scope of every ast.Name of one cell. The AstVisitor reports the nodes of the cell with the
+    scope they occur in, resolve determines the scope every name is bound in after the traversal.
+    """
+
+    def __init__(self):
+        self.module = None
+        # DICT( node: scope node ), scope opened by every node
+        self.scopes = dict()
+        # DICT( node: ast.Name, scope node ), names bound in a scope other than the module
+        self.local_scope = dict()
+
+    def get_module_scope(self, ast_cell):
+        """
+        :param ast_cell: ast of the cell
+        :return: SymbolScope of the module
+        """
+        self.module = SymbolScope(ast_cell, None)
+        self.scopes[ast_cell] = self.module
+        return self.module
+
+    def open_scope(self, nd, parent):
+        """
+        :param nd: Node which opens a scope
+        :param parent: Enclosing SymbolScope
+        :return: SymbolScope of the node, created on the first call
+        """
+        scope = self.scopes.get(nd)
+        if scope is None:
+            scope = SymbolScope(nd, parent)
+            self.scopes[nd] = scope
+        return scope
+
+    def get_child_scope(self, nd, field, scope):
+        """
+        Determines the scope of a child. Default values, annotations, decorators and base classes are evaluated in
+        the enclosing scope, so is the iterable of the first generator of a comprehension.
+
+        :param nd: Node of the cell, one of SCOPE_NODES
+        :param field: Field of the node the child belongs to
+        :param scope: SymbolScope of the node
+        :return: SymbolScope of the child
+        """
+        if isinstance(nd, FUNCTIONS):
+            return self.open_scope(nd, scope) if field in ('args', 'body') else scope
+        elif isinstance(nd, ast.Lambda):
+            return self.open_scope(nd, scope)
+        elif isinstance(nd, ast.ClassDef):
+            return self.open_scope(nd, scope) if field == 'body' else scope
+        elif isinstance(nd, COMPREHENSIONS):
+            return self.open_scope(nd, scope)
+        elif isinstance(nd, ast.arguments):
+            return scope.parent if field in ('defaults', 'kw_defaults') else scope
+        elif isinstance(nd, ast.arg):
+            return scope.parent if field == 'annotation' else scope
+        elif isinstance(nd, ast.comprehension):
+            return scope.parent if field == 'iter' and scope.node.generators[0] is nd else scope
+        elif isinstance(nd, ast.NamedExpr):
+            return scope.get_function_scope() if field == 'target' else scope
+        return scope
+
+    @staticmethod
+    def add_binding(nd, scope):
+        """
+        Records the identifiers a node other than ast.Name binds or declares in its scope.
+
+        :param nd: Node of the cell
+        :param scope: SymbolScope of the node
+        """
+        if isinstance(nd, ast.arg):
+            scope.bound.add(nd.arg)
+        elif isinstance(nd, FUNCTIONS + (ast.ClassDef,)):
+            scope.bound.add(nd.name)
+        elif isinstance(nd, ast.alias):
+            scope.bound.add(nd.asname if nd.asname is not None else nd.name.split('.')[0])
+        elif isinstance(nd, ast.Global):
+            scope.declared_global.update(nd.names)
+        elif isinstance(nd, ast.Nonlocal):
+            scope.declared_nonlocal.update(nd.names)
+        elif isinstance(nd, ast.ExceptHandler) and nd.name is not None:
+            scope.bound.add(nd.name)
+        elif isinstance(nd, MATCH_BINDINGS):
+            name = nd.rest if isinstance(nd, ast.MatchMapping) else nd.name
+            if name is not None:
+                scope.bound.add(name)
+
+    @staticmethod
+    def add_name(nd, scope):
+        """
+        :param nd: ast.Name
+        :param scope: SymbolScope of the name
+        """
+        scope.names.append(nd)
+        if not isinstance(nd.ctx, ast.Load):
+            scope.bound.add(nd.id)
+
+    def resolve(self):
+        """
+        Determines the scope every name of a function, lambda, class or comprehension is bound in. Names which are
+        not bound in any enclosing function are global.
+        """
+        for scope in self.scopes.values():
+            if scope is self.module:
+                continue
+            # DICT( identifier: SymbolScope or None )
+            resolved = dict()
+            for nd in scope.names:
+                identifier = nd.id
+                if identifier not in resolved:
+                    resolved[identifier] = self.lookup(scope, identifier)
+                owner = resolved[identifier]
+                if owner is not None:
+                    self.local_scope[nd] = owner.node
+        # Only the resolved names are kept, e.g. in the cell cache
+        self.module = None
+        self.scopes = dict()
+
+    def lookup(self, scope, identifier):
+        """
+        :param scope: SymbolScope a name occurs in
+        :param identifier: Identifier of the name
+        :return: SymbolScope the identifier is bound in or None if it is global
+        """
+        if identifier in scope.declared_global:
+            return None
+        if identifier in scope.bound and identifier not in scope.declared_nonlocal:
+            return scope
+        # Free names are looked up in the enclosing functions, class bodies are not visible to nested scopes
+        enclosing = scope.parent
+        while enclosing is not None and enclosing is not self.module:
+            if not enclosing.is_class:
+                if identifier in enclosing.declared_global:
+                    return None
+                if identifier in enclosing.bound and identifier not in enclosing.declared_nonlocal:
+                    return enclosing
+            enclosing = enclosing.parent
+        return None
+
+    def is_global(self, nd):
+        """
+        :param nd: ast.Name of the cell
+        :return: True if the name binds or reads a global variable of the notebook
+        """
+        return nd not in self.local_scope
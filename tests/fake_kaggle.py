@@ -0,0 +1,68 @@
+"""
+Stand-in for the kaggle command line tool, answers ``kernels list`` and ``kernels pull`` from a state folder:
+
+- listing.csv is printed for the first page of every listing, later pages are empty.
+- Every pull appends the ref to pulls.log.
+- A file fail-<author>-<slug> holds the number of pulls of the kernel which still fail.
+
+Usage: python fake_kaggle.py <state folder> kernels list|pull ...
+"""
+import json
+import os
+import sys
+
+HEADER = 'ref,title,author,lastRunTime,totalVotes'
+
+
+def list_kernels(state_dir, args):
+    """
+    :param state_dir: State folder
+    :param args: Arguments after "kernels list"
+    """
+    print(HEADER)
+    if args[args.index('--page') + 1] != '1':
+        return
+    with open(os.path.join(state_dir, 'listing.csv')) as fp:
+        sys.stdout.write(fp.read())
+
+
+def pull_kernel(state_dir, args):
+    """
+    :param state_dir: State folder
+    :param args: Arguments after "kernels pull"
+    :return: Exit code
+    """
+    pull_dir = args[args.index('-p') + 1]
+    ref = args[-1]
+    with open(os.path.join(state_dir, 'pulls.log'), 'a') as fp:
+        fp.write(ref + '\n')
+    fail_file = os.path.join(state_dir, 'fail-' + ref.replace('/', '-'))
+    if os.path.exists(fail_file):
+        with open(fail_file) as fp:
+            remaining = int(fp.read())
+        if remaining > 0:
+            with open(fail_file, 'w') as fp:
+                fp.write(str(remaining - 1))
+            sys.stderr.write('429 - Too Many Requests\n')
+            return 1
+    notebook = {'cells': [{'cell_type': 'code', 'metadata': {}, 'outputs': [], 'execution_count': None,
+                           'source': ['ref = ' + repr(ref)]}],
+                'metadata': {}, 'nbformat': 4, 'nbformat_minor': 4}
+    with open(os.path.join(pull_dir, ref.split('/')[1] + '.ipynb'), 'w') as fp:
+        json.dump(notebook, fp)
+    return 0
+
+
+def main(argv):
+    state_dir, command, args = argv[0], argv[1:3], argv[3:]
+    if command == ['kernels', 'list']:
+        list_kernels(state_dir, args)
+        return 0
+    if command == ['kernels', 'pull']:
+        return pull_kernel(state_dir, args)
+    sys.stderr.write('Unknown command ' + ' '.join(command) + '\n')
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,37 @@
+"""
+Tests of the comparison of benchmark results with a baseline.
+
+Run from the project folder: python -m pytest tests
+"""
+from benchmarks.bench_pipeline import RESULT_VERSION, compare, compare_sizes, strip_timings
+
+
+def create_results(edges, seconds):
+    """
+    :return: Results of run_benchmark with one notebook and one point of a curve
+    """
+    size = {'cells': 2, 'nodes': 10, 'edges': edges}
+    return {'version': RESULT_VERSION, 'python': '3.11', 'platform': 'test', 'runs': 1, 'render': False,
+            'notebooks': {'a.ipynb': {'size': size, 'stages': {'parse': seconds}}},
+            'curves': {'cells': {'base': {'cells': 10}, 'seed': 0,
+                                 'points': [{'value': 5, 'size': size, 'stages': {'parse': seconds}}]}}}
+
+
+def test_sizes_only_baseline():
+    baseline = strip_timings(create_results(20, 0.1))
+    assert 'stages' not in baseline['notebooks']['a.ipynb']
+    assert 'stages' not in baseline['curves']['cells']['points'][0]
+    assert 'platform' not in baseline
+
+    # Timings are not compared without timings in the baseline
+    assert compare(create_results(20, 10.0), baseline) == []
+    assert compare_sizes(create_results(20, 10.0), baseline) == []
+    assert compare_sizes(create_results(21, 0.1), baseline) == [('a.ipynb', 'edges', 20, 21),
+                                                               ('cells=5', 'edges', 20, 21)]
+
+
+def test_timing_baseline():
+    baseline = create_results(20, 0.1)
+    assert compare(create_results(20, 0.2), baseline, threshold=1.5) == [('a.ipynb', 'parse', 0.1, 0.2),
+                                                                         ('cells=5', 'parse', 0.1, 0.2)]
+    assert compare(create_results(20, 0.12), baseline, threshold=1.5) == []
@@ -0,0 +1,102 @@
+"""
+Tests of KernelFetcher.run against the stand-in for the kaggle tool in fake_kaggle.py.
+
+Run from the project folder: python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+from data_tracing.get_kernels import KernelFetcher
+
+FAKE_KAGGLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_kaggle.py')
+
+
+def write_listing(state_dir, rows):
+    """
+    :param state_dir: State folder of the stand-in
+    :param rows: List of tuples of ref and last run time
+    """
+    with open(os.path.join(state_dir, 'listing.csv'), 'w') as fp:
+        for ref, run_time in rows:
+            fp.write(ref + ',Title of ' + ref + ',' + ref.split('/')[0] + ',' + run_time + ',3\n')
+
+
+def read_pulls(state_dir):
+    """
+    :param state_dir: State folder of the stand-in
+    :return: List of the refs of every pull, failed attempts included
+    """
+    with open(os.path.join(state_dir, 'pulls.log')) as fp:
+        pulls = fp.read().split()
+    os.remove(os.path.join(state_dir, 'pulls.log'))
+    return sorted(pulls)
+
+
+@pytest.fixture
+def state_dir(tmp_path):
+    """
+    :return: State folder of the stand-in with a listing of two kernels with the same slug
+    """
+    state_dir = tmp_path / 'state'
+    state_dir.mkdir()
+    write_listing(str(state_dir), [('alice/titanic', '2024-01-01 10:00:00'), ('bob/titanic', '2024-01-02 10:00:00')])
+    return str(state_dir)
+
+
+def create_fetcher(state_dir, output_dir):
+    """
+    :return: KernelFetcher which runs the stand-in and retries once without waiting
+    """
+    return KernelFetcher(output_dir=output_dir, command=[sys.executable, FAKE_KAGGLE, state_dir], jobs=2, retries=1,
+                         backoff=0, timeout=30)
+
+
+def test_retry_and_resume(state_dir, tmp_path):
+    output_dir = str(tmp_path / 'notebooks')
+    # alice/titanic fails once and succeeds on the retry, bob/titanic fails both attempts of the first run
+    with open(os.path.join(state_dir, 'fail-alice-titanic'), 'w') as fp:
+        fp.write('1')
+    with open(os.path.join(state_dir, 'fail-bob-titanic'), 'w') as fp:
+        fp.write('2')
+
+    summary = create_fetcher(state_dir, output_dir).run()
+    assert summary['listed'] == 2
+    assert summary['status'] == {'ok': 1, 'failed': 1}
+    assert [failure['ref'] for failure in summary['failures']] == ['bob/titanic']
+    assert '429' in summary['failures'][0]['error']
+    assert read_pulls(state_dir) == ['alice/titanic', 'alice/titanic', 'bob/titanic', 'bob/titanic']
+    assert os.path.exists(os.path.join(output_dir, 'alice', 'titanic.ipynb'))
+    assert not os.path.exists(os.path.join(output_dir, 'bob'))
+
+    # The next run resumes with the failed kernel only
+    summary = create_fetcher(state_dir, output_dir).run()
+    assert (summary['pulled'], summary['skipped'], summary['status']) == (1, 1, {'ok': 1})
+    assert read_pulls(state_dir) == ['bob/titanic']
+    # Kernels of different authors with the same slug do not overwrite each other
+    for author in ('alice', 'bob'):
+        with open(os.path.join(output_dir, author, 'titanic.ipynb')) as fp:
+            assert author + '/titanic' in fp.read()
+
+    # Nothing changed, nothing is pulled
+    summary = create_fetcher(state_dir, output_dir).run()
+    assert (summary['pulled'], summary['skipped']) == (0, 2)
+    assert not os.path.exists(os.path.join(state_dir, 'pulls.log'))
+
+
+def test_pull_again_after_new_run(state_dir, tmp_path):
+    output_dir = str(tmp_path / 'notebooks')
+    create_fetcher(state_dir, output_dir).run()
+    read_pulls(state_dir)
+
+    write_listing(state_dir, [('alice/titanic', '2024-02-01 10:00:00'), ('bob/titanic', '2024-01-02 10:00:00')])
+    summary = create_fetcher(state_dir, output_dir).run()
+    assert (summary['pulled'], summary['skipped']) == (1, 1)
+    assert read_pulls(state_dir) == ['alice/titanic']
+
+    # A missing file is pulled again
+    os.remove(os.path.join(output_dir, 'bob', 'titanic.ipynb'))
+    summary = create_fetcher(state_dir, output_dir).run()
+    assert read_pulls(state_dir) == ['bob/titanic']
+    assert summary['index']['kernels'] == 2
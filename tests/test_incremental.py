@@ -0,0 +1,28 @@
+"""
+Tests of the IncrementalAnalyzer on the notebooks of the repository.
+
+Run from the project folder: python -m pytest tests
+"""
+import os
+
+from data_tracing.incremental import IncrementalAnalyzer
+from data_tracing.process_kernels import NOTEBOOK_DIR, NotebookAnalyzer
+from data_tracing.render_graph import GraphRenderer
+
+NOTEBOOK = os.path.join(NOTEBOOK_DIR, 'example_notebook.ipynb')
+
+
+def test_options_are_forwarded(tmp_path):
+    renderer = GraphRenderer()
+    options = {'output_dir': str(tmp_path), 'progress': False, 'renderer': renderer, 'overview': True,
+               'expand': [1], 'data_flow': 'positional'}
+    analyzer = IncrementalAnalyzer(NOTEBOOK, **options)
+    assert analyzer.renderer is renderer
+    assert (analyzer.overview, analyzer.expand, analyzer.data_flow) == (True, {'1'}, 'positional')
+
+    code_cells = analyzer.read_code_cells()
+    analyzer.build_graph(code_cells)
+    code_cells[2] = dict(code_cells[2], source=code_cells[2]['source'] + '\nprint(1)')
+    G = analyzer.build_graph(code_cells)
+    assert analyzer.changed_cells == 1
+    assert G.to_dot() == NotebookAnalyzer(NOTEBOOK, **options).build_graph(code_cells).to_dot()
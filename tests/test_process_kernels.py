@@ -0,0 +1,17 @@
+"""
+Tests of the NotebookAnalyzer on the notebooks of the repository.
+
+Run from the project folder: python -m pytest tests
+"""
+import os
+
+from data_tracing.process_kernels import NOTEBOOK_DIR, NotebookAnalyzer
+
+
+def test_build_graph_creates_output_folder(tmp_path):
+    output_dir = str(tmp_path / 'missing' / 'output')
+    analyzer = NotebookAnalyzer(os.path.join(NOTEBOOK_DIR, 'example_notebook_small.ipynb'), output_dir=output_dir,
+                                progress=False)
+    analyzer.build_graph()
+    # The overview of the imported aliases is plotted while the graph is built
+    assert os.listdir(output_dir) == ['plot_example_notebook_small.ipynb.png']
@@ -0,0 +1,79 @@
+"""
+Tests of the data flow edges of the reaching definitions on small notebooks whose edges are known.
+
+Run from the project folder: python -m pytest tests
+"""
+import ast
+
+import pytest
+
+from data_tracing.extract_dfg import DataFlowExtractor
+
+# LIST( TUPLE( name, LIST( source of a cell ), SET( TUPLE( identifier, line of the definition ) ) ) ), the edges from
+# the first into the last cell
+CELL_EXIT_CASES = [
+    ('straight', ['x = 1\nx = 2', 'print(x)'], {('x', 2)}),
+    ('for at the end', ['x = 1\nfor i in range(3):\n    x = x + i', 'print(x)'], {('x', 1), ('x', 3)}),
+    ('for with break', ['x = 1\nfor i in range(3):\n    if i:\n        x = 2\n        break', 'print(x)'],
+     {('x', 1), ('x', 4)}),
+    ('for with else', ['x = 1\nfor i in range(3):\n    x = 2\nelse:\n    x = 3', 'print(x)'], {('x', 5)}),
+    ('if without else', ['x = 1\nif x:\n    x = 2', 'print(x)'], {('x', 1), ('x', 3)}),
+    ('if with else', ['x = 1\nif x:\n    x = 2\nelse:\n    x = 3', 'print(x)'], {('x', 3), ('x', 5)}),
+    ('while at the end', ['x = 1\nwhile x < 3:\n    x = x + 1', 'print(x)'], {('x', 1), ('x', 3)}),
+    ('while with continue', ['x = 1\nwhile x < 3:\n    x = x + 1\n    if x:\n        continue', 'print(x)'],
+     {('x', 1), ('x', 3)}),
+    ('try at the end', ['x = 1\ntry:\n    x = 2\nexcept ValueError:\n    pass', 'print(x)'], {('x', 1), ('x', 3)}),
+    ('function at the end', ['x = 1\ndef f():\n    x = 2', 'print(x)'], {('x', 1)}),
+    ('kill', ['x = 1\nx = 2\ny = x', 'print(x, y)'], {('x', 2), ('y', 3)}),
+    ('del', ['x = 1\ndel x', 'print(x)'], set()),
+    ('del in a branch', ['x = 1\nif x:\n    del x', 'print(x)'], {('x', 1)}),
+    ('del and define again', ['x = 1\ndel x\nx = 2', 'print(x)'], {('x', 3)}),
+    ('augmented assignment', ['x = 1\nx += 2', 'print(x)'], {('x', 2)}),
+    ('bare annotation', ['x = 1\nx: int', 'print(x)'], {('x', 1)}),
+    ('annotated assignment', ['x = 1\nx: int = 2', 'print(x)'], {('x', 2)}),
+    ('after raise', ['x = 1\nraise ValueError\nx = 2', 'print(x)'], {('x', 1)}),
+    ('raise in a branch', ['x = 1\nif x:\n    x = 2\n    raise ValueError', 'print(x)'], {('x', 1), ('x', 3)}),
+    ('raise before a definition', ['x = 1\nif x:\n    raise ValueError\nx = 2', 'print(x)'], {('x', 1), ('x', 4)}),
+    ('raise caught', ['x = 1\ntry:\n    x = 2\n    raise ValueError\nexcept ValueError:\n    pass', 'print(x)'],
+     {('x', 1), ('x', 3)}),
+]
+
+
+def get_edges(cells):
+    """
+    :param cells: List of the sources of the cells
+    :return: Set of the edges as tuples of identifier, cell and line of the definition, cell and line of the use
+    """
+    ast_cells = {str(i): ast.parse(source) for i, source in enumerate(cells)}
+    edges = DataFlowExtractor(ast_cells, mode='reaching').walk_and_get_edges()
+    return {(definition[0].id, definition[1], definition[0].lineno, use[1], use[0].lineno)
+            for definition, use in edges}
+
+
+@pytest.mark.parametrize('cells, expected', [case[1:] for case in CELL_EXIT_CASES],
+                         ids=[case[0] for case in CELL_EXIT_CASES])
+def test_cell_exit(cells, expected):
+    last = str(len(cells) - 1)
+    assert {(identifier, line) for identifier, def_cell, line, use_cell, _ in get_edges(cells)
+            if def_cell == '0' and use_cell == last} == expected
+
+
+def test_kill_within_cell():
+    assert get_edges(['x = 1\nx = 2\nprint(x)']) == {('x', '0', 2, '0', 3)}
+
+
+def test_del_within_cell():
+    assert get_edges(['x = 1\ndel x\nprint(x)']) == set()
+
+
+def test_augmented_assignment_reads_target():
+    assert get_edges(['x = 1\nx += 2\nprint(x)']) == {('x', '0', 1, '0', 2), ('x', '0', 2, '0', 3)}
+
+
+def test_bare_annotation_is_no_use():
+    assert get_edges(['x = 1\nx: int\nprint(x)']) == {('x', '0', 1, '0', 3)}
+
+
+def test_raise_ends_the_path():
+    assert get_edges(['x = 1\nif x:\n    x = 2\n    raise ValueError\nprint(x)']) == {('x', '0', 1, '0', 2),
+                                                                                      ('x', '0', 1, '0', 5)}